@@ -0,0 +1,55 @@
+import os
+from fastapi import APIRouter, Query, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse
+from app.models.schemas import ProfileRequest, ProfileResponse
+from app.core.profiling import request_profiler
+from app.core.logging import setup_logging, get_logger
+
+# Setup logging
+setup_logging()
+logger = get_logger("api")
+
+router = APIRouter()
+
+@router.post("/admin/profile", response_model = ProfileResponse)
+async def start_profile(request: ProfileRequest) -> ProfileResponse:
+    """Profile the next N prediction requests or every prediction request for T seconds on this worker"""
+    if request.requests is None and request.seconds is None:
+        raise HTTPException(status_code = 400, detail = "Either requests or seconds is required")
+    try:
+        status = request_profiler.arm(
+            requests = request.requests,
+            seconds = request.seconds,
+            mode = request.mode,
+            memory = request.memory
+        )
+        return ProfileResponse(success = True, status = status)
+    except RuntimeError as e:
+        raise HTTPException(status_code = 409, detail = str(e))
+    except Exception as e:
+        logger.error(f"Profile endpoint error: {str(e)}")
+        raise HTTPException(status_code = 500, detail = str(e))
+
+@router.get("/admin/profile", response_model = ProfileResponse)
+async def get_profile_status() -> ProfileResponse:
+    """Get the state of the profiler on this worker and its last outputs"""
+    return ProfileResponse(success = True, status = request_profiler.status())
+
+@router.get("/admin/profile/download")
+async def download_profile(
+    output: str = Query("profile", pattern = "^(profile|memory)$"),
+    summary: bool = Query(False, description = "Return the top functions as text instead of the raw .pstats file")
+):
+    """Download the last profile or allocation snapshot written by this worker"""
+    if request_profiler.active:
+        raise HTTPException(status_code = 409, detail = "Profiler is still running")
+    if summary:
+        text = request_profiler.summary()
+        if text is None:
+            raise HTTPException(status_code = 404, detail = "No cProfile output available")
+        return PlainTextResponse(text)
+
+    path = request_profiler.outputs.get(output)
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code = 404, detail = f"No {output} output available")
+    return FileResponse(path, filename = os.path.basename(path))
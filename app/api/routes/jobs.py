@@ -0,0 +1,45 @@
+import asyncio
+from fastapi import APIRouter, Query, HTTPException
+from app.models.schemas import JobRequest, JobResponse, JobResultsResponse
+from app.services.job_service import job_service
+from app.core.exceptions import CustomException
+from app.core.logging import setup_logging, get_logger
+
+# Setup logging
+setup_logging()
+logger = get_logger("api")
+
+router = APIRouter()
+
+@router.post("/jobs", response_model = JobResponse, status_code = 202)
+async def submit_job(request: JobRequest) -> JobResponse:
+    """Submit a batch for asynchronous scoring"""
+    try:
+        # Queueing a large batch is a long Redis write, it runs off the event loop
+        job = await asyncio.to_thread(job_service.submit, request.texts, chunk_size = request.chunk_size)
+        return JobResponse(success = True, **job)
+    except CustomException as e:
+        raise HTTPException(status_code = e.status_code, detail = e.message)
+    except Exception as e:
+        logger.error(f"Job submit endpoint error: {str(e)}")
+        raise HTTPException(status_code = 500, detail = str(e))
+
+@router.get("/jobs/{job_id}", response_model = JobResponse)
+async def get_job(job_id: str) -> JobResponse:
+    """Get the progress of a job"""
+    job = await asyncio.to_thread(job_service.get_status, job_id)
+    if job is None:
+        raise HTTPException(status_code = 404, detail = "Job not found")
+    return JobResponse(success = True, **job)
+
+@router.get("/jobs/{job_id}/results", response_model = JobResultsResponse)
+async def get_job_results(
+    job_id: str, 
+    offset: int = Query(0, ge = 0), 
+    limit: int = Query(100, gt = 0, le = 10000)
+) -> JobResultsResponse:
+    """Page through the results of a job, unfinished items are null"""
+    page = await asyncio.to_thread(job_service.get_results, job_id, offset = offset, limit = limit)
+    if page is None:
+        raise HTTPException(status_code = 404, detail = "Job not found")
+    return JobResultsResponse(success = True, **page)
@@ -1,11 +1,24 @@
 import time 
-from fastapi import APIRouter, Query, HTTPException
+import asyncio
+from typing import Optional
+import msgpack
+import numpy as np
+from fastapi import APIRouter, Query, HTTPException, Request, Response
+from app.core.config import settings
 from app.services.ml_service import ml_service
 from app.models.schemas import (
     PredictionRequest, PredictionResponse, 
-    CacheStatsResponse, CacheInfoResponse
+    CacheStatsResponse, CacheInfoResponse, 
+    WarmupRequest, WarmupResponse, 
+    CacheDeleteResponse, CacheInventoryResponse, 
+    CacheTTLRequest, CacheTTLResponse
 )
-from app.services.prediction_service import prediction_service
+from app.services.prediction_service import prediction_service, prediction_key_prefix, PREDICTION_PREFIX
+from app.services.cache_service import cache_service
+from app.services.warmup_service import cache_warmer
+from app.services.admission_service import admission_controller
+from app.core.exceptions import OverloadedError, ModelNotFoundError
+from app.services.model_registry import model_registry
 from app.core.logging import setup_logging, get_logger
 
 # Setup logging
@@ -22,7 +35,8 @@ async def predict(request: PredictionRequest, use_cache: bool = Query(True, desc
     try:
         result = await prediction_service.predict_single(
             text = request.text, 
-            use_cache = use_cache
+            use_cache = use_cache, 
+            model = request.model
         )
 
         processing_time = time.time() - start_time
@@ -38,13 +52,79 @@ async def predict(request: PredictionRequest, use_cache: bool = Query(True, desc
             model_info = result.get("model_info", {}), 
             metadata = {
                 "input size": result.get("input size"), 
-                "cached": result.get("cached", False)
+                "cached": result.get("cached", False), 
+                "similar_to": result.get("similar_to"), 
+                "similarity": result.get("similarity")
             }
         )
+    except OverloadedError as e:
+        raise HTTPException(status_code = 503, detail = e.message, headers = {"Retry-After": str(e.retry_after)})
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code = 404, detail = e.details)
     except Exception as e:
         logger.error(f"Prediction endpoint error: {str(e)}")
         raise HTTPException(status_code = 500, detail = str(e)) 
     
+@router.post("/predict/msgpack")
+async def predict_msgpack(request: Request, use_cache: bool = Query(True, description = "Whether to use caching")) -> Response:
+    """Batch predictions over msgpack for service-to-service callers
+
+    The body is a msgpack map {"texts": [str, ...], "model": optional name or
+    name@version}. The response packs labels
+    as uint8 indexes into "classes" and probabilities as one little-endian
+    float32 array of "shape" (texts, classes), both as raw bytes.
+    """
+    start_time = time.time()
+    try:
+        payload = msgpack.unpackb(await request.body(), raw = False)
+        texts = payload["texts"]
+        model = payload.get("model")
+    except Exception:
+        raise HTTPException(status_code = 400, detail = "Body must be a msgpack map with a \"texts\" list")
+    if not isinstance(texts, list) or not texts or not all(isinstance(text, str) for text in texts):
+        raise HTTPException(status_code = 400, detail = "\"texts\" must be a non-empty list of strings")
+    if model is not None and not isinstance(model, str):
+        raise HTTPException(status_code = 400, detail = "\"model\" must be a string")
+    if len(texts) > settings.binary_max_batch:
+        raise HTTPException(status_code = 413, detail = f"At most {settings.binary_max_batch} texts per request")
+
+    try:
+        result = await prediction_service.predict_many(texts, use_cache = use_cache, model = model)
+
+        classes = result["classes"]
+        label_ids = np.array([classes.index(label) if label in classes else 255 for label in result["labels"]], dtype = np.uint8)
+        has_probabilities = all(row is not None for row in result["probabilities"])
+        probabilities = np.asarray(result["probabilities"] if has_probabilities else np.empty((len(texts), 0)), dtype = "<f4")
+
+        content = msgpack.packb({
+            "success": True, 
+            "classes": classes, 
+            "labels": label_ids.tobytes(), 
+            "probabilities": probabilities.tobytes(), 
+            "shape": list(probabilities.shape), 
+            "dtype": "<f4", 
+            "from_cache": np.array(result["from_cache"], dtype = np.uint8).tobytes(), 
+            "model_name": result["model_name"], 
+            "model_version": result["model_version"], 
+            "processing_time_seconds": time.time() - start_time
+        })
+        return Response(content = content, media_type = "application/msgpack")
+    except OverloadedError as e:
+        raise HTTPException(status_code = 503, detail = e.message, headers = {"Retry-After": str(e.retry_after)})
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code = 404, detail = e.details)
+    except Exception as e:
+        logger.error(f"Msgpack prediction endpoint error: {str(e)}")
+        raise HTTPException(status_code = 500, detail = str(e)) 
+
+@router.get("/predict/admission")
+async def get_admission_stats():
+    """Get queue depth, shed counts and service time of the admission controller on this worker"""
+    return {
+        "success": True, 
+        "admission": admission_controller.get_stats()
+    }
+
 @router.get("/model/info")
 async def get_model_info():
     """Get information about the model"""
@@ -59,6 +139,31 @@ async def get_model_info():
         logger.error(f"Model info endpoint error {str(e)}")
         raise HTTPException(status_code = 500, detail = str(e)) 
 
+@router.get("/models")
+async def get_models():
+    """Get the published models, the resident ones and per-model load, eviction and latency stats on this worker"""
+    try:
+        return {
+            "success": True, 
+            "available": model_registry.available(), 
+            "registry": model_registry.get_stats()
+        }
+    except Exception as e:
+        logger.error(f"Models endpoint error {str(e)}")
+        raise HTTPException(status_code = 500, detail = str(e)) 
+
+@router.get("/model/shadow")
+async def get_shadow_stats():
+    """Get agreement, confidence drift and latency of the shadow candidate on this worker"""
+    try:
+        return {
+            "success": True, 
+            "shadow": ml_service.get_shadow_stats()
+        }
+    except Exception as e:
+        logger.error(f"Shadow stats endpoint error {str(e)}")
+        raise HTTPException(status_code = 500, detail = str(e)) 
+
 @router.get("/cache/stats", response_model = CacheStatsResponse)
 async def get_cache_stats():
     """Get cache and model statistics"""
@@ -70,6 +175,8 @@ async def get_cache_stats():
             service_status = result["service_status"], 
             cache_status = result["cache_status"], 
             model_status = result["model_status"], 
+            similarity_cache = result["similarity_cache"], 
+            write_behind = result["write_behind"], 
             timestamp = time.time() 
         )
     except Exception as e:
@@ -97,7 +204,71 @@ async def get_cache_info(cache_key: str) ->CacheInfoResponse:
         logger.error(f"Cache info endpoint error: {str(e)}")
         raise HTTPException(status_code = 500, detail = str(e)) 
     
-@router.delete("/cache")
-async def flush_cache():
-    """Flush all cached predictions"""
-    pass 
\ No newline at end of file
+@router.post("/cache/warmup", response_model = WarmupResponse)
+async def warmup_cache(request: WarmupRequest) -> WarmupResponse:
+    """Start a cache warm-up in the background"""
+    try:
+        started = cache_warmer.start(source = request.source, top_n = request.top_n)
+        return WarmupResponse(success = True, started = started, status = cache_warmer.status)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
+    except Exception as e:
+        logger.error(f"Cache warmup endpoint error: {str(e)}")
+        raise HTTPException(status_code = 500, detail = str(e)) 
+
+@router.get("/cache/warmup", response_model = WarmupResponse)
+async def get_warmup_status() -> WarmupResponse:
+    """Get the status of the last cache warm-up"""
+    return WarmupResponse(success = True, started = cache_warmer.running, status = cache_warmer.status)
+
+def resolve_prefix(prefix: Optional[str], model_version: Optional[str], model: Optional[str] = None) -> str:
+    """Key prefix an admin call works on, always inside the prediction keyspace"""
+    if model_version or model:
+        return f"{prediction_key_prefix(model_version, model)}:"
+    prefix = prefix or f"{PREDICTION_PREFIX}:"
+    if not prefix.startswith(PREDICTION_PREFIX):
+        raise HTTPException(status_code = 400, detail = f"Prefix must start with {PREDICTION_PREFIX}")
+    return prefix
+
+@router.delete("/cache", response_model = CacheDeleteResponse)
+async def flush_cache(
+    prefix: Optional[str] = Query(None, description = "Only delete keys starting with this prefix"), 
+    model_version: Optional[str] = Query(None, description = "Only delete the predictions of this model version"), 
+    model: Optional[str] = Query(None, description = "Only delete the predictions of this registered model")
+) -> CacheDeleteResponse:
+    """Delete cached predictions, all of them or those of a prefix, model or model version"""
+    prefix = resolve_prefix(prefix, model_version, model)
+    start_time = time.time()
+    try:
+        # SCAN + UNLINK batches run off the event loop so the API keeps serving meanwhile
+        deleted = await asyncio.to_thread(cache_service.flush_all, prefix)
+        return CacheDeleteResponse(success = True, prefix = prefix, deleted = deleted, duration_seconds = time.time() - start_time)
+    except Exception as e:
+        logger.error(f"Cache flush endpoint error: {str(e)}")
+        raise HTTPException(status_code = 500, detail = str(e)) 
+
+@router.get("/cache/inventory", response_model = CacheInventoryResponse)
+async def get_cache_inventory(
+    prefix: Optional[str] = Query(None), 
+    model_version: Optional[str] = Query(None), 
+    model: Optional[str] = Query(None)
+) -> CacheInventoryResponse:
+    """Count, size and TTL spread of the cached predictions per namespace"""
+    prefix = resolve_prefix(prefix, model_version, model)
+    start_time = time.time()
+    try:
+        namespaces = await asyncio.to_thread(cache_service.inventory, prefix)
+        return CacheInventoryResponse(success = True, prefix = prefix, namespaces = namespaces, duration_seconds = time.time() - start_time)
+    except Exception as e:
+        logger.error(f"Cache inventory endpoint error: {str(e)}")
+        raise HTTPException(status_code = 500, detail = str(e)) 
+
+@router.post("/cache/ttl", response_model = CacheTTLResponse)
+async def get_cache_ttls(request: CacheTTLRequest) -> CacheTTLResponse:
+    """Remaining TTL of many keys, -2 when missing and -1 when persistent"""
+    try:
+        ttls = await asyncio.to_thread(cache_service.get_ttls, request.keys)
+        return CacheTTLResponse(success = True, ttls = ttls)
+    except Exception as e:
+        logger.error(f"Cache ttl endpoint error: {str(e)}")
+        raise HTTPException(status_code = 500, detail = str(e)) 
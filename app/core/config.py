@@ -12,24 +12,162 @@ class Settings(BaseSettings):
     api_prefix: str = "/api"
     host: str = "0.0.0.0"
     port: int = 8000 
+    # Most texts accepted by one binary (msgpack) batch request
+    binary_max_batch: int = 10000
+
+    # Production server (python -m app.serve)
+    # 0 sizes the worker count from the usable CPUs
+    workers: int = 0
+    # Native BLAS/OpenMP/joblib threads per worker
+    threads_per_worker: int = 1
+    cpu_affinity: bool = False
+    worker_timeout: int = 60
 
     # Logging
     logs_directory: str = "logs" 
     log_level: str = "INFO" 
 
+    # On-demand request profiling, the admin endpoints are only mounted when enabled
+    profiling_enabled: bool = False
+    profiling_output_dir: str = "profiles"
+    profiling_sample_interval: float = 0.001
+    profiling_tracemalloc_frames: int = 10
+    profiling_memory_top: int = 50
+
     # redis settings
     redis_host: str = "localhost"
     redis_port: int = 6379
     redis_db: int = 0
     redis_password: Optional[str] = None
     redis_ttl: int = 3000 
+    redis_socket_timeout: float = 1.0
+    redis_socket_connect_timeout: float = 1.0
+    redis_retries: int = 1
+    # Comma separated host:port list to shard the cache over, redis_host:redis_port when unset
+    redis_nodes: Optional[str] = None
+    redis_ring_replicas: int = 160
+    # Skip Redis after this many consecutive failures, probing it every recovery timeout
+    redis_breaker_failure_threshold: int = 3
+    redis_breaker_recovery_timeout: float = 5.0
+
+    # Cache key settings
+    # Key on the cleaned model input instead of the raw text
+    cache_key_normalize: bool = False
+    # Model version in the prediction keys, derived from the model files when unset
+    model_version: Optional[str] = None
+
+    # Write-behind: misses return without waiting for their cache write, a background thread stores them in batches
+    cache_write_behind_enabled: bool = False
+    # Buffered writes per worker process, new keys are dropped (not cached) beyond it
+    cache_write_behind_max_pending: int = 10000
+    cache_write_behind_batch_size: int = 256
+    cache_write_behind_flush_interval: float = 0.05
+    # On shutdown write out the buffer within the timeout, or drop it
+    cache_write_behind_flush_on_shutdown: bool = True
+    cache_write_behind_shutdown_timeout: float = 5.0
+
+    # Near-duplicate tier: an exact miss is answered from a cached input with a similar cleaned text
+    similarity_cache_enabled: bool = False
+    # Estimated Jaccard similarity of the cleaned word shingles
+    similarity_cache_threshold: float = 0.8
+    # Indexed inputs per worker process, least recently used ones are dropped beyond it
+    similarity_cache_max_entries: int = 10000
+    similarity_cache_num_perm: int = 128
+    similarity_cache_bands: int = 32
+    similarity_cache_shingle_size: int = 2
+    # Share of similar hits also scored by the model to measure agreement
+    similarity_cache_verify_rate: float = 0.05
+
+    # Cache admission and TTL policy
+    # Only cache keys looked up at least `cache_admission_min_count` times
+    cache_admission_enabled: bool = False
+    cache_admission_min_count: int = 2
+    # Extend the TTL of keys looked up at least `cache_hot_threshold` times
+    cache_adaptive_ttl_enabled: bool = False
+    cache_hot_threshold: int = 8
+    cache_hot_ttl_multiplier: int = 4
+    cache_max_ttl: int = 86400
+    cache_sketch_width: int = 65536
+    cache_sketch_depth: int = 4
+    cache_sketch_reset_after: int = 500000
+    # Memory budget per prediction namespace in bytes, 0 disables it
+    cache_namespace_max_bytes: int = 0
+    cache_eviction_batch_size: int = 64
+
+    # Bulk cache administration (SCAN + UNLINK)
+    cache_admin_scan_count: int = 1000
+    cache_admin_batch_size: int = 500
+    # Seconds to sleep between UNLINK batches, leaves Redis to live traffic
+    cache_admin_batch_pause: float = 0.0
+
+    # Cache warm-up
+    # Source is a JSON lines traffic file, or "keyspace" to re-score cached inputs
+    cache_warmup_on_startup: bool = False
+    cache_warmup_source: Optional[str] = None
+    cache_warmup_top_n: int = 1000
+    cache_warmup_batch_size: int = 64
+    # Predictions per second, keeps the warm-up from starving live traffic
+    cache_warmup_max_rate: float = 200.0
+    # Only one worker process runs the startup warm-up, the others skip it for this many seconds
+    cache_warmup_lock_ttl: int = 600
+
+    # Batch jobs
+    # "redis", or "local" for an in-process queue drained by in-process workers
+    job_backend: str = "redis"
+    job_chunk_size: int = 500
+    job_max_attempts: int = 3
+    job_result_ttl: int = 86400
+    job_poll_timeout: float = 5.0
+    # A worker silent for longer is presumed dead and the chunk it held is queued again
+    job_worker_heartbeat_ttl: int = 60
+    # Worker threads inside the API process, 0 leaves jobs to `python -m app.services.job_worker`
+    job_inprocess_workers: int = 0
+    job_worker_processes: int = 1
+    job_worker_nice: int = 10
+
+    # Admission control in front of /api/predict, per worker process
+    # Cache hits skip it, misses score in a thread pool limited to max_concurrency
+    admission_enabled: bool = False
+    admission_max_concurrency: int = 4
+    admission_max_queue: int = 64
+    # Shed a miss with 503 when its projected or actual queue wait exceeds this many seconds
+    admission_max_wait: float = 2.0
+    # Weight of the newest inference time in the service time average
+    admission_ewma_alpha: float = 0.2
 
     # Ml model settings
     BASE_DIR: ClassVar[Path] = Path(__file__).resolve().parent.parent
     model_path: str = str(BASE_DIR / "models/ml_models/checkpoints/model.pkl")
     vectorizer_path: str = str(BASE_DIR / "models/ml_models/checkpoints/vectorizer.pkl")
+    # Named models in <model_registry_dir>/<name>/<version>/{model,vectorizer}.pkl, loaded on first use
+    model_registry_dir: str = str(BASE_DIR / "models/ml_models/registry")
+    # Estimated memory of the resident models, least recently used ones are evicted beyond it
+    model_registry_max_bytes: int = 2 * 1024 ** 3
+    model_registry_latency_window: int = 1000
+    model_registry_event_log: int = 100
+    # Seconds a name without version keeps resolving to the latest version found, before the directory is listed again
+    model_registry_latest_ttl: float = 10.0
+    # Minimum linear model confidence for the cascade to skip the forest
     model_threshold: float = 0.5
 
+    # Cascade: cheap linear model first, forest for low-confidence rows
+    cascade_enabled: bool = False
+    cascade_model_path: str = str(BASE_DIR / "models/ml_models/checkpoints/linear_model.pkl")
+    # Share of linear answers also scored by the forest to measure agreement
+    cascade_agreement_sample_rate: float = 0.05
+
+    # Shadow scoring: a candidate model scores a sample of live requests off the response path
+    shadow_enabled: bool = False
+    shadow_model_path: Optional[str] = None
+    # Unset reuses the primary vectorizer
+    shadow_vectorizer_path: Optional[str] = None
+    shadow_sample_rate: float = 0.1
+    shadow_workers: int = 1
+    # Samples waiting for the candidate beyond this are dropped
+    shadow_max_pending: int = 256
+    shadow_latency_window: int = 1000
+    shadow_nice: int = 10
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -5,3 +5,15 @@ class CustomException(Exception):
         self.status_code = status_code
         self.details = details 
         super().__init__(self.message)
+
+
+class OverloadedError(CustomException):
+    def __init__(self, message: str, retry_after: int, reason: str):
+        self.retry_after = retry_after
+        self.reason = reason
+        super().__init__(message, status_code = 503, details = reason)
+
+
+class ModelNotFoundError(CustomException):
+    def __init__(self, message: str, details: str = None):
+        super().__init__(message, status_code = 404, details = details)
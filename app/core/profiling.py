@@ -0,0 +1,211 @@
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional, Dict, Any
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("profiling")
+
+class StackSampler:
+    """Samples the stack of one thread at a fixed interval, collapsed flamegraph style"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    @contextmanager
+    def sample(self):
+        target = threading.get_ident()
+        done = threading.Event()
+
+        def run():
+            while not done.wait(self.interval):
+                frame = sys._current_frames().get(target)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+        sampler = threading.Thread(target = run, name = "stack-sampler", daemon = True)
+        sampler.start()
+        try:
+            yield
+        finally:
+            done.set()
+            sampler.join()
+
+    def dump(self, path: str) -> None:
+        with open(path, "w", encoding = "utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+class RequestProfiler:
+    """On-demand profiler for live requests
+
+    Armed for the next N requests or for T seconds on the worker that
+    receives the call. What is profiled is the synchronous scoring of a
+    cache miss, in the thread that runs it, one request at a time: never the
+    event loop, where other requests' coroutines would land in the profile.
+    Requests only pay for it while it is armed: the hook is a single
+    attribute check otherwise.
+    """
+
+    def __init__(self):
+        self.active = False
+        self.mode: Optional[str] = None
+        self.memory = False
+        self.remaining: Optional[int] = None
+        self.deadline: Optional[float] = None
+        self.profiled_requests = 0
+        self.outputs: Dict[str, str] = {}
+        self._profiler: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def arm(self, requests: Optional[int] = None, seconds: Optional[float] = None, mode: str = "cprofile", memory: bool = False) -> Dict[str, Any]:
+        """Profile the next `requests` requests, or every request for `seconds`"""
+        with self._lock:
+            if self.active:
+                raise RuntimeError("Profiler is already armed")
+            self.mode = mode
+            self.memory = memory
+            self.remaining = requests
+            self.deadline = time.time() + seconds if seconds else None
+            self.profiled_requests = 0
+            self.outputs = {}
+            self._profiler = cProfile.Profile() if mode == "cprofile" else None
+            self._sampler = StackSampler(settings.profiling_sample_interval) if mode == "sampling" else None
+            if memory:
+                tracemalloc.start(settings.profiling_tracemalloc_frames)
+            if seconds:
+                self._timer = threading.Timer(seconds, self._expire)
+                self._timer.daemon = True
+                self._timer.start()
+            self.active = True
+
+        logger.warning(f"Profiler armed: mode {mode}, requests {requests}, seconds {seconds}, memory {memory}")
+        return self.status()
+
+    @contextmanager
+    def profile(self):
+        """Profile one request's synchronous work in the calling thread, skipped when another request is being profiled already"""
+        if not self.active or not self._busy.acquire(blocking = False):
+            yield
+            return
+        if not self.active:
+            # Finished between the check and the acquire
+            self._busy.release()
+            yield
+            return
+        try:
+            if self._profiler is not None:
+                self._profiler.enable()
+                try:
+                    yield
+                finally:
+                    self._profiler.disable()
+            else:
+                with self._sampler.sample():
+                    yield
+        finally:
+            self.profiled_requests += 1
+            if self.remaining is not None:
+                self.remaining -= 1
+            # Still holding _busy, so nothing dumps or clears the profilers under this request
+            try:
+                if self._expired():
+                    self._finish()
+            finally:
+                self._busy.release()
+
+    def _expired(self) -> bool:
+        if self.remaining is not None and self.remaining <= 0:
+            return True
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def _expire(self) -> None:
+        """Deadline reached, finish unless a request is being profiled, that request finishes on its way out"""
+        if not self._busy.acquire(blocking = False):
+            return
+        try:
+            self._finish()
+        finally:
+            self._busy.release()
+
+    def _finish(self) -> None:
+        # Callers hold _busy
+        with self._lock:
+            if not self.active:
+                return
+            self.active = False
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            os.makedirs(settings.profiling_output_dir, exist_ok = True)
+            stem = os.path.join(settings.profiling_output_dir, f"profile_{os.getpid()}_{time.strftime('%Y%m%d_%H%M%S')}")
+            if self._profiler is not None:
+                self._profiler.dump_stats(f"{stem}.pstats")
+                self.outputs["profile"] = f"{stem}.pstats"
+            elif self._sampler is not None:
+                self._sampler.dump(f"{stem}.folded")
+                self.outputs["profile"] = f"{stem}.folded"
+
+            if self.memory:
+                # Leave out what the profilers themselves allocate
+                snapshot = tracemalloc.take_snapshot().filter_traces([
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, cProfile.__file__)
+                ])
+                tracemalloc.stop()
+                with open(f"{stem}.memory.txt", "w", encoding = "utf-8") as f:
+                    for stat in snapshot.statistics("lineno")[:settings.profiling_memory_top]:
+                        f.write(f"{stat}\n")
+                self.outputs["memory"] = f"{stem}.memory.txt"
+
+            self._profiler = None
+            self._sampler = None
+
+        logger.warning(f"Profiler finished after {self.profiled_requests} requests: {self.outputs}")
+
+    def summary(self, limit: int = 30) -> Optional[str]:
+        """Top functions by cumulative time of the last cProfile output"""
+        path = self.outputs.get("profile")
+        if path is None or not path.endswith(".pstats"):
+            return None
+        from io import StringIO
+        stream = StringIO()
+        pstats.Stats(path, stream = stream).sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def status(self) -> Dict[str, Any]:
+        if self.active and self.deadline is not None and time.time() >= self.deadline:
+            self._expire()
+        return {
+            "pid": os.getpid(),
+            "active": self.active,
+            "mode": self.mode,
+            "memory": self.memory,
+            "remaining_requests": self.remaining,
+            "seconds_left": max(0.0, self.deadline - time.time()) if self.active and self.deadline else None,
+            "profiled_requests": self.profiled_requests,
+            "outputs": self.outputs
+        }
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,80 @@
+import os
+import math
+from typing import List, Optional
+
+from app.core.logging import get_logger
+
+logger = get_logger("runtime")
+
+# Native thread pools used by numpy/scipy/sklearn, read once when the libraries load
+THREAD_ENV_VARS = [
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+]
+
+def available_cpus() -> List[int]:
+    """CPUs this process may run on"""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """CPU quota of the container (cgroup v2 or v1), None when unlimited"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+            if quota != "max":
+                return int(quota) / int(period)
+            return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+def effective_cpu_count() -> int:
+    """Usable CPUs, honouring both affinity and the container quota"""
+    count = len(available_cpus())
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        count = min(count, max(1, math.ceil(limit)))
+    return count
+
+def default_worker_count(threads_per_worker: int = 1) -> int:
+    """One worker per `threads_per_worker` usable CPUs"""
+    return max(1, effective_cpu_count() // max(1, threads_per_worker))
+
+def limit_thread_env(threads: int) -> None:
+    """Cap native thread pools through the environment, must run before numpy is imported"""
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    # joblib/loky sizes its process pools from this
+    os.environ["LOKY_MAX_CPU_COUNT"] = str(threads)
+
+def apply_thread_limits(threads: int) -> None:
+    """Cap native thread pools that are already loaded in this process"""
+    limit_thread_env(threads)
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits = threads)
+    except ImportError:
+        logger.warning("threadpoolctl is not installed, relying on environment thread limits")
+
+def pin_to_cpu(slot: int) -> Optional[int]:
+    """Pin the current process to one of the available CPUs, returns the CPU"""
+    cpus = available_cpus()
+    if not hasattr(os, "sched_setaffinity") or not cpus:
+        return None
+    cpu = cpus[slot % len(cpus)]
+    os.sched_setaffinity(0, {cpu})
+    return cpu
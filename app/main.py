@@ -7,7 +7,14 @@ from app.core.config import settings
 from app.core.logging import get_logger, setup_logging
 from app.api.routes import health
 from app.api.routes import predictions
+from app.api.routes import jobs
+from app.api.routes import admin
 from app.core.exceptions import CustomException
+from app.services.warmup_service import cache_warmer
+from app.services.job_worker import start_inprocess_workers
+from app.services.ml_service import ml_service
+from app.services.cache_service import cache_service
+from app.services.write_behind import cache_writer
 
 # Setup logging 
 logger = get_logger("api") 
@@ -17,8 +24,22 @@ async def lifespan(app: FastAPI):
     setup_logging() 
     # Startup logic
     logger.info(f"Starting {settings.app_name} v{settings.app_version}")
+    cache_service.connect()
+    if settings.cache_warmup_on_startup and settings.cache_warmup_source:
+        # Every pre-forked worker runs the lifespan, only one of them warms
+        cache_warmer.start(elect = True)
+    job_workers = start_inprocess_workers(settings.job_inprocess_workers)
     yield
     # Shutdown logic
+    for worker in job_workers:
+        worker.stop()
+    if ml_service.shadow is not None:
+        ml_service.shadow.stop()
+    if settings.cache_write_behind_enabled:
+        cache_writer.stop(
+            flush = settings.cache_write_behind_flush_on_shutdown, 
+            timeout = settings.cache_write_behind_shutdown_timeout
+        )
     logger.info("Shutting down application")
 
 def create_application() -> FastAPI:
@@ -65,6 +86,9 @@ def create_application() -> FastAPI:
     # Include routers
     app.include_router(health.router, prefix = settings.api_prefix, tags = ["health"])
     app.include_router(predictions.router, prefix = settings.api_prefix, tags = ["predictions"])
+    app.include_router(jobs.router, prefix = settings.api_prefix, tags = ["jobs"])
+    if settings.profiling_enabled:
+        app.include_router(admin.router, prefix = settings.api_prefix, tags = ["admin"])
 
     return app 
 
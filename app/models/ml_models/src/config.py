@@ -7,6 +7,10 @@ eval_path = Path("data/processed/eval.csv")
 test_path = Path("data/processed/test.csv") 
 model_saving_path = Path("models/model.pkl")
 vectorizer_saving_path = Path("models/vectorizer.pkl") 
+linear_model_saving_path = Path("models/linear_model.pkl")
+eval_report_path = Path("reports/eval_report.json")
+compressed_models_path = Path("models/compressed")
+compression_report_path = Path("reports/compression_report.json")
 
 # Ensure folders exist, not files
 raw_data_path.parent.mkdir(parents = True, exist_ok = True)
@@ -16,5 +20,16 @@ eval_path.parent.mkdir(parents = True, exist_ok = True)
 test_path.parent.mkdir(parents = True, exist_ok = True)
 model_saving_path.parent.mkdir(parents = True, exist_ok = True)
 vectorizer_saving_path.parent.mkdir(parents = True, exist_ok = True) 
+eval_report_path.parent.mkdir(parents = True, exist_ok = True)
+compressed_models_path.mkdir(parents = True, exist_ok = True)
 
-g_drive_link = "1a05UwEeg1_vAZojx0eBAE_4qX4Fs9vYY"
\ No newline at end of file
+g_drive_link = "1a05UwEeg1_vAZojx0eBAE_4qX4Fs9vYY"
+
+# Deduplication: exact duplicates are always dropped, near duplicates are
+# found with MinHash LSH and either kept in one split ("group") or dropped.
+# Off by default so existing pipeline runs keep their split
+near_dedup_enabled = False
+near_dedup_threshold = 0.8
+near_dedup_action = "group"
+minhash_num_perm = 64
+minhash_bands = 8
\ No newline at end of file
@@ -0,0 +1,121 @@
+import numpy as np
+from scipy import sparse
+
+class CompactForest:
+    """Flattened, optionally pruned RandomForest for serving
+
+    All trees are packed into shared node arrays with downcast thresholds and
+    leaf probabilities, and only the feature columns some split uses are kept.
+    Prediction walks every tree for a whole batch at once with numpy.
+    """
+
+    def __init__(self, forest, n_estimators = None, max_depth = None, dtype = np.float32):
+        estimators = forest.estimators_[:n_estimators] if n_estimators else forest.estimators_
+        self.classes_ = forest.classes_
+        self.n_features_in_ = forest.n_features_in_
+        self.n_estimators = len(estimators)
+        self.max_depth = max_depth
+        self.dtype = np.dtype(dtype)
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        depth_reached = 0
+        offset = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            left, right = tree.children_left, tree.children_right
+            feature, threshold, value = tree.feature, tree.threshold, tree.value[:, 0, :]
+            nodes, depths = self._reachable_nodes(left, right, max_depth)
+            depth_reached = max(depth_reached, max(depths))
+            position = {node: offset + i for i, node in enumerate(nodes)}
+
+            for node, depth in zip(nodes, depths):
+                is_leaf = left[node] == -1 or (max_depth is not None and depth >= max_depth)
+                features.append(-1 if is_leaf else feature[node])
+                thresholds.append(0.0 if is_leaf else threshold[node])
+                lefts.append(-1 if is_leaf else position[left[node]])
+                rights.append(-1 if is_leaf else position[right[node]])
+                values.append(value[node] / value[node].sum())
+
+            roots.append(offset)
+            offset += len(nodes)
+
+        # Keep only the columns some split looks at, remapped to a dense range
+        features = np.asarray(features, dtype = np.int64)
+        self.features_used_ = np.unique(features[features >= 0])
+        remap = np.full(self.n_features_in_, -1, dtype = np.int64)
+        remap[self.features_used_] = np.arange(self.features_used_.size)
+        feature_dtype = np.int16 if self.features_used_.size < np.iinfo(np.int16).max else np.int32
+
+        self.feature_ = np.where(features >= 0, remap[np.maximum(features, 0)], -1).astype(feature_dtype)
+        self.threshold_ = self._round_down(np.asarray(thresholds, dtype = np.float64), self.dtype)
+        self.left_ = np.asarray(lefts, dtype = np.int32)
+        self.right_ = np.asarray(rights, dtype = np.int32)
+        self.value_ = np.asarray(values, dtype = self.dtype)
+        self.roots_ = np.asarray(roots, dtype = np.int32)
+        self.depth_ = depth_reached
+
+    @staticmethod
+    def _reachable_nodes(left, right, max_depth):
+        """Nodes in breadth-first order with their depth, stopping at max_depth"""
+        nodes, depths = [0], [0]
+        i = 0
+        while i < len(nodes):
+            node, depth = nodes[i], depths[i]
+            if left[node] != -1 and (max_depth is None or depth < max_depth):
+                nodes.extend([left[node], right[node]])
+                depths.extend([depth + 1, depth + 1])
+            i += 1
+        return nodes, depths
+
+    @staticmethod
+    def _round_down(thresholds, dtype):
+        """Downcast thresholds without moving any above its float64 value
+
+        Trees send `x <= threshold` left with x in float32, so rounding towards
+        -inf keeps float32 thresholds exact. float16 is an approximation.
+        """
+        downcast = thresholds.astype(dtype)
+        too_high = downcast.astype(np.float64) > thresholds
+        downcast[too_high] = np.nextafter(downcast[too_high], dtype.type(-np.inf))
+        return downcast
+
+    def _dense_used_columns(self, X):
+        if sparse.issparse(X):
+            return X.tocsc()[:, self.features_used_].toarray().astype(np.float32)
+        return np.asarray(X, dtype = np.float32)[:, self.features_used_]
+
+    def _walk(self, X):
+        """Leaf reached by every row in every tree and its depth, both shaped (rows, trees)"""
+        X = self._dense_used_columns(X)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots_, (X.shape[0], self.roots_.size)).copy()
+        depths = np.zeros(nodes.shape, dtype = np.int32)
+        threshold = self.threshold_.astype(np.float32)
+
+        for _ in range(self.depth_):
+            feature = self.feature_[nodes]
+            internal = feature >= 0
+            if not internal.any():
+                break
+            go_left = X[rows, np.maximum(feature, 0)] <= threshold[nodes]
+            nodes = np.where(internal, np.where(go_left, self.left_[nodes], self.right_[nodes]), nodes)
+            depths += internal
+        return nodes, depths
+
+    def predict_proba(self, X, batch_size = 4096):
+        probabilities = []
+        for start in range(0, X.shape[0], batch_size):
+            leaves, _ = self._walk(X[start:start + batch_size])
+            probabilities.append(self.value_[leaves].astype(np.float64).mean(axis = 1))
+        return np.vstack(probabilities)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis = 1)]
+
+    def traversal_depths(self, X):
+        """Depth of the leaf each row reaches in each tree, shape (rows, trees)"""
+        return self._walk(X)[1]
+
+    @property
+    def node_count(self):
+        return int(self.feature_.size)
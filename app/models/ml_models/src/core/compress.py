@@ -0,0 +1,137 @@
+import io
+import copy
+import json
+import time
+import argparse
+import joblib
+import numpy as np
+from pathlib import Path
+from sklearn.metrics import accuracy_score
+from app.core.logging import get_logger, setup_logging
+from app.models.ml_models.src.core.compact_forest import CompactForest
+from app.models.ml_models.src.core.harness import load_split, latency_summary, per_row_latency
+from app.models.ml_models.src.config import (
+    eval_path,
+    model_saving_path,
+    vectorizer_saving_path,
+    compressed_models_path,
+    compression_report_path
+)
+
+setup_logging()
+logger = get_logger("ml")
+
+# Compression levels, from exact to aggressive
+DEFAULT_LEVELS = [
+    {"name": "float32", "n_estimators": None, "max_depth": None, "dtype": "float32"},
+    {"name": "trees50_float32", "n_estimators": 50, "max_depth": None, "dtype": "float32"},
+    {"name": "trees50_depth24_float16", "n_estimators": 50, "max_depth": 24, "dtype": "float16"},
+    {"name": "trees25_depth16_float16", "n_estimators": 25, "max_depth": 16, "dtype": "float16"},
+]
+
+def serialized_size(obj):
+    """Bytes taken by the object once dumped with joblib"""
+    buffer = io.BytesIO()
+    joblib.dump(obj, buffer)
+    return buffer.tell()
+
+def compact_vectorizer(vectorizer):
+    """Copy of a fitted TfidfVectorizer without the `stop_words_` introspection set
+
+    With max_features the set holds every term that was cut from the
+    vocabulary and dominates the pickle. Trimming the vocabulary itself to the
+    terms the forest uses would change the l2 normalization of every vector,
+    so the forest selects its columns after the transform instead.
+    """
+    compact = copy.copy(vectorizer)
+    if hasattr(compact, "stop_words_"):
+        compact.stop_words_ = None
+    return compact
+
+def measure(model, X, y, latency_rows = 200, batch_size = 256):
+    """Accuracy, batch throughput and single-row latency of a model"""
+    t0 = time.perf_counter()
+    y_pred = np.concatenate([model.predict(X[i:i + batch_size]) for i in range(0, X.shape[0], batch_size)])
+    duration = time.perf_counter() - t0
+    return {
+        "accuracy": float(accuracy_score(y, y_pred)),
+        "rows_per_second": float(X.shape[0] / duration) if duration else 0.0,
+        "per_row": latency_summary(per_row_latency(model, X, latency_rows))
+    }
+
+def compress_model(model, vectorizer, X_eval, y_eval, levels = None, output_dir = compressed_models_path):
+    """Write one servable model/vectorizer pair per compression level and report their trade-offs"""
+    levels = levels or DEFAULT_LEVELS
+    output_dir = Path(output_dir)
+
+    vectorizer_compact = compact_vectorizer(vectorizer)
+    baseline = {
+        "name": "original",
+        "model_bytes": serialized_size(model),
+        "vectorizer_bytes": serialized_size(vectorizer),
+        "node_count": int(sum(estimator.tree_.node_count for estimator in model.estimators_)),
+        **measure(model, X_eval, y_eval)
+    }
+    logger.info(f"Original model: {baseline['model_bytes'] / 1e6:.1f} MB, accuracy {baseline['accuracy']:.4f}")
+
+    report = {"baseline": baseline, "levels": []}
+    for level in levels:
+        compact = CompactForest(
+            model,
+            n_estimators = level["n_estimators"],
+            max_depth = level["max_depth"],
+            dtype = np.dtype(level["dtype"])
+        )
+
+        level_dir = output_dir / level["name"]
+        level_dir.mkdir(parents = True, exist_ok = True)
+        joblib.dump(compact, level_dir / "model.pkl")
+        joblib.dump(vectorizer_compact, level_dir / "vectorizer.pkl")
+
+        result = {
+            **level,
+            "model_path": str(level_dir / "model.pkl"),
+            "vectorizer_path": str(level_dir / "vectorizer.pkl"),
+            "model_bytes": (level_dir / "model.pkl").stat().st_size,
+            "vectorizer_bytes": (level_dir / "vectorizer.pkl").stat().st_size,
+            "node_count": compact.node_count,
+            "features_used": int(compact.features_used_.size),
+            **measure(compact, X_eval, y_eval)
+        }
+        result["size_ratio"] = result["model_bytes"] / baseline["model_bytes"]
+        result["accuracy_delta"] = result["accuracy"] - baseline["accuracy"]
+        report["levels"].append(result)
+        logger.info(
+            f"Level {level['name']}: {result['model_bytes'] / 1e6:.1f} MB ({result['size_ratio']:.1%}), "
+            f"accuracy {result['accuracy']:.4f} ({result['accuracy_delta']:+.4f})"
+        )
+
+    with open(compression_report_path, "w", encoding = "utf-8") as f:
+        json.dump(report, f, indent = 2)
+    logger.info(f"Saved compression report at {compression_report_path}")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description = "Compress the trained RandomForest into smaller serving models")
+    parser.add_argument("--levels", default = None, help = "Comma separated level names, defaults to all levels")
+    args = parser.parse_args()
+
+    levels = DEFAULT_LEVELS
+    if args.levels:
+        names = args.levels.split(",")
+        levels = [level for level in DEFAULT_LEVELS if level["name"] in names]
+
+    X_eval, y_eval = load_split(eval_path)
+    model = joblib.load(model_saving_path)
+    vectorizer = joblib.load(vectorizer_saving_path)
+    report = compress_model(model, vectorizer, X_eval, y_eval, levels)
+
+    print(f"{'level':<26} {'MB':>8} {'accuracy':>9} {'rows/s':>10} {'p50 ms':>8}")
+    for result in [report["baseline"], *report["levels"]]:
+        print(
+            f"{result['name']:<26} {result['model_bytes'] / 1e6:>8.2f} {result['accuracy']:>9.4f} "
+            f"{result['rows_per_second']:>10.0f} {result['per_row'].get('p50_ms', 0):>8.3f}"
+        )
+
+if __name__ == "__main__":
+    main()
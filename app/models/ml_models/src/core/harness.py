@@ -0,0 +1,218 @@
+import json
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from scipy import sparse
+from sklearn.metrics import accuracy_score, precision_recall_fscore_support, confusion_matrix
+from app.core.logging import get_logger, setup_logging
+from app.models.ml_models.src.features.preprocessing import clean_text
+from app.models.ml_models.src.config import (
+    eval_path,
+    test_path,
+    preprocessed_data_path,
+    model_saving_path,
+    vectorizer_saving_path,
+    eval_report_path
+)
+
+setup_logging()
+logger = get_logger("ml")
+
+def load_split(path):
+    """Load a vectorized split as a float32 CSR matrix, the form the vectorizer produces at serving time"""
+    try:
+        df = pd.read_csv(path, engine = "pyarrow")
+    except ImportError:
+        df = pd.read_csv(path)
+    y = df.pop("Sentiment").to_numpy()
+    X = sparse.csr_matrix(df.to_numpy(dtype = np.float32))
+    return X, y
+
+def latency_summary(seconds):
+    """Percentiles of a list of durations, in milliseconds"""
+    ms = np.asarray(seconds) * 1000
+    if ms.size == 0:
+        return {}
+    return {
+        "count": int(ms.size),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max())
+    }
+
+def score_in_batches(model, X, batch_size):
+    """Predict probabilities batch by batch, timing every batch"""
+    probabilities, batch_times = [], []
+    for start in range(0, X.shape[0], batch_size):
+        batch = X[start:start + batch_size]
+        t0 = time.perf_counter()
+        probabilities.append(model.predict_proba(batch))
+        batch_times.append(time.perf_counter() - t0)
+    return np.vstack(probabilities), batch_times
+
+def per_row_latency(model, X, rows):
+    """Single-row predict_proba latency, as paid by one interactive request"""
+    times = []
+    for i in range(min(rows, X.shape[0])):
+        t0 = time.perf_counter()
+        model.predict_proba(X[i])
+        times.append(time.perf_counter() - t0)
+    return times
+
+def calibration_report(y, probabilities, classes, n_bins = 10):
+    """Expected calibration error, multi-class Brier score and a reliability table"""
+    confidence = probabilities.max(axis = 1)
+    predicted = classes[probabilities.argmax(axis = 1)]
+    correct = predicted == y
+
+    bins = []
+    ece = 0.0
+    edges = np.linspace(0.0, 1.0, n_bins + 1)
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        mask = (confidence > lo) & (confidence <= hi)
+        if not mask.any():
+            continue
+        accuracy, mean_confidence = float(correct[mask].mean()), float(confidence[mask].mean())
+        ece += mask.mean() * abs(accuracy - mean_confidence)
+        bins.append({
+            "range": [float(lo), float(hi)],
+            "count": int(mask.sum()),
+            "accuracy": accuracy,
+            "mean_confidence": mean_confidence
+        })
+
+    one_hot = (y[:, None] == classes[None, :]).astype(np.float64)
+    brier = float(((probabilities - one_hot) ** 2).sum(axis = 1).mean())
+    return {"expected_calibration_error": float(ece), "brier_score": brier, "reliability": bins}
+
+def tree_depth_profile(model, X):
+    """Distribution of the depth each row reaches in each tree of the forest"""
+    if hasattr(model, "traversal_depths"):
+        depths = model.traversal_depths(X).ravel()
+        trees = model.n_estimators
+    elif hasattr(model, "estimators_") and hasattr(model.estimators_[0], "decision_path"):
+        depths = np.concatenate([
+            np.asarray(tree.decision_path(X).sum(axis = 1)).ravel() - 1
+            for tree in model.estimators_
+        ])
+        trees = len(model.estimators_)
+    else:
+        return {}
+
+    values, counts = np.unique(depths, return_counts = True)
+    return {
+        "trees": trees,
+        "mean": float(depths.mean()),
+        "p50": float(np.percentile(depths, 50)),
+        "p90": float(np.percentile(depths, 90)),
+        "max": int(depths.max()),
+        "histogram": {int(v): int(c) for v, c in zip(values, counts)}
+    }
+
+def stage_profile(model, vectorizer, texts, batch_size):
+    """Time spent in each serving stage, from raw text to probabilities"""
+    timings = {"clean_text": [], "vectorize": [], "predict_proba": []}
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+
+        t0 = time.perf_counter()
+        cleaned = [clean_text(t) for t in batch]
+        t1 = time.perf_counter()
+        features = vectorizer.transform(cleaned)
+        t2 = time.perf_counter()
+        model.predict_proba(features)
+        t3 = time.perf_counter()
+
+        timings["clean_text"].append(t1 - t0)
+        timings["vectorize"].append(t2 - t1)
+        timings["predict_proba"].append(t3 - t2)
+
+    total = sum(sum(values) for values in timings.values())
+    return {
+        stage: {
+            "total_seconds": float(sum(values)),
+            "share": float(sum(values) / total) if total else 0.0,
+            "per_row_us": float(sum(values) / len(texts) * 1e6) if texts else 0.0
+        }
+        for stage, values in timings.items()
+    }
+
+def evaluate(model, X, y, vectorizer = None, texts = None, batch_size = 256, latency_rows = 200, depth_rows = 2000):
+    """Quality and serving-cost report of a model on a held-out split"""
+    classes = np.asarray(model.classes_)
+
+    t0 = time.perf_counter()
+    probabilities, batch_times = score_in_batches(model, X, batch_size)
+    scoring_seconds = time.perf_counter() - t0
+    y_pred = classes[probabilities.argmax(axis = 1)]
+
+    precision, recall, f1, support = precision_recall_fscore_support(y, y_pred, labels = classes, zero_division = 0)
+    report = {
+        "rows": int(X.shape[0]),
+        "accuracy": float(accuracy_score(y, y_pred)),
+        "per_class": {
+            str(label): {
+                "precision": float(p),
+                "recall": float(r),
+                "f1": float(f),
+                "support": int(s)
+            }
+            for label, p, r, f, s in zip(classes, precision, recall, f1, support)
+        },
+        "confusion_matrix": confusion_matrix(y, y_pred, labels = classes).tolist(),
+        "calibration": calibration_report(y, probabilities, classes),
+        "latency": {
+            "batch_size": batch_size,
+            "rows_per_second": float(X.shape[0] / scoring_seconds) if scoring_seconds else 0.0,
+            "per_batch": latency_summary(batch_times),
+            "per_row": latency_summary(per_row_latency(model, X, latency_rows))
+        },
+        "tree_depth": tree_depth_profile(model, X[:depth_rows])
+    }
+    if vectorizer is not None and texts:
+        report["stages"] = stage_profile(model, vectorizer, texts, batch_size)
+    return report
+
+def load_raw_texts(rows):
+    """Raw review texts for the stage profile, empty when no preprocessed data is around"""
+    if not Path(preprocessed_data_path).exists():
+        logger.warning(f"{preprocessed_data_path} not found, skipping the stage profile")
+        return []
+    df = pd.read_csv(preprocessed_data_path, usecols = ["Text"], nrows = rows)
+    return df["Text"].dropna().astype(str).tolist()
+
+def main():
+    parser = argparse.ArgumentParser(description = "Evaluate a model on a held-out split, reporting quality and inference cost")
+    parser.add_argument("--split", choices = ["eval", "test"], default = "eval")
+    parser.add_argument("--model", default = str(model_saving_path))
+    parser.add_argument("--vectorizer", default = str(vectorizer_saving_path))
+    parser.add_argument("--batch-size", type = int, default = 256)
+    parser.add_argument("--raw-rows", type = int, default = 2000, help = "Raw texts used for the per-stage profile")
+    parser.add_argument("--output", default = str(eval_report_path))
+    args = parser.parse_args()
+
+    X, y = load_split(eval_path if args.split == "eval" else test_path)
+    logger.info(f"Loaded {args.split} split with {X.shape[0]} rows")
+
+    model = joblib.load(args.model)
+    vectorizer = joblib.load(args.vectorizer) if Path(args.vectorizer).exists() else None
+    logger.info(f"Loaded model {type(model).__name__} from {args.model}")
+
+    report = evaluate(model, X, y, vectorizer, load_raw_texts(args.raw_rows), batch_size = args.batch_size)
+    report.update({"split": args.split, "model_path": args.model, "model_type": type(model).__name__})
+
+    with open(args.output, "w", encoding = "utf-8") as f:
+        json.dump(report, f, indent = 2)
+    logger.info(f"Saved evaluation report at {args.output}")
+
+    print(f"Accuracy: {report['accuracy']:.4f}")
+    print(f"ECE: {report['calibration']['expected_calibration_error']:.4f}, Brier: {report['calibration']['brier_score']:.4f}")
+    print(f"Per row p50: {report['latency']['per_row'].get('p50_ms', 0):.3f} ms, throughput: {report['latency']['rows_per_second']:.0f} rows/s")
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,8 @@ import joblib
 from app.core.logging import get_logger, setup_logging
 from app.models.ml_models.src.features.data_ingestion import load_data
 from sklearn.ensemble import RandomForestClassifier
-from app.models.ml_models.src.config import train_path, model_saving_path 
+from sklearn.linear_model import LogisticRegression
+from app.models.ml_models.src.config import train_path, model_saving_path, linear_model_saving_path
 
 # Setup logging
 setup_logging()
@@ -18,6 +19,17 @@ def train_model(X_train, y_train):
     model.fit(X_train, y_train)
     return model
 
+def train_linear_model(X_train, y_train):
+    """Cheap first stage of the serving cascade, on the same TF-IDF features"""
+    logger.info("Training LogisticRegression cascade model")
+    model = LogisticRegression(
+        max_iter = 1000,
+        class_weight = {0: 2.533, 1: 4.222, 2: 0.422},
+        random_state = 42
+    )
+    model.fit(X_train, y_train)
+    return model
+
 def main():
     # Load the training dataset
     train_df = load_data(train_path)
@@ -35,5 +47,10 @@ def main():
     joblib.dump(model, model_saving_path)
     logger.info(f"Saved the trained model to {model_saving_path}")
 
+    # Train and save the cascade model
+    linear_model = train_linear_model(X_train, y_train)
+    joblib.dump(linear_model, linear_model_saving_path)
+    logger.info(f"Saved the cascade model to {linear_model_saving_path}")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
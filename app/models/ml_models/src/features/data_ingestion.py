@@ -1,13 +1,103 @@
 from pathlib import Path
+from typing import Iterator, Optional
 import pandas as pd
+from app.core.logging import get_logger, setup_logging
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+setup_logging()
+logger = get_logger("ml")
+
+# Columns of Reviews.csv the pipeline reads, every other column is never parsed.
+# Helpfulness counts stay float so that missing values keep their NaN semantics.
+COLUMN_DTYPES = {
+    "HelpfulnessNumerator": "float32",
+    "HelpfulnessDenominator": "float32",
+    "Score": "Int8",
+    "Summary": "string",
+    "Text": "string"
+}
+# Without pyarrow, python-backed strings parse slower than plain objects
+CSV_DTYPES = {column: object if dtype == "string" else dtype for column, dtype in COLUMN_DTYPES.items()}
+PARQUET_BATCH_ROWS = 65536
+
+def parquet_cache_path(path) -> Path:
+    """Parquet cache written next to a raw CSV"""
+    return Path(path).with_suffix(".parquet")
+
+def _arrow_schema():
+    types = {"float32": pa.float32(), "Int8": pa.int8(), "string": pa.string()}
+    return {column: types[dtype] for column, dtype in COLUMN_DTYPES.items()}
+
+def build_parquet_cache(path) -> Optional[Path]:
+    """Convert the needed columns of a raw CSV to Parquet, streaming so the CSV never sits in memory
+
+    The cache is rebuilt whenever the CSV is newer. Returns None without pyarrow.
+    """
+    if pa is None:
+        return None
+    path = Path(path)
+    cache_path = parquet_cache_path(path)
+    if cache_path.exists() and cache_path.stat().st_mtime >= path.stat().st_mtime:
+        return cache_path
+
+    logger.info(f"Converting {path} to the Parquet cache {cache_path}")
+    reader = pa_csv.open_csv(
+        path,
+        read_options = pa_csv.ReadOptions(block_size = 16 << 20),
+        # Review texts contain quoted line breaks, as the pandas reader accepts
+        parse_options = pa_csv.ParseOptions(newlines_in_values = True),
+        # Empty strings are missing values, as they are for pandas.read_csv
+        convert_options = pa_csv.ConvertOptions(
+            include_columns = list(COLUMN_DTYPES),
+            column_types = _arrow_schema(),
+            strings_can_be_null = True
+        )
+    )
+    partial_path = cache_path.with_suffix(".parquet.partial")
+    rows = 0
+    with pq.ParquetWriter(partial_path, reader.schema, compression = "zstd") as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    partial_path.replace(cache_path)
+    logger.info(f"Wrote {rows} rows to {cache_path}")
+    return cache_path
+
+def _to_pandas(table) -> pd.DataFrame:
+    return table.to_pandas(types_mapper = {pa.string(): pd.StringDtype("pyarrow"), pa.int8(): pd.Int8Dtype()}.get)
+
+def read_reviews(path) -> pd.DataFrame:
+    """The needed columns of Reviews.csv with compact dtypes, through the Parquet cache when pyarrow is installed"""
+    cache_path = build_parquet_cache(path)
+    if cache_path is not None:
+        return _to_pandas(pq.read_table(cache_path, columns = list(COLUMN_DTYPES)))
+    return pd.read_csv(path, usecols = list(COLUMN_DTYPES), dtype = CSV_DTYPES)
+
+def iter_reviews(path, chunksize: int = PARQUET_BATCH_ROWS) -> Iterator[pd.DataFrame]:
+    """Same as read_reviews, one chunk of rows at a time"""
+    cache_path = build_parquet_cache(path)
+    if cache_path is not None:
+        for batch in pq.ParquetFile(cache_path).iter_batches(batch_size = chunksize, columns = list(COLUMN_DTYPES)):
+            yield _to_pandas(pa.Table.from_batches([batch]))
+        return
+    yield from pd.read_csv(path, usecols = list(COLUMN_DTYPES), dtype = CSV_DTYPES, chunksize = chunksize)
 
 def load_data(path: str, use_drive: bool = False) -> pd.DataFrame:
     if use_drive:
-        import gdown
         data_save_path = Path("data/raw/Reviews.csv")
-        data_save_path.parent.mkdir(parents = True, exist_ok = True)
-        gdown.download(id = path, output = str(data_save_path), quiet = False)
-        df = pd.read_csv(data_save_path)
+        # Download once, later runs read the local copy through the Parquet cache
+        if not data_save_path.exists():
+            import gdown
+            data_save_path.parent.mkdir(parents = True, exist_ok = True)
+            gdown.download(id = path, output = str(data_save_path), quiet = False)
+        df = read_reviews(data_save_path)
         return df.sample(frac = 0.5, random_state = 42)
     else:
-        return pd.read_csv(path)
\ No newline at end of file
+        # Split CSVs hold vectorized features, not the raw review columns
+        return pd.read_csv(path)
@@ -0,0 +1,85 @@
+import re
+import string
+import numpy as np
+import pandas as pd
+from app.core.logging import get_logger, setup_logging
+from app.utils.hash_utils import fast_hash
+from app.utils.minhash import MinHasher, LSHIndex
+
+setup_logging()
+logger = get_logger("ml")
+
+PUNCTUATION = str.maketrans(string.punctuation, " " * len(string.punctuation))
+
+def normalize_for_dedup(text):
+    """Cheap normalization that makes trivially different copies of a review identical"""
+    return " ".join(re.sub(r"<br\s*/?>", " ", str(text).lower()).translate(PUNCTUATION).split())
+
+def near_duplicate_groups(texts, threshold = 0.8, num_perm = 64, bands = 8):
+    """Group id per text, texts with an estimated Jaccard similarity above the threshold share one
+
+    Every text is checked against the LSH candidates already indexed and
+    joins the group of the most similar one, so groups never chain through
+    texts that are only similar to each other transitively.
+    """
+    hasher = MinHasher(num_perm = num_perm)
+    index = LSHIndex(num_perm = num_perm, bands = bands)
+    signatures = hasher.signatures(texts)
+
+    groups = np.arange(len(texts))
+    for i, signature in enumerate(signatures):
+        matches = index.query(signature, threshold)
+        if matches:
+            groups[i] = groups[matches[0]]
+        else:
+            index.insert(i, signature)
+    return groups
+
+def deduplicate(df, text_column = "Text", near = False, threshold = 0.8, num_perm = 64, bands = 8, near_action = "group"):
+    """Drop exact duplicate reviews and optionally find near duplicates, before any expensive cleaning
+
+    Exact duplicates (same normalized text) keep their first complete row,
+    one without a missing Summary or Score when there is one, since those are
+    dropped later. Near duplicates get a shared `DupGroup` id that the split
+    keeps on one side, or with near_action "drop" only their first row is
+    kept. Without near dedup no `DupGroup` is emitted and the split stays the
+    plain stratified one.
+    """
+    rows = len(df)
+    df = df[df[text_column].notna()].copy()
+    missing = rows - len(df)
+    normalized = df[text_column].map(normalize_for_dedup)
+    df["DupKey"] = normalized.map(fast_hash)
+
+    if "Score" in df:
+        conflicting = int((df.groupby("DupKey")["Score"].nunique() > 1).sum())
+        if conflicting:
+            logger.info(f"{conflicting} duplicated texts carry different scores, keeping the first one")
+
+    # Complete rows first (stable, so otherwise in file order), then keep the first row of every key
+    required = [column for column in ("Summary", "Score") if column in df]
+    incomplete = ~df[required].notna().all(axis = 1).to_numpy() if required else np.zeros(len(df), dtype = bool)
+    order = np.argsort(incomplete, kind = "stable")
+    first = np.zeros(len(df), dtype = bool)
+    first[order] = ~df["DupKey"].iloc[order].duplicated(keep = "first").to_numpy()
+    df, normalized = df[first], normalized[first]
+    report = {"rows": rows, "missing_text": missing, "exact_removed": int((~first).sum())}
+    logger.info(f"Exact dedup removed {report['exact_removed']} of {rows} rows ({report['exact_removed'] / max(rows, 1):.1%})")
+
+    if near:
+        groups = near_duplicate_groups(normalized.tolist(), threshold, num_perm, bands)
+        df["DupGroup"] = df["DupKey"].to_numpy()[groups]
+        grouped = df["DupGroup"].duplicated(keep = False)
+        report["near_duplicate_rows"] = int(grouped.sum())
+        report["near_duplicate_groups"] = int(df.loc[grouped, "DupGroup"].nunique())
+        if near_action == "drop":
+            before = len(df)
+            df = df.drop_duplicates(subset = "DupGroup", keep = "first")
+            report["near_removed"] = before - len(df)
+        logger.info(
+            f"Near dedup found {report['near_duplicate_rows']} rows in {report['near_duplicate_groups']} groups"
+            + (f", removed {report['near_removed']}" if "near_removed" in report else ", kept on one side of the split")
+        )
+
+    report["rows_left"] = len(df)
+    return df.drop(columns = ["DupKey"]), report
@@ -9,8 +9,10 @@ from sklearn.model_selection import train_test_split
 from sklearn.feature_extraction.text import TfidfVectorizer
 from tqdm import tqdm 
 from .data_ingestion import load_data
+from .dedup import deduplicate
 from app.core.logging import get_logger, setup_logging
 from ..config import raw_data_path, preprocessed_data_path, train_path, eval_path, test_path, vectorizer_saving_path, g_drive_link
+from ..config import near_dedup_enabled, near_dedup_threshold, near_dedup_action, minhash_num_perm, minhash_bands
 
 # Setup logging
 setup_logging()
@@ -24,6 +26,9 @@ nltk.download('stopwords')
 stop_words = set(stopwords.words("english"))
 lemmatizer = WordNetLemmatizer()
 
+# Bump whenever clean_text changes its output, normalized cache keys are versioned with it
+PREPROCESSING_VERSION = "1"
+
 def clean_text(text):
     text = text.lower()
     text = text.translate(str.maketrans("", "", string.punctuation))
@@ -32,9 +37,22 @@ def clean_text(text):
     tokens = [lemmatizer.lemmatize(word) for word in tokens if word not in stop_words]
     return " ".join(tokens)
 
+def dedup_dataframe(df):
+    """Deduplication stage with the configured near-duplicate settings"""
+    df, _ = deduplicate(
+        df, 
+        near = near_dedup_enabled, 
+        threshold = near_dedup_threshold, 
+        num_perm = minhash_num_perm, 
+        bands = minhash_bands, 
+        near_action = near_dedup_action
+    )
+    return df
+
 def preprocess_dataframe(df):
+    # Ingestion already skips these columns, this only matters for frames read elsewhere
     logger.info("Dropped Unnecessary Columns")
-    df.drop(columns=["Id", "ProductId", "UserId", "ProfileName", "Time"], inplace=True)
+    df.drop(columns=["Id", "ProductId", "UserId", "ProfileName", "Time"], inplace=True, errors="ignore")
 
     logger.info("Dropped Rows with missing values")
     df.dropna(subset=["Text", "Summary", "Score"], inplace=True)
@@ -58,13 +76,36 @@ def preprocess_dataframe(df):
 
     return df
 
+def grouped_train_test_split(X, y, groups, test_size, random_state):
+    """train_test_split that keeps every duplicate group on one side, stratified on each group's first label"""
+    group_labels = y.groupby(groups.to_numpy()).first()
+    _, test_groups = train_test_split(
+        group_labels.index, test_size = test_size, random_state = random_state, stratify = group_labels.to_numpy()
+    )
+    in_test = groups.isin(set(test_groups)).to_numpy()
+    return X[~in_test], X[in_test], y[~in_test], y[in_test], groups[~in_test], groups[in_test]
+
+def log_split_overlap(X_train, X_eval, X_test):
+    """Cleaned texts found in more than one split, the leakage that remains after dedup"""
+    train = set(X_train)
+    eval_overlap = sum(text in train for text in set(X_eval))
+    test_overlap = sum(text in train for text in set(X_test))
+    logger.info(f"Cleaned texts shared with train: eval {eval_overlap}, test {test_overlap}")
+
 def split_and_vectorize(df):
     logger.info("Splitting the data into Train, Eval, and Test sets")
     X = df["Cleaned_Text"]
     y = df["Sentiment"]
 
-    X_train, X_temp, y_train, y_temp = train_test_split(X, y, test_size = 0.3, random_state = 42, stratify = y)
-    X_eval, X_test, y_eval, y_test = train_test_split(X_temp, y_temp, test_size = 0.5, random_state = 42, stratify = y_temp)
+    if "DupGroup" in df:
+        # Duplicate groups from the dedup stage never straddle two splits
+        groups = df["DupGroup"]
+        X_train, X_temp, y_train, y_temp, _, groups_temp = grouped_train_test_split(X, y, groups, test_size = 0.3, random_state = 42)
+        X_eval, X_test, y_eval, y_test, _, _ = grouped_train_test_split(X_temp, y_temp, groups_temp, test_size = 0.5, random_state = 42)
+    else:
+        X_train, X_temp, y_train, y_temp = train_test_split(X, y, test_size = 0.3, random_state = 42, stratify = y)
+        X_eval, X_test, y_eval, y_test = train_test_split(X_temp, y_temp, test_size = 0.5, random_state = 42, stratify = y_temp)
+    log_split_overlap(X_train, X_eval, X_test)
 
     logger.info(f"Train size: {len(X_train)}, Eval size: {len(X_eval)}, Test size: {len(X_test)}")
 
@@ -98,6 +139,7 @@ def save_split_data(X_train, y_train, X_eval, y_eval, X_test, y_test):
 
 def main():
     df = load_data(path = g_drive_link, use_drive = True) 
+    df = dedup_dataframe(df)
     df = preprocess_dataframe(df)
     df.to_csv(preprocessed_data_path, index = False)
     logger.info("Saved the preprocessed data")
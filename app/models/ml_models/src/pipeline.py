@@ -1,12 +1,14 @@
 import joblib
 from app.models.ml_models.src.features.data_ingestion import load_data
-from app.models.ml_models.src.features.preprocessing import preprocess_dataframe, split_and_vectorize, save_split_data
-from app.models.ml_models.src.core.train import train_model
+from app.models.ml_models.src.features.preprocessing import dedup_dataframe, preprocess_dataframe, split_and_vectorize, save_split_data
+from app.models.ml_models.src.core.train import train_model, train_linear_model
 from app.models.ml_models.src.core.evaluate import main as evaluate_model
+from app.models.ml_models.src.core.compress import compress_model
 from app.models.ml_models.src.config import (
     g_drive_link,
     preprocessed_data_path,
-    model_saving_path
+    model_saving_path,
+    linear_model_saving_path
 )
 from app.core.logging import setup_logging, get_logger
 
@@ -19,6 +21,10 @@ def main():
     logger.info("Loading data from Google Drive")
     df = load_data(path=g_drive_link, use_drive=True)
 
+    # Deduplicate before the expensive cleaning
+    logger.info("Deduplicating reviews")
+    df = dedup_dataframe(df)
+
     # Preprocess Data
     logger.info("Preprocessing dataframe")
     df = preprocess_dataframe(df)
@@ -27,7 +33,7 @@ def main():
 
     # Split + Vectorize
     logger.info("Splitting and vectorizing")
-    (X_train, y_train), (X_eval, y_eval), (X_test, y_test), _ = split_and_vectorize(df)
+    (X_train, y_train), (X_eval, y_eval), (X_test, y_test), vectorizer = split_and_vectorize(df)
 
     # Save split datasets
     save_split_data(X_train, y_train, X_eval, y_eval, X_test, y_test)
@@ -40,9 +46,19 @@ def main():
     joblib.dump(model, model_saving_path)
     logger.info(f"Saved trained model at {model_saving_path}")
 
+    # Train Cascade Model
+    logger.info("Training cascade model")
+    linear_model = train_linear_model(X_train, y_train)
+    joblib.dump(linear_model, linear_model_saving_path)
+    logger.info(f"Saved cascade model at {linear_model_saving_path}")
+
     # Evaluate Model
     logger.info("Evaluating model on test dataset")
     evaluate_model()
 
+    # Compress Model for serving
+    logger.info("Compressing model")
+    compress_model(model, vectorizer, X_eval, y_eval)
+
 if __name__ == "__main__":
     main()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Union, List, Dict, Any
+from typing import Optional, Union, List, Dict, Any, Literal
 from datetime import datetime
 
 class HealthResponse(BaseModel):
@@ -10,6 +10,8 @@ class HealthResponse(BaseModel):
 
 class ModelInfo(BaseModel):
     model_type: Optional[str] = None
+    model_name: Optional[str] = None
+    model_version: Optional[str] = None
     prediction_timestamp: Optional[str] = None
 
 class PredictionRequest(BaseModel):
@@ -17,10 +19,14 @@ class PredictionRequest(BaseModel):
         ..., 
         description = "Input text for predictions"
     )
+    model: Optional[str] = Field(
+        None, 
+        description = "Registered model to score with, as name or name@version, the default model when unset"
+    )
 
 class PredictionResponse(BaseModel):
     success: bool
-    prediction: Union[List[float], float, int, str]
+    prediction: Union[List[str], List[float], float, int, str]
     confidence: Optional[float] = None 
     prediction_probabilites: Optional[List[List[float]]] = None
     from_cache: bool
@@ -47,16 +53,90 @@ class CacheStatus(BaseModel):
     used_memory_human: Optional[str] = None
     keyspace_hits: Optional[int] = None
     keyspace_misses: Optional[int] = None
+    policy: Optional[Dict[str, Any]] = None
+    circuit_breaker: Optional[Dict[str, Any]] = None
+    nodes: Optional[Dict[str, Dict[str, Any]]] = None
     error: Optional[str] = None
 
 class ModelStatus(BaseModel):
     status: str
     model_info: Optional[Dict[str, Any]] = None
+    cascade: Optional[Dict[str, Any]] = None
+    shadow: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
 
+class WarmupRequest(BaseModel):
+    source: Optional[str] = Field(
+        None, 
+        description = "\"keyspace\" or the configured traffic file, defaults to the configured source"
+    )
+    top_n: Optional[int] = Field(None, gt = 0)
+
+class WarmupResponse(BaseModel):
+    success: bool
+    started: bool
+    status: Dict[str, Any]
+
+class ProfileRequest(BaseModel):
+    requests: Optional[int] = Field(None, gt = 0, description = "Profile the next N prediction requests")
+    seconds: Optional[float] = Field(None, gt = 0, description = "Profile every prediction request for T seconds")
+    mode: Literal["cprofile", "sampling"] = "cprofile"
+    memory: bool = Field(False, description = "Also take a tracemalloc allocation snapshot")
+
+class ProfileResponse(BaseModel):
+    success: bool
+    status: Dict[str, Any]
+
+class CacheDeleteResponse(BaseModel):
+    success: bool
+    prefix: str
+    deleted: int
+    duration_seconds: float
+
+class CacheInventoryResponse(BaseModel):
+    success: bool
+    prefix: str
+    namespaces: Dict[str, Dict[str, Any]]
+    duration_seconds: float
+
+class CacheTTLRequest(BaseModel):
+    keys: List[str] = Field(..., min_length = 1, max_length = 10000)
+
+class CacheTTLResponse(BaseModel):
+    success: bool
+    ttls: Dict[str, int]
+
+class JobRequest(BaseModel):
+    texts: List[str] = Field(
+        ..., 
+        min_length = 1, 
+        description = "Input texts to score asynchronously"
+    )
+    chunk_size: Optional[int] = Field(None, gt = 0)
+
+class JobResponse(BaseModel):
+    success: bool
+    job_id: str
+    status: str
+    total_items: int
+    total_chunks: int
+    done_chunks: int
+    failed_chunks: int
+    progress: float
+    created_at: float
+    updated_at: float
+
+class JobResultsResponse(JobResponse):
+    offset: int
+    limit: int
+    complete: bool
+    results: List[Optional[Dict[str, Any]]]
+
 class CacheStatsResponse(BaseModel):
     success: bool
     service_status: str
     cache_status: CacheStatus
     model_status: ModelStatus
+    similarity_cache: Optional[Dict[str, Any]] = None
+    write_behind: Optional[Dict[str, Any]] = None
     timestamp: float
\ No newline at end of file
@@ -0,0 +1,62 @@
+import gc
+from app.core.config import settings
+from app.core.runtime import limit_thread_env, default_worker_count, apply_thread_limits, pin_to_cpu
+
+# Thread limits have to be in place before the model libraries are imported
+limit_thread_env(settings.threads_per_worker)
+
+from gunicorn.app.base import BaseApplication
+from app.core.logging import setup_logging, get_logger
+
+setup_logging()
+logger = get_logger("serve")
+
+def pre_fork(server, worker):
+    """Give the new worker the lowest CPU slot not held by a live worker"""
+    taken = {getattr(w, "cpu_slot", None) for w in server.WORKERS.values()}
+    worker.cpu_slot = next(slot for slot in range(len(taken) + 1) if slot not in taken)
+
+def post_fork(server, worker):
+    apply_thread_limits(settings.threads_per_worker)
+    cpu = pin_to_cpu(worker.cpu_slot) if settings.cpu_affinity else None
+    logger.info(f"Worker {worker.pid} started (slot {worker.cpu_slot}, cpu {cpu}, threads {settings.threads_per_worker})")
+
+class PreforkServer(BaseApplication):
+    """Gunicorn pre-fork server running uvicorn workers over a preloaded app
+
+    The app, and with it the model, is loaded once in the master before the
+    workers fork, so their memory is shared copy-on-write.
+    """
+
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import app
+        # Move the loaded objects out of the GC generations so collections in
+        # the workers do not touch, and un-share, their pages
+        gc.freeze()
+        return app
+
+def main():
+    workers = settings.workers or default_worker_count(settings.threads_per_worker)
+    logger.info(f"Starting {workers} workers with {settings.threads_per_worker} threads each")
+
+    PreforkServer({
+        "bind": f"{settings.host}:{settings.port}",
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "timeout": settings.worker_timeout,
+        "pre_fork": pre_fork,
+        "post_fork": post_fork,
+        "logconfig_dict": {"version": 1, "disable_existing_loggers": False},
+    }).run()
+
+if __name__ == "__main__":
+    main()
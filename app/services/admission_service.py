@@ -0,0 +1,150 @@
+import math
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Any, Optional
+
+from app.core.config import settings
+from app.core.exceptions import OverloadedError
+from app.core.logging import get_logger, setup_logging
+
+setup_logging()
+logger = get_logger("admission")
+
+class AdmissionController:
+    """Concurrency limiter with a bounded FIFO queue that sheds load instead of queueing without bound
+
+    At most `max_concurrency` requests run inference at once, up to
+    `max_queue` more wait for a slot. A request is rejected right away when
+    the queue is full or when its projected wait (queue position times the
+    average inference time) exceeds `max_wait`. A queued request that still
+    waits longer than that gives up. Cache hits never enter the queue.
+    State is per worker process and only touched from its event loop.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, max_wait: float, alpha: float = 0.2):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.alpha = alpha
+        self.in_flight = 0
+        self.service_time: Optional[float] = None
+        self.max_queue_depth = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.stats = {
+            "admitted": 0,
+            "queued": 0,
+            "completed": 0,
+            "cache_hits": 0,
+            "shed_queue_full": 0,
+            "shed_deadline": 0,
+            "shed_timeout": 0
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.waiters)
+
+    def projected_wait(self) -> float:
+        """Seconds a request arriving now is expected to wait for a slot"""
+        if self.in_flight < self.max_concurrency and not self.waiters:
+            return 0.0
+        return math.ceil((self.queue_depth + 1) / self.max_concurrency) * (self.service_time or 0.0)
+
+    def record_cache_hit(self) -> None:
+        self.stats["cache_hits"] += 1
+
+    def _shed(self, reason: str, wait: float) -> None:
+        self.stats[f"shed_{reason}"] += 1
+        retry_after = max(1, math.ceil(wait))
+        logger.warning(f"Shedding request ({reason}): in flight {self.in_flight}, queued {self.queue_depth}, projected wait {wait:.3f}s")
+        raise OverloadedError("Server is overloaded, retry later", retry_after = retry_after, reason = reason)
+
+    async def _acquire(self) -> None:
+        if self.in_flight < self.max_concurrency and not self.waiters:
+            self.in_flight += 1
+            self.stats["admitted"] += 1
+            return
+        if self.queue_depth >= self.max_queue:
+            self._shed("queue_full", self.projected_wait())
+        wait = self.projected_wait()
+        if wait > self.max_wait:
+            self._shed("deadline", wait)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self.stats["queued"] += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            await asyncio.wait_for(waiter, timeout = self.max_wait)
+        except asyncio.TimeoutError:
+            # Since Python 3.12 the timeout can win over a slot granted in the same loop iteration
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            else:
+                self._remove(waiter)
+            self._shed("timeout", self.projected_wait())
+        except asyncio.CancelledError:
+            # The client went away, hand on a slot that was already granted
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            else:
+                self._remove(waiter)
+            raise
+        self.stats["admitted"] += 1
+
+    def _remove(self, waiter: asyncio.Future) -> None:
+        try:
+            self.waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _release(self) -> None:
+        # The slot passes straight to the oldest waiter, so in_flight stays the same
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _observe(self, seconds: float) -> None:
+        self.stats["completed"] += 1
+        if self.service_time is None:
+            self.service_time = seconds
+        else:
+            self.service_time += self.alpha * (seconds - self.service_time)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one inference slot, raises OverloadedError when the request is shed"""
+        await self._acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._observe(time.perf_counter() - start)
+            self._release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.admission_enabled,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "max_wait_seconds": self.max_wait,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "service_time_ms": self.service_time * 1000 if self.service_time is not None else None,
+            "projected_wait_seconds": self.projected_wait(),
+            "shed_total": self.stats["shed_queue_full"] + self.stats["shed_deadline"] + self.stats["shed_timeout"],
+            **self.stats
+        }
+
+admission_controller = AdmissionController(
+    max_concurrency = settings.admission_max_concurrency,
+    max_queue = settings.admission_max_queue,
+    max_wait = settings.admission_max_wait,
+    alpha = settings.admission_ewma_alpha
+)
@@ -0,0 +1,260 @@
+import time
+import threading
+from array import array
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging import get_logger, setup_logging
+from app.utils.hash_utils import fast_hash
+
+setup_logging()
+logger = get_logger("cache_policy")
+
+class CountMinSketch:
+    """Approximate per-key access counter with periodic aging"""
+    def __init__(self, width: int, depth: int, reset_after: int):
+        self.width = width
+        self.depth = depth
+        self.reset_after = reset_after
+        self.additions = 0
+        self.table = [array("I", bytes(4 * width)) for _ in range(depth)]
+        # numpy views sharing the rows' memory, for aging the whole table at once
+        self._views = [np.frombuffer(row, dtype = np.uint32) for row in self.table]
+        self._lock = threading.Lock()
+
+    def _indexes(self, key: str) -> List[int]:
+        digest = fast_hash(key)
+        h1, h2 = int(digest[:16], 16), int(digest[16:], 16) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, key: str) -> int:
+        """Count an access and return the new estimate"""
+        indexes = self._indexes(key)
+        with self._lock:
+            estimate = None
+            for row, index in zip(self.table, indexes):
+                row[index] += 1
+                estimate = row[index] if estimate is None else min(estimate, row[index])
+
+            self.additions += 1
+            if self.additions >= self.reset_after:
+                self._age()
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        """Return the estimated access count of the key"""
+        return min(row[index] for row, index in zip(self.table, self._indexes(key)))
+
+    def _age(self):
+        # Halve every counter so that past popularity fades out, one numpy pass per row
+        for view in self._views:
+            view >>= 1
+        self.additions //= 2
+
+class CachePolicy:
+    """Admission, adaptive TTL and per-namespace memory budget for cached predictions
+
+    Access counts are kept per process. The memory budget is tracked in Redis
+    under `_policy:<namespace>:*` keys so that every worker shares it. Sizes of
+    keys that expired on their own stay counted until LRU eviction reaches them,
+    which keeps the budget conservative.
+    """
+    def __init__(self, shards: int = 1):
+        self.admission_enabled = settings.cache_admission_enabled
+        self.adaptive_ttl_enabled = settings.cache_adaptive_ttl_enabled
+        # With a sharded cache every node keeps the bookkeeping of its own keys
+        # and enforces an even share of the namespace budget
+        self.shards = shards
+        # Rounded up, a budget smaller than the node count must not turn into 0, which disables it
+        self.max_bytes = -(-settings.cache_namespace_max_bytes // shards)
+        self.sketch = CountMinSketch(
+            width = settings.cache_sketch_width,
+            depth = settings.cache_sketch_depth,
+            reset_after = settings.cache_sketch_reset_after
+        )
+        self.namespaces = set()
+        self.stats = {
+            "admitted": 0,
+            "rejected": 0,
+            "ttl_extensions": 0,
+            "evictions": 0,
+            "evicted_bytes": 0
+        }
+
+    @property
+    def tracks_access(self) -> bool:
+        return self.admission_enabled or self.adaptive_ttl_enabled
+
+    @staticmethod
+    def namespace(key: str) -> str:
+        """Namespace of a prediction key, everything before the hash"""
+        return key.rsplit(":", 1)[0]
+
+    @staticmethod
+    def _bookkeeping_keys(namespace: str) -> Dict[str, str]:
+        return {
+            "lru": f"_policy:{namespace}:lru",
+            "sizes": f"_policy:{namespace}:sizes",
+            "bytes": f"_policy:{namespace}:bytes"
+        }
+
+    def record_access(self, key: str) -> int:
+        """Count a lookup of the key"""
+        if not self.tracks_access:
+            return 0
+        return self.sketch.add(key)
+
+    def admit(self, key: str) -> bool:
+        """Decide whether a freshly computed prediction is worth caching"""
+        if not self.admission_enabled:
+            return True
+        if self.sketch.estimate(key) >= settings.cache_admission_min_count:
+            self.stats["admitted"] += 1
+            return True
+        self.stats["rejected"] += 1
+        return False
+
+    def hit_ttl(self, key: str) -> Optional[int]:
+        """Extended TTL for a popular key, None when the key keeps its TTL"""
+        if not self.adaptive_ttl_enabled:
+            return None
+        if self.sketch.estimate(key) < settings.cache_hot_threshold:
+            return None
+        return min(settings.redis_ttl * settings.cache_hot_ttl_multiplier, settings.cache_max_ttl)
+
+    def on_hit(self, client, key: str) -> None:
+        """Refresh LRU position and extend the TTL of popular keys in one round trip"""
+        ttl = self.hit_ttl(key)
+        if ttl is None and not self.max_bytes:
+            return
+
+        pipe = client.pipeline(transaction = False)
+        if ttl is not None:
+            pipe.expire(key, ttl)
+            self.stats["ttl_extensions"] += 1
+        if self.max_bytes:
+            pipe.zadd(self._bookkeeping_keys(self.namespace(key))["lru"], {key: time.time()})
+        pipe.execute()
+
+    def track(self, pipe, key: str, size: int) -> None:
+        """Queue the bookkeeping of a stored key on the pipeline that stores it"""
+        if not self.max_bytes:
+            return
+        namespace = self.namespace(key)
+        self.namespaces.add(namespace)
+        keys = self._bookkeeping_keys(namespace)
+        pipe.hget(keys["sizes"], key)
+        pipe.hset(keys["sizes"], key, size)
+        pipe.zadd(keys["lru"], {key: time.time()})
+        pipe.incrby(keys["bytes"], size)
+
+    def enforce_budget(self, client, key: str, tracked: List[Any]) -> int:
+        """Evict least recently used keys of the namespace until it fits the budget"""
+        if not self.max_bytes:
+            return 0
+        namespace = self.namespace(key)
+        old_size, _, _, total = tracked
+        if old_size is not None:
+            total = client.decrby(self._bookkeeping_keys(namespace)["bytes"], int(old_size))
+        return self._evict(client, namespace, total)
+
+    def enforce_bulk_budget(self, client, tracked: Dict[str, List[Any]]) -> int:
+        """Same as enforce_budget for the keys of one bulk store, once per namespace
+
+        The totals in the pipeline replies are stale as soon as the first key
+        of the batch evicts, so every namespace starts from its current total.
+        """
+        if not self.max_bytes:
+            return 0
+        replaced: Dict[str, int] = {}
+        for key, (old_size, _, _, _) in tracked.items():
+            namespace = self.namespace(key)
+            replaced[namespace] = replaced.get(namespace, 0) + int(old_size or 0)
+
+        evicted = 0
+        for namespace, replaced_bytes in replaced.items():
+            keys = self._bookkeeping_keys(namespace)
+            if replaced_bytes:
+                total = client.decrby(keys["bytes"], replaced_bytes)
+            else:
+                total = int(client.get(keys["bytes"]) or 0)
+            evicted += self._evict(client, namespace, total)
+        return evicted
+
+    def _evict(self, client, namespace: str, total: int) -> int:
+        keys = self._bookkeeping_keys(namespace)
+        evicted = 0
+        while total > self.max_bytes:
+            popped = client.zpopmin(keys["lru"], settings.cache_eviction_batch_size)
+            if not popped:
+                break
+            members = [member for member, _ in popped]
+
+            pipe = client.pipeline(transaction = False)
+            pipe.hmget(keys["sizes"], members)
+            pipe.hdel(keys["sizes"], *members)
+            pipe.unlink(*members)
+            sizes = pipe.execute()[0]
+
+            freed = sum(int(size) for size in sizes if size is not None)
+            total = client.decrby(keys["bytes"], freed)
+            evicted += len(members)
+            self.stats["evictions"] += len(members)
+            self.stats["evicted_bytes"] += freed
+
+        if evicted:
+            logger.info(f"Evicted {evicted} keys from namespace {namespace}")
+        return evicted
+
+    def untrack(self, client, keys: List[str]) -> None:
+        """Drop the bookkeeping of deleted keys and give their bytes back to their budget"""
+        if not self.max_bytes or not keys:
+            return
+        by_namespace: Dict[str, List[str]] = {}
+        for key in keys:
+            by_namespace.setdefault(self.namespace(key), []).append(key)
+
+        for namespace, members in by_namespace.items():
+            bookkeeping = self._bookkeeping_keys(namespace)
+            pipe = client.pipeline(transaction = False)
+            pipe.hmget(bookkeeping["sizes"], members)
+            pipe.hdel(bookkeeping["sizes"], *members)
+            pipe.zrem(bookkeeping["lru"], *members)
+            sizes = pipe.execute()[0]
+            freed = sum(int(size) for size in sizes if size is not None)
+            if freed:
+                client.decrby(bookkeeping["bytes"], freed)
+
+    def node_usage(self, client) -> Dict[str, Tuple[int, int]]:
+        """Bytes and key count of every namespace on one node, read with a single pipeline"""
+        namespaces = sorted(self.namespaces)
+        pipe = client.pipeline(transaction = False)
+        for namespace in namespaces:
+            keys = self._bookkeeping_keys(namespace)
+            pipe.get(keys["bytes"])
+            pipe.zcard(keys["lru"])
+        replies = pipe.execute()
+        return {
+            namespace: (int(node_bytes or 0), node_keys)
+            for namespace, node_bytes, node_keys in zip(namespaces, replies[0::2], replies[1::2])
+        }
+
+    def get_stats(self, usages: List[Dict[str, Tuple[int, int]]]) -> Dict[str, Any]:
+        """Admission and eviction counters plus per-namespace memory usage summed over the node usages given"""
+        namespaces = {}
+        for namespace in sorted(self.namespaces):
+            counts = [usage[namespace] for usage in usages if namespace in usage]
+            namespaces[namespace] = {
+                "used_bytes": sum(used_bytes for used_bytes, _ in counts),
+                "max_bytes": self.max_bytes * self.shards,
+                "keys": sum(key_count for _, key_count in counts)
+            }
+
+        return {
+            "admission_enabled": self.admission_enabled,
+            "adaptive_ttl_enabled": self.adaptive_ttl_enabled,
+            **self.stats,
+            "namespaces": namespaces
+        }
@@ -1,137 +1,456 @@
+import re
+import time
 import redis
+from redis.retry import Retry
+from redis.backoff import NoBackoff
 import json 
 import pickle
-from typing import Optional, Any
+from typing import Optional, Any, Dict, List, Tuple, Union, Iterator, Callable
 
 from app.core.config import settings
-from app.core.exceptions import CustomException
 from app.core.logging import get_logger, setup_logging
+from app.services.cache_policy import CachePolicy
+from app.services.circuit_breaker import CircuitBreaker
+from app.utils.hash_ring import HashRing
 
 setup_logging()
 logger = get_logger("cache_service") 
 
-class CacheService:
-    """Redis cache service for storing and retrieving predictions"""
-    def __init__(self):
-        self.client = None 
-        self._connect()
+def create_redis_client(host: Optional[str] = None, port: Optional[int] = None, socket_timeout: Optional[float] = None) -> redis.Redis:
+    """Create a Redis client from the settings, without connecting yet"""
+    return redis.Redis(
+        host = host or settings.redis_host, 
+        port = port or settings.redis_port, 
+        db = settings.redis_db, 
+        password = settings.redis_password, 
+        decode_responses = False, 
+        socket_connect_timeout = settings.redis_socket_connect_timeout, 
+        socket_timeout = socket_timeout or settings.redis_socket_timeout, 
+        # Fail fast, one immediate retry only covers stale pooled connections
+        retry = Retry(NoBackoff(), settings.redis_retries), 
+        health_check_interval = 30
+    )
+
+def escape_glob(text: str) -> str:
+    """Match the text literally in a SCAN MATCH pattern"""
+    return re.sub(r"([*?\[\]\\])", r"\\\1", text)
+
+def parse_nodes(nodes: Optional[str] = None) -> List[Tuple[str, int]]:
+    """host:port pairs of the cache nodes, the single configured Redis when no node list is set"""
+    if not nodes:
+        return [(settings.redis_host, settings.redis_port)]
+    pairs = []
+    for node in nodes.split(","):
+        node = node.strip()
+        if not node:
+            continue
+        host, _, port = node.rpartition(":")
+        pairs.append((host, int(port)) if host else (node, settings.redis_port))
+    return pairs
+
+class CacheNode:
+    """One Redis server of the cache, with its own client and circuit breaker"""
 
-    def _connect(self):
-        """Establish a connection with redis"""
+    def __init__(self, host: str, port: int, client_factory: Callable[..., redis.Redis] = create_redis_client):
+        self.name = f"{host}:{port}"
+        self.client = client_factory(host = host, port = port)
+        self.breaker = CircuitBreaker(
+            name = f"redis {self.name}", 
+            probe = lambda: self.client.ping(), 
+            failure_threshold = settings.redis_breaker_failure_threshold, 
+            recovery_timeout = settings.redis_breaker_recovery_timeout
+        )
+
+    def connect(self) -> None:
+        """Check that the node answers, starting it in degraded mode when it does not"""
         try:
-            self.client = redis.Redis(
-                host = settings.redis_host, 
-                port = settings.redis_port, 
-                db = settings.redis_db, 
-                password = settings.redis_password, 
-                decode_responses = False, 
-                socket_connect_timeout = 5, 
-                socket_timeout = 5, 
-                retry_on_timeout = True, 
-                health_check_interval = 30
-            )
             self.client.ping()
-            logger.info("Successfully connected to Redis")
+            logger.info(f"Successfully connected to Redis {self.name}")
         except Exception as e:
-            logger.error(f"Failed to connect to Redis: {str(e)}")
-            raise CustomException(
-                message = "Cache Service unavailable", 
-                status_code = 503, 
-                details = "Redis Connection Failed"
-            )
+            logger.error(f"Failed to connect to Redis {self.name}, serving its keys without cache: {str(e)}")
+            self.breaker.trip()
+
+class CacheService:
+    """Redis cache service for storing and retrieving predictions
+
+    Keys are spread over one or more Redis nodes with a consistent hash ring,
+    and batched calls are split by node and pipelined per node. Every node has
+    its own circuit breaker: after consecutive failures of a node its keys skip
+    the cache entirely (gets miss, sets are dropped) until a background probe
+    sees it again, while the keys of the other nodes are still cached.
+    Clients come from `client_factory`, called with the host and port of
+    every node. With `connect` off the nodes are only pinged by connect().
+    """
+    def __init__(self, nodes: Optional[str] = None, client_factory: Callable[..., redis.Redis] = create_redis_client, connect: bool = True):
+        self.nodes = [CacheNode(host, port, client_factory) for host, port in parse_nodes(nodes or settings.redis_nodes)]
+        self.nodes_by_name = {node.name: node for node in self.nodes}
+        self.ring = HashRing([node.name for node in self.nodes], replicas = settings.redis_ring_replicas)
+        self.policy = CachePolicy(shards = len(self.nodes))
+        if connect:
+            self.connect()
+
+    def connect(self) -> None:
+        """Ping every node, tripping the breaker of the ones that do not answer"""
+        for node in self.nodes:
+            node.connect()
+
+    def node_for(self, key: str) -> CacheNode:
+        """Node that owns the key"""
+        return self.nodes_by_name[self.ring.node_for(key)]
+
+    def _group(self, keys: List[str]) -> List[Tuple[CacheNode, List[str]]]:
+        return [(self.nodes_by_name[name], node_keys) for name, node_keys in self.ring.group(keys).items()]
         
     def get(self, key: str) -> Optional[Any]:
         """Retrive value from cache"""
+        node = self.node_for(key)
+        if not node.breaker.allow_request():
+            return None
         try:
-            value = self.client.get(key)
+            self.policy.record_access(key)
+            value = node.client.get(key)
             if value is None:
                 logger.debug(f"Cache miss for the key: {key}")
+                node.breaker.record_success()
                 return None 
+            self.policy.on_hit(node.client, key)
+            node.breaker.record_success()
 
-            try:
-                result = json.loads(value.decode("utf-8"))
-                logger.debug(f"Cache hit for key: {key}")
-                return result
-            except (json.JSONDecodeError, UnicodeDecodeError):
-                result = pickle.loads(value)
-                logger.debug(f"Cache hit for key: {key}")
-                return result
+            result = self._deserialize(value)
+            logger.debug(f"Cache hit for key: {key}")
+            return result
         
         except redis.RedisError as e:
-            logger.error(f"Redis get error for the {key}: {str(e)}") 
+            node.breaker.record_failure()
+            logger.error(f"Redis get error for the {key} on {node.name}: {str(e)}") 
             return None
 
+    def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """Retrieve many values with one MGET per node, without access accounting"""
+        found: Dict[str, Any] = {}
+        for node, node_keys in self._group(keys):
+            if not node.breaker.allow_request():
+                continue
+            try:
+                values = node.client.mget(node_keys)
+                node.breaker.record_success()
+                found.update({key: self._deserialize(value) for key, value in zip(node_keys, values) if value is not None})
+            except redis.RedisError as e:
+                node.breaker.record_failure()
+                logger.error(f"Redis bulk get error on {node.name}: {str(e)}")
+        return [found.get(key) for key in keys]
+
+    @staticmethod
+    def _deserialize(value: bytes) -> Any:
+        try:
+            return json.loads(value.decode("utf-8"))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return pickle.loads(value)
+
+    @staticmethod
+    def _serialize(value: Any) -> Tuple[Union[str, bytes], int]:
+        """Serialize a value, returning it with its stored size in bytes"""
+        try:
+            serialized_value = json.dumps(value, default = str)
+            return serialized_value, len(serialized_value.encode("utf-8"))
+        except (TypeError, ValueError):
+            serialized_value = pickle.dumps(value)
+            return serialized_value, len(serialized_value)
+
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
         """stores value in cache"""
+        node = self.node_for(key)
+        if not node.breaker.allow_request():
+            return False
         try:
-            try:
-                serialized_value = json.dumps(value, default = str)
-            except (TypeError, ValueError):
-                serialized_value = pickle.dumps(value)
+            if not self.policy.admit(key):
+                logger.debug(f"Admission policy rejected the key: {key}")
+                return False
 
+            serialized_value, size = self._serialize(value)
             ttl = ttl or settings.redis_ttl
-            result = self.client.setex(key, ttl, serialized_value)
+
+            pipe = node.client.pipeline(transaction = False)
+            pipe.setex(key, ttl, serialized_value)
+            self.policy.track(pipe, key, size)
+            results = pipe.execute()
+            result = results[0]
+            self.policy.enforce_budget(node.client, key, results[1:])
+            node.breaker.record_success()
 
             if result:
                 logger.debug(f"Cached value for the key: {key} (TTL): {ttl}s")
             return result
         
         except redis.RedisError as e:
-            logger.error(f"Redis set error for the key: {str(e)}")
+            node.breaker.record_failure()
+            logger.error(f"Redis set error for the key on {node.name}: {str(e)}")
             return False 
         
+    def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> int:
+        """Store many values with one pipeline per node, bypassing admission"""
+        if not items:
+            return 0
+        ttl = ttl or settings.redis_ttl
+        stored = 0
+        for node, node_keys in self._group(list(items)):
+            if not node.breaker.allow_request():
+                continue
+            try:
+                pipe = node.client.pipeline(transaction = False)
+                for key in node_keys:
+                    serialized_value, size = self._serialize(items[key])
+                    pipe.setex(key, ttl, serialized_value)
+                    self.policy.track(pipe, key, size)
+                results = pipe.execute()
+
+                # Each key queued its SETEX followed by its policy bookkeeping
+                step = len(results) // len(node_keys)
+                tracked = {}
+                for i, key in enumerate(node_keys):
+                    stored += bool(results[i * step])
+                    tracked[key] = results[i * step + 1:(i + 1) * step]
+                self.policy.enforce_bulk_budget(node.client, tracked)
+                node.breaker.record_success()
+
+            except redis.RedisError as e:
+                node.breaker.record_failure()
+                logger.error(f"Redis bulk set error on {node.name}: {str(e)}")
+
+        logger.debug(f"Cached {stored} values in bulk (TTL): {ttl}s")
+        return stored
+
     def delete(self, key: str) -> bool:
         """Deletes key from cache"""
+        node = self.node_for(key)
+        if not node.breaker.allow_request():
+            return False
         try:
-            result = self.client.delete(key)
+            result = node.client.delete(key)
+            node.breaker.record_success()
             logger.debug(f"Deleted key from cache: {key}")
             return bool(result)
         except redis.RedisError as e:
-            logger.error(f"Redis delete error for key {key}: {str(e)}")
+            node.breaker.record_failure()
+            logger.error(f"Redis delete error for key {key} on {node.name}: {str(e)}")
             return False
         
     def exists(self, key: str) -> bool:
         """Chechk if key exists in cache"""
+        node = self.node_for(key)
+        if not node.breaker.allow_request():
+            return False
         try:
-            result = self.client.exists(key)
+            result = node.client.exists(key)
+            node.breaker.record_success()
             return bool(result)
         except redis.RedisError as e:
-            logger.error(f"Redis exists error for key {key}: {str(e)}")
+            node.breaker.record_failure()
+            logger.error(f"Redis exists error for key {key} on {node.name}: {str(e)}")
             return False
         
+    def get_with_ttl(self, key: str) -> Tuple[Optional[Any], int]:
+        """Retrieve a value and its remaining TTL in one round trip, without access accounting"""
+        node = self.node_for(key)
+        if not node.breaker.allow_request():
+            return None, -2
+        try:
+            pipe = node.client.pipeline(transaction = False)
+            pipe.get(key)
+            pipe.ttl(key)
+            value, ttl = pipe.execute()
+            node.breaker.record_success()
+            return (None if value is None else self._deserialize(value)), ttl
+        except redis.RedisError as e:
+            node.breaker.record_failure()
+            logger.error(f"Redis get error for the {key} on {node.name}: {str(e)}")
+            return None, -2
+
+    def get_ttls(self, keys: List[str]) -> Dict[str, int]:
+        """Remaining TTL of many keys with one pipeline per node, -2 for missing keys and -1 for persistent ones"""
+        ttls = {key: -2 for key in keys}
+        for node, node_keys in self._group(keys):
+            if not node.breaker.allow_request():
+                continue
+            try:
+                pipe = node.client.pipeline(transaction = False)
+                for key in node_keys:
+                    pipe.ttl(key)
+                ttls.update(zip(node_keys, pipe.execute()))
+                node.breaker.record_success()
+            except redis.RedisError as e:
+                node.breaker.record_failure()
+                logger.error(f"Redis bulk ttl error on {node.name}: {str(e)}")
+        return ttls
+
+    def _scan_batches(self, node: CacheNode, prefix: str) -> Iterator[List[str]]:
+        """Keys of a node starting with the prefix, in batches, walked with SCAN so Redis never blocks on KEYS"""
+        batch = []
+        for key in node.client.scan_iter(match = f"{escape_glob(prefix)}*", count = settings.cache_admin_scan_count):
+            batch.append(key.decode("utf-8"))
+            if len(batch) >= settings.cache_admin_batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def scan_keys(self, prefix: str) -> Iterator[str]:
+        """Keys starting with the prefix on every reachable node"""
+        for node in self.nodes:
+            if not node.breaker.allow_request():
+                continue
+            try:
+                for batch in self._scan_batches(node, prefix):
+                    yield from batch
+                node.breaker.record_success()
+            except redis.RedisError as e:
+                node.breaker.record_failure()
+                logger.error(f"Redis scan error for prefix {prefix} on {node.name}: {str(e)}")
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Delete every key starting with the prefix in bounded, pipelined UNLINK batches
+
+        UNLINK frees memory in a Redis background thread, and the pause between
+        batches lets live traffic through, so even a full invalidation never
+        stalls Redis the way FLUSHDB or a single huge DEL would. Unreachable
+        nodes are skipped, their keys expire with their TTL.
+        """
+        deleted = 0
+        for node in self.nodes:
+            if not node.breaker.allow_request():
+                logger.warning(f"Skipping Redis {node.name} while deleting prefix {prefix}, its circuit breaker is open")
+                continue
+            try:
+                for batch in self._scan_batches(node, prefix):
+                    pipe = node.client.pipeline(transaction = False)
+                    pipe.unlink(*batch)
+                    deleted += pipe.execute()[0]
+                    self.policy.untrack(node.client, batch)
+                    if settings.cache_admin_batch_pause:
+                        time.sleep(settings.cache_admin_batch_pause)
+                node.breaker.record_success()
+            except redis.RedisError as e:
+                node.breaker.record_failure()
+                logger.error(f"Redis delete error for prefix {prefix} on {node.name}: {str(e)}")
+        logger.warning(f"Deleted {deleted} keys with prefix {prefix}")
+        return deleted
+
+    def inventory(self, prefix: str) -> Dict[str, Dict[str, Any]]:
+        """Key count, value bytes and TTL spread of every namespace under the prefix"""
+        namespaces: Dict[str, Dict[str, Any]] = {}
+        for node in self.nodes:
+            if not node.breaker.allow_request():
+                continue
+            try:
+                for batch in self._scan_batches(node, prefix):
+                    pipe = node.client.pipeline(transaction = False)
+                    for key in batch:
+                        pipe.strlen(key)
+                        pipe.ttl(key)
+                    results = pipe.execute()
+
+                    for key, size, ttl in zip(batch, results[0::2], results[1::2]):
+                        if ttl == -2:
+                            # Expired between SCAN and the pipeline
+                            continue
+                        entry = namespaces.setdefault(self.policy.namespace(key), {
+                            "keys": 0, "bytes": 0, "persistent": 0, "min_ttl": None, "max_ttl": None, "ttl_sum": 0
+                        })
+                        entry["keys"] += 1
+                        entry["bytes"] += size
+                        if ttl == -1:
+                            entry["persistent"] += 1
+                            continue
+                        entry["ttl_sum"] += ttl
+                        entry["min_ttl"] = ttl if entry["min_ttl"] is None else min(entry["min_ttl"], ttl)
+                        entry["max_ttl"] = ttl if entry["max_ttl"] is None else max(entry["max_ttl"], ttl)
+                node.breaker.record_success()
+            except redis.RedisError as e:
+                node.breaker.record_failure()
+                logger.error(f"Redis inventory error for prefix {prefix} on {node.name}: {str(e)}")
+
+        for entry in namespaces.values():
+            ttl_sum, expiring = entry.pop("ttl_sum"), entry["keys"] - entry["persistent"]
+            entry["mean_ttl"] = ttl_sum / expiring if expiring else None
+        return namespaces
+
     def get_ttl(self, key: str) -> int:
         """Get remaining TTL for the key"""
+        node = self.node_for(key)
+        if not node.breaker.allow_request():
+            return -2
         try:
-            return self.client.ttl(key)
+            ttl = node.client.ttl(key)
+            node.breaker.record_success()
+            return ttl
         except redis.RedisError as e:
+            node.breaker.record_failure()
             logger.error(f"Redis exists error for key {key}: {str(e)}") 
             return False
         
-    def flush_all(self) -> bool:
-        """Clear all cache"""
-        try:
-            self.client.flushdb()
-            logger.warning("Flushed all cache data")
-            return True 
-        except redis.RedisError as e:
-            logger.error(f"Redis flush error: {str(e)}")
-            return False
-        
-    def health_check(self) -> dict:
+    def flush_all(self, prefix: str = "ml_pred:") -> int:
+        """Clear all cached predictions and their policy bookkeeping, leaving the other keys of the DB alone"""
+        deleted = self.delete_prefix(prefix)
+        self.delete_prefix(f"_policy:{prefix}")
+        return deleted
+
+    def _node_health(self, node: CacheNode) -> dict:
+        if not node.breaker.allow_request():
+            return {
+                "status": "unhealthy", 
+                "error": "Redis circuit breaker is open", 
+                "circuit_breaker": node.breaker.get_stats()
+            }
         try:
-            info = self.client.info()
+            info = node.client.info()
             return {
                 "status": "healthy", 
                 "redis_version": info.get("redis_version"), 
                 "connected_clients": info.get("connected_clients"), 
                 "used_memory_human": info.get("used_memory_human"), 
                 "keyspace_hits": info.get("keyspace_hits", 0), 
-                "keyspace_misses": info.get("keyspace_misses", 0) 
+                "keyspace_misses": info.get("keyspace_misses", 0), 
+                "circuit_breaker": node.breaker.get_stats()
             }
         except Exception as e:
             return {
                 "status": "unhealthy", 
-                "error": str(e)
+                "error": str(e), 
+                "circuit_breaker": node.breaker.get_stats()
+            }
+        
+    def health_check(self) -> dict:
+        nodes = {node.name: self._node_health(node) for node in self.nodes}
+        # A node can answer INFO and still fail the policy reads, it then counts as degraded
+        usages = []
+        for node in self.nodes:
+            if nodes[node.name]["status"] != "healthy":
+                continue
+            try:
+                usages.append(self.policy.node_usage(node.client))
+            except redis.RedisError as e:
+                node.breaker.record_failure()
+                logger.error(f"Redis policy stats error on {node.name}: {str(e)}")
+                nodes[node.name] = {
+                    "status": "degraded", 
+                    "error": str(e), 
+                    "circuit_breaker": node.breaker.get_stats()
+                }
+        healthy = [node for node in self.nodes if nodes[node.name]["status"] == "healthy"]
+        if len(self.nodes) == 1:
+            health = nodes[self.nodes[0].name]
+        else:
+            health = {
+                "status": "healthy" if len(healthy) == len(self.nodes) else "degraded" if healthy else "unhealthy", 
+                "redis_version": nodes[healthy[0].name]["redis_version"] if healthy else None, 
+                "connected_clients": sum(nodes[node.name]["connected_clients"] or 0 for node in healthy), 
+                "keyspace_hits": sum(nodes[node.name]["keyspace_hits"] for node in healthy), 
+                "keyspace_misses": sum(nodes[node.name]["keyspace_misses"] for node in healthy), 
+                "nodes": nodes
             }
+        if healthy:
+            health["policy"] = self.policy.get_stats(usages)
+        return health
         
-cache_service = CacheService() 
\ No newline at end of file
+# Pinged by the app lifespan, importing the module does not reach out to Redis
+cache_service = CacheService(connect = False) 
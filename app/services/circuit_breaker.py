@@ -0,0 +1,106 @@
+import time
+import threading
+from typing import Callable, Any, Dict, Optional
+
+from app.core.logging import get_logger, setup_logging
+
+setup_logging()
+logger = get_logger("circuit_breaker")
+
+class CircuitBreaker:
+    """Trips after consecutive failures and probes the backend in the background until it recovers
+
+    While the breaker is open every call is skipped without touching the
+    backend, only the probe thread talks to it.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, probe: Callable[[], Any], failure_threshold: int, recovery_timeout: float):
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.stats = {
+            "trips": 0,
+            "short_circuited": 0,
+            "probes": 0,
+            "recoveries": 0
+        }
+        self._lock = threading.Lock()
+        self._probe_thread: Optional[threading.Thread] = None
+
+    def allow_request(self) -> bool:
+        """Whether a call may go to the backend"""
+        if self.state == self.CLOSED:
+            return True
+        self.stats["short_circuited"] += 1
+        # Threads do not survive a fork, restart the probe in a forked worker
+        if self._probe_thread is None or not self._probe_thread.is_alive():
+            self._start_probe()
+        return False
+
+    def record_success(self) -> None:
+        if self.failures:
+            with self._lock:
+                self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            should_trip = self.state == self.CLOSED and self.failures >= self.failure_threshold
+        if should_trip:
+            self.trip()
+
+    def trip(self) -> None:
+        """Open the breaker and start probing for recovery"""
+        with self._lock:
+            if self.state != self.CLOSED:
+                return
+            self.state = self.OPEN
+            self.opened_at = time.time()
+            self.stats["trips"] += 1
+        logger.error(f"Circuit breaker {self.name} opened, skipping the backend until it recovers")
+        self._start_probe()
+
+    def _start_probe(self) -> None:
+        with self._lock:
+            if self._probe_thread is not None and self._probe_thread.is_alive():
+                return
+            self._probe_thread = threading.Thread(
+                target = self._probe_loop,
+                name = f"{self.name}-breaker-probe",
+                daemon = True
+            )
+            self._probe_thread.start()
+
+    def _probe_loop(self) -> None:
+        while self.state != self.CLOSED:
+            time.sleep(self.recovery_timeout)
+            self.state = self.HALF_OPEN
+            self.stats["probes"] += 1
+            try:
+                self.probe()
+            except Exception as e:
+                logger.warning(f"Circuit breaker {self.name} probe failed: {str(e)}")
+                self.state = self.OPEN
+                continue
+
+            with self._lock:
+                self.state = self.CLOSED
+                self.failures = 0
+                self.opened_at = None
+                self.stats["recoveries"] += 1
+            logger.info(f"Circuit breaker {self.name} closed, backend recovered")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "open_for_seconds": time.time() - self.opened_at if self.opened_at else 0.0,
+            **self.stats
+        }
@@ -0,0 +1,256 @@
+import json
+import time
+import uuid
+import queue
+import threading
+from typing import List, Dict, Any, Optional
+
+import redis
+
+from app.core.config import settings
+from app.core.exceptions import CustomException
+from app.core.logging import setup_logging, get_logger
+from app.services.cache_service import create_redis_client
+
+# Setup logging
+setup_logging()
+logger = get_logger("job_service")
+
+class RedisJobStore:
+    """Job metadata, chunk queue and partial results kept in Redis
+
+    Keys: `job:<id>` hash with the progress counters, `job:<id>:chunk:<i>`
+    with the results of a finished chunk, and the shared `job:queue` list.
+    A popped chunk moves to its worker's `job:processing:<worker>` list and
+    stays there until acknowledged, so the chunk of a worker that died is
+    queued again by another worker once its heartbeat expired.
+    """
+    queue_key = "job:queue"
+    workers_key = "job:workers"
+
+    def __init__(self):
+        # Blocking pops wait longer than the regular cache socket timeout
+        self.client = create_redis_client(socket_timeout = settings.job_poll_timeout + 5)
+
+    def create_job(self, job: Dict[str, Any], chunks: List[Dict[str, Any]]) -> None:
+        ttl = settings.job_result_ttl
+        pipe = self.client.pipeline(transaction = False)
+        pipe.hset(f"job:{job['job_id']}", mapping = {k: json.dumps(v) for k, v in job.items()})
+        pipe.expire(f"job:{job['job_id']}", ttl)
+        pipe.lpush(self.queue_key, *[json.dumps(chunk) for chunk in chunks])
+        pipe.execute()
+
+    @staticmethod
+    def _processing_key(worker_id: str) -> str:
+        return f"job:processing:{worker_id}"
+
+    @staticmethod
+    def _heartbeat_key(worker_id: str) -> str:
+        return f"job:worker:{worker_id}"
+
+    def heartbeat(self, worker_id: str) -> None:
+        pipe = self.client.pipeline(transaction = False)
+        pipe.sadd(self.workers_key, worker_id)
+        pipe.set(self._heartbeat_key(worker_id), time.time(), ex = settings.job_worker_heartbeat_ttl)
+        pipe.execute()
+
+    def pop_chunk(self, worker_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Move the oldest chunk to the worker's processing list, a worker holds one chunk at a time"""
+        item = self.client.blmove(self.queue_key, self._processing_key(worker_id), timeout, "RIGHT", "LEFT")
+        return json.loads(item) if item else None
+
+    def ack_chunk(self, worker_id: str) -> None:
+        self.client.delete(self._processing_key(worker_id))
+
+    def requeue_chunk(self, worker_id: str, chunk: Dict[str, Any]) -> None:
+        pipe = self.client.pipeline(transaction = True)
+        pipe.lpush(self.queue_key, json.dumps(chunk))
+        pipe.delete(self._processing_key(worker_id))
+        pipe.execute()
+
+    def recover_chunk(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Take over the chunk of a worker whose heartbeat expired, None when no worker died holding one"""
+        for dead in self.client.smembers(self.workers_key):
+            dead = dead.decode("utf-8")
+            if dead == worker_id or self.client.exists(self._heartbeat_key(dead)):
+                continue
+            item = self.client.lmove(self._processing_key(dead), self._processing_key(worker_id), "RIGHT", "LEFT")
+            self.client.srem(self.workers_key, dead)
+            if item:
+                return json.loads(item)
+        return None
+
+    def update_job(self, job_id: str, **fields: Any) -> None:
+        self.client.hset(f"job:{job_id}", mapping = {k: json.dumps(v) for k, v in fields.items()})
+
+    def finish_chunk(self, job_id: str, index: int, results: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Store a chunk's results (None when it failed) and return the updated job"""
+        # A chunk taken over from a worker that was only slow can finish twice, count it once
+        finished_key = f"job:{job_id}:finished"
+        pipe = self.client.pipeline(transaction = False)
+        pipe.sadd(finished_key, index)
+        pipe.expire(finished_key, settings.job_result_ttl)
+        if not pipe.execute()[0]:
+            return self.get_job(job_id)
+
+        counter = "done_chunks" if results is not None else "failed_chunks"
+        pipe = self.client.pipeline(transaction = False)
+        if results is not None:
+            pipe.setex(f"job:{job_id}:chunk:{index}", settings.job_result_ttl, json.dumps(results))
+        pipe.hincrby(f"job:{job_id}", counter, 1)
+        pipe.execute()
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.client.hgetall(f"job:{job_id}")
+        if not job:
+            return None
+        return {k.decode("utf-8"): json.loads(v) for k, v in job.items()}
+
+    def get_chunk_results(self, job_id: str, indexes: List[int]) -> List[Optional[List[Dict[str, Any]]]]:
+        values = self.client.mget([f"job:{job_id}:chunk:{i}" for i in indexes])
+        return [json.loads(value) if value is not None else None for value in values]
+
+class LocalJobStore:
+    """In-process stand-in for RedisJobStore, for development and single-process use"""
+
+    def __init__(self):
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.results: Dict[str, Dict[int, List[Dict[str, Any]]]] = {}
+        self.queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._lock = threading.Lock()
+
+    def create_job(self, job: Dict[str, Any], chunks: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self.jobs[job["job_id"]] = dict(job)
+            self.results[job["job_id"]] = {}
+        for chunk in chunks:
+            self.queue.put(chunk)
+
+    def heartbeat(self, worker_id: str) -> None:
+        pass
+
+    def pop_chunk(self, worker_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        try:
+            return self.queue.get(timeout = timeout)
+        except queue.Empty:
+            return None
+
+    def ack_chunk(self, worker_id: str) -> None:
+        pass
+
+    def requeue_chunk(self, worker_id: str, chunk: Dict[str, Any]) -> None:
+        self.queue.put(chunk)
+
+    def recover_chunk(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        # Workers die with the process, and their chunks with it
+        return None
+
+    def update_job(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            self.jobs[job_id].update(fields)
+
+    def finish_chunk(self, job_id: str, index: int, results: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+        with self._lock:
+            job = self.jobs[job_id]
+            if results is not None:
+                self.results[job_id][index] = results
+                job["done_chunks"] += 1
+            else:
+                job["failed_chunks"] += 1
+            return dict(job)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def get_chunk_results(self, job_id: str, indexes: List[int]) -> List[Optional[List[Dict[str, Any]]]]:
+        with self._lock:
+            results = self.results.get(job_id, {})
+            return [results.get(i) for i in indexes]
+
+class JobService:
+    """Asynchronous batch scoring: submit a batch, poll its progress, page through its results
+
+    Batches are split into chunks on a work queue that `JobWorker`s drain,
+    so a long job never holds an API connection or an API worker.
+    """
+
+    def __init__(self):
+        self.store = LocalJobStore() if settings.job_backend == "local" else RedisJobStore()
+
+    def submit(self, texts: List[str], chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """Queue a batch for scoring and return the new job"""
+        if isinstance(self.store, LocalJobStore) and settings.job_inprocess_workers < 1:
+            raise CustomException(
+                message = "No job workers",
+                status_code = 503,
+                details = "The local job backend needs job_inprocess_workers of at least 1"
+            )
+        chunk_size = chunk_size or settings.job_chunk_size
+        job_id = uuid.uuid4().hex
+        chunks = [
+            {"job_id": job_id, "index": i, "texts": texts[start:start + chunk_size], "attempts": 0}
+            for i, start in enumerate(range(0, len(texts), chunk_size))
+        ]
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "total_items": len(texts),
+            "chunk_size": chunk_size,
+            "total_chunks": len(chunks),
+            "done_chunks": 0,
+            "failed_chunks": 0,
+            "created_at": time.time(),
+            "updated_at": time.time()
+        }
+
+        try:
+            self.store.create_job(job, chunks)
+        except redis.RedisError as e:
+            logger.error(f"Failed to queue job: {str(e)}")
+            raise CustomException(
+                message = "Job queue unavailable",
+                status_code = 503,
+                details = str(e)
+            )
+        logger.info(f"Queued job {job_id} with {len(texts)} items in {len(chunks)} chunks")
+        return self._with_progress(job)
+
+    def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.store.get_job(job_id)
+        return self._with_progress(job) if job is not None else None
+
+    def get_results(self, job_id: str, offset: int = 0, limit: int = 100) -> Optional[Dict[str, Any]]:
+        """A page of results, items of chunks that are not finished yet are None"""
+        job = self.store.get_job(job_id)
+        if job is None:
+            return None
+
+        end = min(offset + limit, job["total_items"])
+        chunk_size = job["chunk_size"]
+        results: List[Optional[Dict[str, Any]]] = []
+        if offset < end:
+            first, last = offset // chunk_size, (end - 1) // chunk_size
+            indexes = list(range(first, last + 1))
+            for index, chunk in zip(indexes, self.store.get_chunk_results(job_id, indexes)):
+                chunk_start = index * chunk_size
+                chunk_len = min(chunk_size, job["total_items"] - chunk_start)
+                lo, hi = max(offset, chunk_start) - chunk_start, min(end, chunk_start + chunk_len) - chunk_start
+                results.extend(chunk[lo:hi] if chunk is not None else [None] * (hi - lo))
+
+        return {
+            **self._with_progress(job),
+            "offset": offset,
+            "limit": limit,
+            "results": results,
+            "complete": bool(results) and all(result is not None for result in results)
+        }
+
+    @staticmethod
+    def _with_progress(job: Dict[str, Any]) -> Dict[str, Any]:
+        finished = job["done_chunks"] + job["failed_chunks"]
+        return {**job, "progress": finished / job["total_chunks"] if job["total_chunks"] else 1.0}
+
+job_service = JobService()
@@ -0,0 +1,122 @@
+import os
+import time
+import socket
+import threading
+import multiprocessing
+from typing import Dict, Any, List, Optional
+
+import redis
+
+from app.core.config import settings
+from app.core.logging import setup_logging, get_logger
+from app.services.job_service import job_service
+from app.services.ml_service import ml_service
+
+# Setup logging
+setup_logging()
+logger = get_logger("job_worker")
+
+class JobWorker:
+    """Drains the job queue: scores one chunk at a time and stores its results"""
+
+    def __init__(self, name: str = "job-worker"):
+        self.name = name
+        # Unique across hosts and processes, it names the worker's processing list
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{name}"
+        self.store = job_service.store
+        self.ml_model = ml_service
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run(self) -> None:
+        logger.info(f"{self.name} started")
+        while not self._stop.is_set():
+            try:
+                self.store.heartbeat(self.worker_id)
+                chunk = self.store.recover_chunk(self.worker_id)
+                if chunk is not None:
+                    # The worker that held it died, possibly on this very chunk
+                    chunk["attempts"] += 1
+                    logger.warning(f"{self.name} took over chunk {chunk['index']} of job {chunk['job_id']} from a dead worker")
+                else:
+                    chunk = self.store.pop_chunk(self.worker_id, timeout = settings.job_poll_timeout)
+            except redis.RedisError as e:
+                logger.error(f"{self.name} could not reach the job queue: {str(e)}")
+                time.sleep(settings.job_poll_timeout)
+                continue
+            if chunk is not None:
+                self.process(chunk)
+        logger.info(f"{self.name} stopped")
+
+    def process(self, chunk: Dict[str, Any]) -> None:
+        job_id, index = chunk["job_id"], chunk["index"]
+        # The queue is FIFO, so the first chunk marks the job as started
+        if index == 0 and chunk["attempts"] == 0:
+            self.store.update_job(job_id, status = "running", updated_at = time.time())
+
+        results: Optional[List[Dict[str, Any]]] = None
+        if chunk["attempts"] >= settings.job_max_attempts:
+            logger.error(f"Chunk {index} of job {job_id} was given up after {chunk['attempts']} attempts")
+        else:
+            try:
+                results = [
+                    {
+                        "prediction": result["prediction"],
+                        "confidence": result.get("confidence"),
+                        "prediction_probabilities": result.get("prediction_probabilities", [None])[0]
+                    }
+                    for result in self.ml_model.predict_batch(chunk["texts"])
+                ]
+            except Exception as e:
+                chunk["attempts"] += 1
+                if chunk["attempts"] < settings.job_max_attempts:
+                    logger.warning(f"Chunk {index} of job {job_id} failed, retrying: {str(e)}")
+                    self.store.requeue_chunk(self.worker_id, chunk)
+                    return
+                logger.error(f"Chunk {index} of job {job_id} failed after {chunk['attempts']} attempts: {str(e)}")
+
+        job = self.store.finish_chunk(job_id, index, results)
+        self.store.ack_chunk(self.worker_id)
+        if job["done_chunks"] + job["failed_chunks"] >= job["total_chunks"]:
+            if not job["failed_chunks"]:
+                status = "completed"
+            elif job["done_chunks"]:
+                status = "completed_with_errors"
+            else:
+                status = "failed"
+            self.store.update_job(job_id, status = status, updated_at = time.time())
+            logger.info(f"Job {job_id} {status}")
+
+def start_inprocess_workers(count: int) -> List[JobWorker]:
+    """Start worker threads inside the API process, needed with the local job backend"""
+    workers = []
+    for i in range(count):
+        worker = JobWorker(name = f"job-worker-{i}")
+        threading.Thread(target = worker.run, name = worker.name, daemon = True).start()
+        workers.append(worker)
+    return workers
+
+def _run_process(index: int) -> None:
+    # Lower the priority so that job scoring yields the CPU to interactive serving
+    os.nice(settings.job_worker_nice)
+    JobWorker(name = f"job-worker-{index}").run()
+
+def main():
+    """Run a pool of job worker processes, separate from the API workers"""
+    if settings.job_backend == "local":
+        raise SystemExit("The local job backend only works with in-process workers (job_inprocess_workers)")
+
+    # The model is loaded at import, before forking, so the workers share it
+    logger.info(f"Starting {settings.job_worker_processes} job worker processes with model {ml_service.model_info.get('model_type')}")
+
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target = _run_process, args = (i,)) for i in range(settings.job_worker_processes)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+if __name__ == "__main__":
+    main()
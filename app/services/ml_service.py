@@ -1,29 +1,70 @@
+import threading
 import joblib
 import numpy as np 
 import pandas as pd
 from pathlib import Path
-from typing import Union, List
+from typing import Union, List, Optional
 from app.core.logging import setup_logging, get_logger
 from app.core.exceptions import CustomException
 from app.core.config import settings
+from app.utils.hash_utils import file_version
+from app.services.shadow_service import ShadowScorer
 from app.models.ml_models.src.features.preprocessing import clean_text
 
 setup_logging()
 logger = get_logger("mlservice") 
 
+# Name of the model loaded from settings.model_path, served when a request names no model
+DEFAULT_MODEL = "default"
+
 class MLModelService:
-    """Service for loading and running ML Model Predictions"""
+    """Service for loading and running ML Model Predictions
+
+    In cascade mode a cheap linear model on the same TF-IDF features answers
+    first, and only rows it is less than `model_threshold` confident about are
+    sent to the forest. In shadow mode a candidate model scores a sample of
+    answered requests in the background, for comparison only.
+    """
+
+    # Sentiment mapping (customize as per training)
+    SENTIMENT_MAP = {0 : "Negative", 1 : "Neutral", 2 : "Positive"}
 
-    def __init__(self):
+    def __init__(self, model_path : Optional[str] = None, vectorizer_path : Optional[str] = None, name : str = DEFAULT_MODEL, model_version : Optional[str] = None):
+        self.name = name
+        self.model_path = Path(model_path or settings.model_path)
+        self.vectorizer_path = Path(vectorizer_path or settings.vectorizer_path)
+        # Only the default model takes its version from the settings
+        self.model_version = model_version or (settings.model_version if name == DEFAULT_MODEL else None)
         self.model = None 
         self.vectorizer = None 
+        self.cascade_model = None
+        self.shadow = None
         self.model_info = {} 
+        self.cascade_stats = {
+            "rows": 0, 
+            "linear_rows": 0, 
+            "forest_rows": 0, 
+            "agreement_checked": 0, 
+            "agreement_matches": 0
+        }
+        # Misses are scored from several threads at once
+        self._stats_lock = threading.Lock()
         self._load_model() 
+        # Cascade and shadow scoring apply to the default model only
+        if name == DEFAULT_MODEL and settings.cascade_enabled:
+            self._load_cascade_model()
+        if name == DEFAULT_MODEL and settings.shadow_enabled:
+            self.shadow = ShadowScorer.load(self.vectorizer)
+
+    @staticmethod
+    def _file_version(*paths : Path) -> str:
+        """Short version tag of the file contents, equal on every replica and redeploy serving the same files"""
+        return file_version(*paths)
 
     def _load_model(self):
         """Load the trained ML model and vectorizer"""
-        model_path = Path(settings.model_path) 
-        vectorizer_path = Path(settings.vectorizer_path) 
+        model_path = self.model_path 
+        vectorizer_path = self.vectorizer_path 
 
         if not model_path.exists():
             raise CustomException(
@@ -46,10 +87,12 @@ class MLModelService:
                 self.vectorizer = joblib.load(f) 
 
             self.model_info = {
+                "model_name" : self.name, 
                 "model_type" : type(self.model).__name__, 
                 "vectorizer_type" : type(self.vectorizer).__name__, 
                 "model_path" : str(model_path), 
                 "vectorizer_path" : str(vectorizer_path), 
+                "model_version" : self.model_version or self._file_version(model_path, vectorizer_path), 
                 "loaded_at" : pd.Timestamp.now().isoformat() 
             } 
             logger.info(f"Successfully loaded model: {self.model_info['model_type']}, "
@@ -63,8 +106,96 @@ class MLModelService:
                 details = str(e) 
             ) 
 
-    def predict(self, text : Union[str, List[str]]) -> dict:
-        """Make predictions for raw text input"""
+    def _load_cascade_model(self):
+        """Load the linear first stage of the cascade, serving forest-only when it is unusable"""
+        cascade_path = Path(settings.cascade_model_path)
+        if not cascade_path.exists():
+            logger.warning(f"Cascade model not found in {cascade_path}, serving forest-only")
+            return
+
+        with open(cascade_path, "rb") as f:
+            cascade_model = joblib.load(f)
+        if list(cascade_model.classes_) != list(self.model.classes_):
+            logger.warning("Cascade model classes do not match the forest, serving forest-only")
+            return
+
+        self.cascade_model = cascade_model
+        self.model_info["cascade_model_type"] = type(cascade_model).__name__
+        self.model_info["cascade_model_path"] = str(cascade_path)
+        self.model_info["cascade_threshold"] = settings.model_threshold
+        # The cascade changes some answers, so its predictions get their own version
+        if not self.model_version:
+            self.model_info["model_version"] = self._file_version(self.model_path, self.vectorizer_path, cascade_path)
+        logger.info(f"Loaded cascade model: {self.model_info['cascade_model_type']}")
+
+    def _cascade_predict_proba(self, features, record_stats : bool = True) -> np.ndarray:
+        """Linear model first, forest only for rows below the confidence threshold"""
+        proba = self.cascade_model.predict_proba(features)
+        confident = proba.max(axis = 1) >= settings.model_threshold
+        hard = np.flatnonzero(~confident)
+        if hard.size:
+            proba[hard] = self.model.predict_proba(features[hard])
+
+        if not record_stats:
+            return proba
+
+        # Score a sample of the linear answers with the forest as well to track agreement
+        easy = np.flatnonzero(confident)
+        sampled = easy[np.random.random(easy.size) < settings.cascade_agreement_sample_rate]
+        matches = 0
+        if sampled.size:
+            forest_labels = self.model.predict_proba(features[sampled]).argmax(axis = 1)
+            matches = int((forest_labels == proba[sampled].argmax(axis = 1)).sum())
+
+        with self._stats_lock:
+            self.cascade_stats["agreement_checked"] += int(sampled.size)
+            self.cascade_stats["agreement_matches"] += matches
+            self.cascade_stats["rows"] += int(proba.shape[0])
+            self.cascade_stats["linear_rows"] += int(easy.size)
+            self.cascade_stats["forest_rows"] += int(hard.size)
+        return proba
+
+    def get_cascade_stats(self) -> dict:
+        """Share of rows answered by each stage and agreement with forest-only predictions"""
+        with self._stats_lock:
+            stats = dict(self.cascade_stats)
+        rows = stats["rows"] or 1
+        linear_share = stats["linear_rows"] / rows
+        sampled_agreement = (
+            stats["agreement_matches"] / stats["agreement_checked"] if stats["agreement_checked"] else None
+        )
+        stats.update({
+            "enabled": self.cascade_model is not None, 
+            "threshold": settings.model_threshold, 
+            "linear_share": linear_share, 
+            "forest_share": stats["forest_rows"] / rows, 
+            "linear_agreement": sampled_agreement, 
+            # Forest-routed rows agree by construction
+            "estimated_agreement": (
+                linear_share * sampled_agreement + (1 - linear_share) if sampled_agreement is not None else None
+            )
+        })
+        return stats
+
+    def shadow_score(self, text : Union[str, List[str]], result : dict) -> None:
+        """Hand a sample of answered requests to the candidate model, returns without waiting for it"""
+        if self.shadow is not None:
+            self.shadow.submit(text, result)
+
+    def get_shadow_stats(self) -> dict:
+        """Agreement, confidence drift and latency of the shadow candidate"""
+        if self.shadow is None:
+            return {"enabled": False}
+        return self.shadow.get_stats()
+
+    def clean(self, text : Union[str, List[str]]) -> List[str]:
+        """Normalize raw text input into the form the vectorizer expects"""
+        if isinstance(text, str):
+            text = [text]
+        return [clean_text(t) for t in text]
+
+    def predict(self, text : Union[str, List[str]], cleaned_texts : Optional[List[str]] = None) -> dict:
+        """Make predictions for raw text input, or for already cleaned texts"""
         if self.model is None or self.vectorizer is None:
             raise CustomException(
                 message = "Model/Vectorizer not loaded", 
@@ -74,33 +205,37 @@ class MLModelService:
 
         try:
             # Handle input
-            if isinstance(text, str):
-                text = [text] 
-            cleaned_texts = [clean_text(t) for t in text] 
+            if cleaned_texts is None:
+                cleaned_texts = self.clean(text)
 
             # Vectorize
             features = self.vectorizer.transform(cleaned_texts) 
 
             # Predict
-            prediction = self.model.predict(features) 
+            prediction_proba = None 
+            if self.cascade_model is not None:
+                proba = self._cascade_predict_proba(features)
+                prediction = self.model.classes_[proba.argmax(axis = 1)]
+                prediction_proba = proba.tolist()
+            else:
+                prediction = self.model.predict(features) 
 
             # Try to get probabilities
-            prediction_proba = None 
-            if hasattr(self.model, "predict_proba"):
+            if prediction_proba is None and hasattr(self.model, "predict_proba"):
                 try:
                     prediction_proba = self.model.predict_proba(features).tolist() 
                 except Exception as e:
                     logger.warning(f"Could not get prediction probabilities: {str(e)}") 
 
-            # Sentiment mapping (customize as per training)
-            sentiment_map = {0 : "Negative", 1 : "Neutral", 2 : "Positive"} 
-            sentiments = [sentiment_map.get(p, "Unknown") for p in prediction] 
+            sentiments = [self.SENTIMENT_MAP.get(p, "Unknown") for p in prediction] 
 
             result = {
                 "prediction" : sentiments if len(sentiments) > 1 else sentiments[0], 
                 "raw_prediction" : prediction.tolist(), 
                 "model_info" : {
                     "model_type" : self.model_info.get("model_type"), 
+                    "model_name" : self.name, 
+                    "model_version" : self.model_info.get("model_version"), 
                     "prediction_timestamp" : pd.Timestamp.now().isoformat(), 
                 } 
             } 
@@ -123,6 +258,29 @@ class MLModelService:
                 details = str(e) 
             ) 
         
+    def predict_batch(self, texts : List[str], cleaned_texts : Optional[List[str]] = None) -> List[dict]:
+        """Score many texts in one pass, returning one result per text shaped like a single prediction"""
+        batch = self.predict(texts, cleaned_texts = cleaned_texts)
+        predictions = batch["prediction"] if len(texts) > 1 else [batch["prediction"]]
+        probabilities = batch.get("prediction_probabilities")
+
+        results = []
+        for i, prediction in enumerate(predictions):
+            result = {
+                "prediction" : prediction,
+                "raw_prediction" : [batch["raw_prediction"][i]],
+                "model_info" : batch["model_info"]
+            }
+            if probabilities is not None:
+                result["prediction_probabilities"] = [probabilities[i]]
+                result["confidence"] = max(probabilities[i])
+            results.append(result)
+        return results
+
+    def get_class_labels(self) -> List[str]:
+        """Labels of the probability columns, in the model's class order"""
+        return [self.SENTIMENT_MAP.get(c, "Unknown") for c in self.model.classes_]
+
     def get_model_info(self) -> dict:
         """Get information about the model"""
         return self.model_info 
@@ -136,15 +294,20 @@ class MLModelService:
                     "error": "Model or vectorizer not loaded" 
                 } 
 
-            # Run a dummy prediction with text input
+            # Run a dummy prediction with text input, through the path that serves requests
             dummy_text = ["health check input"] 
             cleaned = [clean_text(t) for t in dummy_text] 
             features = self.vectorizer.transform(cleaned) 
-            _ = self.model.predict(features) 
+            if self.cascade_model is not None:
+                _ = self._cascade_predict_proba(features, record_stats = False) 
+            else:
+                _ = self.model.predict(features) 
 
             return {
                 "status": "healthy", 
-                "model_info": self.model_info 
+                "model_info": self.model_info, 
+                "cascade": self.get_cascade_stats(), 
+                "shadow": self.get_shadow_stats() 
             } 
         except Exception as e:
             return {
@@ -0,0 +1,256 @@
+import re
+import time
+import pickle
+import threading
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.exceptions import ModelNotFoundError
+from app.core.logging import get_logger, setup_logging
+from app.services.ml_service import MLModelService, ml_service, DEFAULT_MODEL
+
+setup_logging()
+logger = get_logger("model_registry")
+
+MODEL_FILE = "model.pkl"
+VECTORIZER_FILE = "vectorizer.pkl"
+
+def estimate_nbytes(obj: Any) -> int:
+    """Approximate memory of a loaded model, numpy buffers are counted without being copied"""
+    buffers = []
+    data = pickle.dumps(obj, protocol = 5, buffer_callback = buffers.append)
+    return len(data) + sum(buffer.raw().nbytes for buffer in buffers)
+
+def parse_model_ref(ref: Optional[str]) -> Tuple[str, Optional[str]]:
+    """Split "name@version" into its parts, no name means the default model"""
+    if not ref:
+        return DEFAULT_MODEL, None
+    name, _, version = ref.partition("@")
+    return name, version or None
+
+def _version_order(version: str) -> List[Any]:
+    # v10 sorts after v9
+    return [(0, int(part), "") if part.isdigit() else (1, 0, part) for part in re.split(r"(\d+)", version) if part]
+
+class ModelRegistry:
+    """Named sentiment models loaded on first use and kept resident under a memory budget
+
+    A model lives in `<root>/<name>/<version>/` as model.pkl and
+    vectorizer.pkl, a version directory is never changed once published. A
+    request without a version gets the latest one. Once the estimated size of
+    the resident models exceeds the budget the least recently used ones are
+    evicted, the default model from the settings always stays resident.
+    """
+
+    def __init__(self, root: str, max_bytes: int, default: MLModelService):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.default = default
+        self.default_size = estimate_nbytes((default.model, default.vectorizer, default.cascade_model))
+        self.models: "OrderedDict[str, MLModelService]" = OrderedDict()
+        self.sizes: Dict[str, int] = {}
+        self.model_stats: Dict[str, Dict[str, Any]] = {}
+        self.latencies: Dict[str, deque] = {}
+        self.events = deque(maxlen = settings.model_registry_event_log)
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+        # name -> (latest version, monotonic time it was listed)
+        self._latest: Dict[str, Tuple[str, float]] = {}
+
+    @property
+    def resident_bytes(self) -> int:
+        return self.default_size + sum(self.sizes.values())
+
+    def versions(self, name: str) -> List[str]:
+        """Published versions of a model, oldest first"""
+        model_dir = self.root / name
+        if not model_dir.is_dir():
+            return []
+        return sorted((path.name for path in model_dir.iterdir() if (path / MODEL_FILE).exists()), key = _version_order)
+
+    def available(self) -> Dict[str, List[str]]:
+        if not self.root.is_dir():
+            return {}
+        return {path.name: self.versions(path.name) for path in sorted(self.root.iterdir()) if path.is_dir()}
+
+    def _cached_latest(self, name: str) -> Optional[str]:
+        latest = self._latest.get(name)
+        if latest is None or time.monotonic() - latest[1] > settings.model_registry_latest_ttl:
+            return None
+        return latest[0]
+
+    def resolve(self, ref: Optional[str]) -> Tuple[str, Optional[str]]:
+        """Name and concrete version a reference points to"""
+        name, version = parse_model_ref(ref)
+        if name == DEFAULT_MODEL:
+            return name, None
+        # Names and versions are path components, never paths
+        if "/" in name or name.startswith(".") or (version and ("/" in version or version.startswith("."))):
+            raise ModelNotFoundError("Model not found", details = f"Invalid model reference {ref}")
+        if version is None:
+            version = self._cached_latest(name)
+        if version is None:
+            versions = self.versions(name)
+            if not versions:
+                raise ModelNotFoundError("Model not found", details = f"No versions of model {name} in {self.root}")
+            version = versions[-1]
+            self._latest[name] = (version, time.monotonic())
+        return name, version
+
+    def resident(self, ref: Optional[str]) -> Optional[MLModelService]:
+        """The model a reference points to when it is loaded already, without touching the disk"""
+        name, version = parse_model_ref(ref)
+        if name == DEFAULT_MODEL:
+            return self.default
+        if version is None:
+            # Published versions are only listed again once the resolution is stale
+            version = self._cached_latest(name)
+            if version is None:
+                return None
+        with self._lock:
+            service = self.models.get(f"{name}@{version}")
+            if service is not None:
+                self.models.move_to_end(f"{name}@{version}")
+            return service
+
+    def get(self, ref: Optional[str]) -> MLModelService:
+        """The model a reference points to, loading it and evicting others when needed"""
+        name, version = self.resolve(ref)
+        if name == DEFAULT_MODEL:
+            return self.default
+        key = f"{name}@{version}"
+        with self._lock:
+            service = self.models.get(key)
+            if service is not None:
+                self.models.move_to_end(key)
+                return service
+            loading = self._loading.setdefault(key, threading.Lock())
+
+        # One load per model at a time, requests for resident models go on meanwhile
+        with loading:
+            with self._lock:
+                service = self.models.get(key)
+                if service is not None:
+                    self.models.move_to_end(key)
+                    return service
+            try:
+                service, size, seconds = self._load(name, version)
+            except Exception:
+                # A failed load must not leave its lock behind, the next request retries it
+                with self._lock:
+                    self._loading.pop(key, None)
+                raise
+            with self._lock:
+                self.models[key] = service
+                self.sizes[key] = size
+                self._loading.pop(key, None)
+                self._stats(key)["loads"] += 1
+                self._stats(key)["load_seconds"] = seconds
+                self._event("load", key, size, seconds)
+                self._evict(keep = key)
+        return service
+
+    def _load(self, name: str, version: str) -> Tuple[MLModelService, int, float]:
+        model_dir = self.root / name / version
+        if not (model_dir / MODEL_FILE).exists():
+            raise ModelNotFoundError("Model not found", details = f"Model file not found in {model_dir}")
+        start = time.perf_counter()
+        service = MLModelService(
+            model_path = str(model_dir / MODEL_FILE),
+            vectorizer_path = str(model_dir / VECTORIZER_FILE),
+            name = name,
+            model_version = version
+        )
+        size = estimate_nbytes((service.model, service.vectorizer))
+        seconds = time.perf_counter() - start
+        logger.info(f"Loaded model {name}@{version} ({size / 1024 ** 2:.1f} MiB) in {seconds:.2f}s")
+        return service, size, seconds
+
+    def _evict(self, keep: str) -> None:
+        while self.resident_bytes > self.max_bytes:
+            victim = next((key for key in self.models if key != keep), None)
+            if victim is None:
+                logger.warning(f"Model {keep} alone exceeds the registry budget of {self.max_bytes} bytes")
+                return
+            self.models.pop(victim)
+            size = self.sizes.pop(victim)
+            self._stats(victim)["evictions"] += 1
+            self._event("evict", victim, size)
+            logger.info(f"Evicted model {victim} ({size / 1024 ** 2:.1f} MiB)")
+
+    def _event(self, event: str, key: str, size: int, seconds: Optional[float] = None) -> None:
+        self.events.append({
+            "event": event,
+            "model": key,
+            "size_bytes": size,
+            "seconds": seconds,
+            "resident_bytes": self.resident_bytes,
+            "timestamp": time.time()
+        })
+
+    def _stats(self, key: str) -> Dict[str, Any]:
+        if key not in self.model_stats:
+            self.model_stats[key] = {
+                "requests": 0,
+                "cache_hits": 0,
+                "loads": 0,
+                "evictions": 0,
+                "load_seconds": None,
+                "last_used": None
+            }
+            self.latencies[key] = deque(maxlen = settings.model_registry_latency_window)
+        return self.model_stats[key]
+
+    @staticmethod
+    def key_of(service: MLModelService) -> str:
+        if service.name == DEFAULT_MODEL:
+            return DEFAULT_MODEL
+        return f"{service.name}@{service.model_version}"
+
+    def record(self, service: MLModelService, seconds: Optional[float] = None, cache_hit: bool = False) -> None:
+        """Count one request served by a model, with its inference time on a miss"""
+        key = self.key_of(service)
+        with self._lock:
+            stats = self._stats(key)
+            stats["requests"] += 1
+            stats["cache_hits"] += int(cache_hit)
+            stats["last_used"] = time.time()
+            if seconds is not None:
+                self.latencies[key].append(seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Resident models, budget usage, per-model counters and latency, recent load/evict events"""
+        with self._lock:
+            resident = [DEFAULT_MODEL, *self.models]
+            models = {}
+            for key, stats in self.model_stats.items():
+                latencies = np.array(self.latencies[key])
+                models[key] = {
+                    **stats,
+                    "resident": key in resident,
+                    "size_bytes": self.default_size if key == DEFAULT_MODEL else self.sizes.get(key),
+                    "latency_ms": {
+                        "count": int(latencies.size),
+                        "mean": float(latencies.mean() * 1000) if latencies.size else None,
+                        "p50": float(np.percentile(latencies, 50) * 1000) if latencies.size else None,
+                        "p95": float(np.percentile(latencies, 95) * 1000) if latencies.size else None
+                    }
+                }
+            return {
+                "root": str(self.root),
+                "max_bytes": self.max_bytes,
+                "resident_bytes": self.resident_bytes,
+                "resident": resident,
+                "models": models,
+                "events": list(self.events)
+            }
+
+model_registry = ModelRegistry(
+    root = settings.model_registry_dir,
+    max_bytes = settings.model_registry_max_bytes,
+    default = ml_service
+)
@@ -1,16 +1,40 @@
-from typing import Union, List, Dict, Any 
+from typing import Union, List, Dict, Any, Optional, Tuple
 import hashlib 
 import json 
+import time
+import asyncio
 
 from app.services.cache_service import cache_service 
-from app.services.ml_service import ml_service 
+from app.services.ml_service import ml_service, MLModelService, DEFAULT_MODEL
+from app.services.model_registry import model_registry
+from app.services.similarity_cache import similarity_cache
+from app.services.write_behind import cache_writer
+from app.services.admission_service import admission_controller
+from app.core.config import settings
 from app.core.logging import setup_logging, get_logger 
-from app.utils.hash_utils import generate_cache_key 
+from app.core.profiling import request_profiler
+from app.utils.hash_utils import generate_cache_key, generate_normalized_cache_key
+from app.models.ml_models.src.features.preprocessing import PREPROCESSING_VERSION
 
 # Setup logging
 setup_logging() 
 logger = get_logger("prediction_service") 
 
+PREDICTION_PREFIX = "ml_pred"
+
+def prediction_key_prefix(model_version : Optional[str] = None, model_name : Optional[str] = None) -> str:
+    """Key prefix of the predictions of one model version, or of all of them
+
+    Registered models get a namespace of their own, the default model keeps
+    the unnamed one.
+    """
+    prefix = PREDICTION_PREFIX
+    if model_name is not None and model_name != DEFAULT_MODEL:
+        prefix = f"{prefix}:n{model_name}"
+    if model_version is None:
+        return prefix
+    return f"{prefix}:m{model_version}"
+
 
 class PredictionService:
     """Service that orchestrates caching and ML predictions"""
@@ -18,51 +42,188 @@ class PredictionService:
     def __init__(self):
         self.cache = cache_service 
         self.ml_model = ml_service 
+        self.registry = model_registry
+
+    @property
+    def key_prefix(self) -> str:
+        """Prefix of the prediction keys of the default model"""
+        return self.key_prefix_for(self.ml_model)
+
+    @staticmethod
+    def key_prefix_for(ml_model : MLModelService) -> str:
+        """Prefix of the prediction keys of a loaded model"""
+        return prediction_key_prefix(ml_model.model_info.get("model_version"), ml_model.name)
+
+    async def model_for(self, model : Optional[str]) -> MLModelService:
+        """Model a request asked for, loaded off the event loop when it is not resident yet"""
+        return self.registry.resident(model) or await asyncio.to_thread(self.registry.get, model)
+
+    def cache_key_for(self, text : Union[str, List[str]], ml_model : Optional[MLModelService] = None) -> Tuple[str, Optional[List[str]]]:
+        """Build the cache key for an input, returning the cleaned texts when they were needed for it"""
+        ml_model = ml_model or self.ml_model
+        key_prefix = self.key_prefix_for(ml_model)
+        if settings.cache_key_normalize:
+            cleaned_texts = ml_model.clean(text)
+            return generate_normalized_cache_key(cleaned_texts, PREPROCESSING_VERSION, prefix = key_prefix), cleaned_texts
+        return generate_cache_key(text, prefix = key_prefix), None
 
-    async def predict_single(self, text : Union[str, List[str]], use_cache : bool = True) -> Dict[str, Any]:
-        """Make a single prediction with cache support"""
+    def build_result(self, prediction_result : Dict[str, Any], text : Union[str, List[str]], cache_key : Optional[str]) -> Dict[str, Any]:
+        """Wrap a model prediction into the result that is returned and cached"""
+        return {
+            **prediction_result, 
+            "from_cache" : False, 
+            "cache_key" : cache_key, 
+            "input_text" : text, 
+            "input_size" : len(text) if isinstance(text, (list, str)) else None 
+        } 
+
+    async def predict_single(self, text : Union[str, List[str]], use_cache : bool = True, model : Optional[str] = None) -> Dict[str, Any]:
+        """Make a single prediction with cache support, with the default or a registered model"""
+        ml_model = await self.model_for(model)
 
         # Generate cache key
         cache_key = None 
+        cleaned_texts = None
+        signature = None
         if use_cache:
-            cache_key = generate_cache_key(text) 
+            cache_key, cleaned_texts = self.cache_key_for(text, ml_model)
             logger.debug(f"Generated cache key: {cache_key}") 
 
             # Check cache
             cached_result = self.cache.get(cache_key) 
+            if cached_result is None and settings.cache_write_behind_enabled:
+                cached_result = cache_writer.peek(cache_key)
             if cached_result is not None:
                 logger.info("Returning cached prediction") 
+                admission_controller.record_cache_hit()
+                self.registry.record(ml_model, cache_hit = True)
+                ml_model.shadow_score(text, cached_result)
                 cached_result["from_cache"] = True 
                 cached_result["cache_key"] = cache_key 
                 return cached_result 
 
+            # Near-duplicate tier, for inputs a small edit away from a cached one
+            if similarity_cache.enabled and isinstance(text, str):
+                cleaned_texts = cleaned_texts or ml_model.clean(text)
+                signature = similarity_cache.signature(cleaned_texts[0])
+                similar_result = similarity_cache.lookup(signature, self.key_prefix_for(ml_model))
+                if similar_result is not None:
+                    logger.info(f"Returning the cached prediction of a similar input ({similar_result['similarity']:.2f})") 
+                    admission_controller.record_cache_hit()
+                    self.registry.record(ml_model, cache_hit = True)
+                    similarity_cache.verify(ml_model, text, cleaned_texts, similar_result)
+                    similar_result["from_cache"] = True 
+                    similar_result["cache_key"] = similar_result["similar_to"] 
+                    return similar_result 
+
+        result = await self.score(text, cache_key, cleaned_texts, use_cache, ml_model)
+        if signature is not None and result.get("cached"):
+            similarity_cache.add(cache_key, signature)
+        return result
+
+    async def score(self, text : Union[str, List[str]], cache_key : Optional[str], cleaned_texts : Optional[List[str]], use_cache : bool, ml_model : MLModelService) -> Dict[str, Any]:
+        """Run a cache miss through admission control and the model"""
+        if not settings.admission_enabled:
+            return self.profiled_compute(text, cache_key, cleaned_texts, use_cache, ml_model)
+
+        # Only misses wait for an inference slot, hits were answered above without queueing
+        async with admission_controller.slot():
+            return await asyncio.to_thread(self.profiled_compute, text, cache_key, cleaned_texts, use_cache, ml_model)
+
+    def profiled_compute(self, text : Union[str, List[str]], cache_key : Optional[str], cleaned_texts : Optional[List[str]], use_cache : bool, ml_model : MLModelService) -> Dict[str, Any]:
+        """compute() under the request profiler while it is armed, which only watches the thread running it"""
+        if request_profiler.active:
+            with request_profiler.profile():
+                return self.compute(text, cache_key, cleaned_texts, use_cache, ml_model)
+        return self.compute(text, cache_key, cleaned_texts, use_cache, ml_model)
+
+    def compute(self, text : Union[str, List[str]], cache_key : Optional[str], cleaned_texts : Optional[List[str]], use_cache : bool, ml_model : Optional[MLModelService] = None) -> Dict[str, Any]:
+        """Score a cache miss and write it back"""
+        ml_model = ml_model or self.ml_model
         logger.info("Computing new prediction") 
         try:
-            prediction_result = self.ml_model.predict(text) 
-            enhance_result = {
-                **prediction_result, 
-                "from_cache" : False, 
-                "cache_key" : cache_key, 
-                "input_text" : text, 
-                "input_size" : len(text) if isinstance(text, (list, str)) else None 
-            } 
+            start = time.perf_counter()
+            prediction_result = ml_model.predict(text, cleaned_texts = cleaned_texts)
+            self.registry.record(ml_model, time.perf_counter() - start)
+            enhance_result = self.build_result(prediction_result, text, cache_key)
+            ml_model.shadow_score(text, prediction_result)
 
-            if use_cache and cache_key:
+            if use_cache and cache_key and settings.cache_write_behind_enabled:
+                # Admission is decided now, "cached" then means the write was buffered for a later batch
+                enhance_result["cached"] = self.cache.policy.admit(cache_key) and cache_writer.enqueue(cache_key, dict(enhance_result))
+            elif use_cache and cache_key:
                 cache_success = self.cache.set(cache_key, enhance_result) 
                 enhance_result["cached"] = cache_success 
                 if cache_success:
                     logger.info(f"Cached prediction result with key: {cache_key}") 
                 else:
-                    logger.warning("Failed to cache prediction results") 
+                    logger.debug("Prediction result was not cached") 
 
             return enhance_result 
         except Exception as e:
             logger.error(f"Prediction Failed: {str(e)}") 
             raise 
 
+    async def predict_many(self, texts : List[str], use_cache : bool = True, model : Optional[str] = None) -> Dict[str, Any]:
+        """Score a batch of texts with one cache entry per text, returning column-wise results
+
+        Cached texts are read with one MGET per cache node, the others are
+        scored in a single model pass and written back in bulk, bypassing the
+        admission policy like the warm-up does. Both run off the event loop,
+        and the scoring takes one admission slot for the whole batch.
+        """
+        ml_model = await self.model_for(model)
+        keys, cleaned, results = await asyncio.to_thread(self.lookup_many, texts, use_cache, ml_model)
+        from_cache = [result is not None for result in results]
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            if settings.admission_enabled:
+                async with admission_controller.slot():
+                    await asyncio.to_thread(self.compute_many, texts, keys, cleaned, results, missing, use_cache, ml_model)
+            else:
+                await asyncio.to_thread(self.compute_many, texts, keys, cleaned, results, missing, use_cache, ml_model)
+
+        return {
+            "labels" : [result["prediction"] for result in results], 
+            "probabilities" : [result.get("prediction_probabilities", [None])[0] for result in results], 
+            "classes" : ml_model.get_class_labels(), 
+            "from_cache" : from_cache, 
+            "model_name" : ml_model.name, 
+            "model_version" : ml_model.model_info.get("model_version") 
+        } 
+
+    def lookup_many(self, texts : List[str], use_cache : bool, ml_model : MLModelService) -> Tuple[List[Optional[str]], List[Optional[List[str]]], List[Optional[Dict[str, Any]]]]:
+        """Cache keys, cleaned texts and cached results of a batch, None where a text missed"""
+        keys : List[Optional[str]] = [None] * len(texts)
+        cleaned : List[Optional[List[str]]] = [None] * len(texts)
+        results : List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        if use_cache:
+            for i, text in enumerate(texts):
+                keys[i], cleaned[i] = self.cache_key_for(text, ml_model)
+            results = self.cache.get_many(keys)
+            if settings.cache_write_behind_enabled:
+                results = [result if result is not None else cache_writer.peek(key) for key, result in zip(keys, results)]
+        return keys, cleaned, results
+
+    def compute_many(self, texts : List[str], keys : List[Optional[str]], cleaned : List[Optional[List[str]]], results : List[Optional[Dict[str, Any]]], missing : List[int], use_cache : bool, ml_model : MLModelService) -> None:
+        """Score the missed texts of a batch in one model pass, filling in results and writing them back"""
+        cleaned_texts = [cleaned[i][0] for i in missing] if cleaned[missing[0]] is not None else None
+        start = time.perf_counter()
+        scored = ml_model.predict_batch([texts[i] for i in missing], cleaned_texts = cleaned_texts)
+        self.registry.record(ml_model, time.perf_counter() - start)
+        for i, prediction_result in zip(missing, scored):
+            results[i] = self.build_result(prediction_result, texts[i], keys[i])
+        if use_cache and settings.cache_write_behind_enabled:
+            queued = sum(cache_writer.enqueue(keys[i], results[i]) for i in missing)
+            logger.info(f"Scored {len(missing)} of {len(texts)} texts, buffered {queued} cache writes")
+        elif use_cache:
+            stored = self.cache.set_many({keys[i]: results[i] for i in missing})
+            logger.info(f"Scored {len(missing)} of {len(texts)} texts, cached {stored}")
+
     async def get_prediction_info(self, cache_key : str) -> Dict[str, Any]:
         """Get information about a cached prediction"""
-        cached_result = self.cache.get(cache_key) 
+        cached_result, ttl = self.cache.get_with_ttl(cache_key)
         if cached_result is None:
             return {
                 "exists" : False, 
@@ -70,8 +231,6 @@ class PredictionService:
                 "message" : "Prediction not found in cache" 
             } 
 
-        ttl = self.cache.get_ttl(cache_key) 
-
         return {
             "exists" : True, 
             "cache_key" : cache_key, 
@@ -94,6 +253,8 @@ class PredictionService:
         return {
             "cache_status" : cache_health, 
             "model_status" : model_health, 
+            "similarity_cache" : similarity_cache.get_stats(), 
+            "write_behind" : cache_writer.get_stats(), 
             "service_status" : "healthy" if (
                 cache_health.get("status") == "healthy" and 
                 model_health.get("status") == "healthy"
@@ -0,0 +1,189 @@
+import os
+import time
+import random
+import threading
+from collections import deque, Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+import joblib
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging import get_logger, setup_logging
+from app.utils.hash_utils import file_version
+from app.models.ml_models.src.features.preprocessing import clean_text
+
+setup_logging()
+logger = get_logger("shadow")
+
+class ShadowScorer:
+    """Scores a sample of live requests with a candidate model, off the response path
+
+    Sampled requests are handed to a small thread pool with a lowered
+    priority and a bounded backlog. When it is full the sample is dropped
+    rather than queued, so the primary path never waits for the candidate.
+    The candidate cleans and vectorizes the raw text itself. It may ship its
+    own vectorizer or reuse the primary one.
+    """
+
+    def __init__(self, model, vectorizer, version: str, sample_rate: float, workers: int, max_pending: int, latency_window: int):
+        self.model = model
+        self.vectorizer = vectorizer
+        self.version = version
+        self.sample_rate = sample_rate
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.latencies = deque(maxlen = latency_window)
+        self.stats = {
+            "sampled": 0,
+            "scored": 0,
+            "dropped": 0,
+            "errors": 0,
+            "agreements": 0,
+            "primary_confidence_sum": 0.0,
+            "candidate_confidence_sum": 0.0,
+            "confidence_delta_abs_sum": 0.0
+        }
+        self.transitions: Counter = Counter()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+
+    @classmethod
+    def load(cls, primary_vectorizer) -> Optional["ShadowScorer"]:
+        """Load the candidate named in the settings, None when it is missing"""
+        model_path = Path(settings.shadow_model_path) if settings.shadow_model_path else None
+        if model_path is None or not model_path.exists():
+            logger.warning(f"Shadow model not found in {model_path}, shadow scoring is off")
+            return None
+
+        with open(model_path, "rb") as f:
+            model = joblib.load(f)
+        paths = [model_path]
+        vectorizer = primary_vectorizer
+        if settings.shadow_vectorizer_path:
+            vectorizer_path = Path(settings.shadow_vectorizer_path)
+            with open(vectorizer_path, "rb") as f:
+                vectorizer = joblib.load(f)
+            paths.append(vectorizer_path)
+
+        # Content hash like the serving model's version, so replicas report the same candidate
+        version = file_version(*paths)
+        logger.info(f"Loaded shadow model: {type(model).__name__}, sample rate {settings.shadow_sample_rate}")
+        return cls(
+            model = model,
+            vectorizer = vectorizer,
+            version = version,
+            sample_rate = settings.shadow_sample_rate,
+            workers = settings.shadow_workers,
+            max_pending = settings.shadow_max_pending,
+            latency_window = settings.shadow_latency_window
+        )
+
+    @staticmethod
+    def _lower_priority() -> None:
+        # Linux applies nice values per thread, elsewhere the pool runs at normal priority
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), settings.shadow_nice)
+        except (AttributeError, OSError):
+            pass
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Threads do not survive a fork, each worker process starts its own pool
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(
+                max_workers = self.workers,
+                thread_name_prefix = "shadow",
+                initializer = self._lower_priority
+            )
+            self._pid = os.getpid()
+        return self._executor
+
+    def submit(self, text, primary_result: Dict[str, Any]) -> bool:
+        """Maybe schedule the candidate on a request the primary model answered, never blocks"""
+        if random.random() >= self.sample_rate:
+            return False
+        with self._lock:
+            self.stats["sampled"] += 1
+            if self.pending >= self.max_pending:
+                self.stats["dropped"] += 1
+                return False
+            self.pending += 1
+        texts = [text] if isinstance(text, str) else list(text)
+        future = self._get_executor().submit(self._score, texts, primary_result)
+        # Also runs for samples cancelled by stop(), which never reach _score
+        future.add_done_callback(self._done)
+        return True
+
+    def _done(self, future) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    def _score(self, texts: List[str], primary_result: Dict[str, Any]) -> None:
+        try:
+            start = time.perf_counter()
+            features = self.vectorizer.transform([clean_text(t) for t in texts])
+            proba = self.model.predict_proba(features)
+            latency = time.perf_counter() - start
+
+            labels = self.model.classes_[proba.argmax(axis = 1)].tolist()
+            confidences = proba.max(axis = 1)
+            primary_labels = primary_result.get("raw_prediction") or []
+            primary_proba = primary_result.get("prediction_probabilities")
+            primary_confidences = np.max(primary_proba, axis = 1) if primary_proba is not None else None
+
+            with self._lock:
+                self.latencies.append(latency)
+                self.stats["scored"] += len(labels)
+                for primary_label, label in zip(primary_labels, labels):
+                    self.stats["agreements"] += int(primary_label == label)
+                    self.transitions[f"{primary_label}->{label}"] += 1
+                if primary_confidences is not None and len(primary_confidences) == len(confidences):
+                    self.stats["primary_confidence_sum"] += float(primary_confidences.sum())
+                    self.stats["candidate_confidence_sum"] += float(confidences.sum())
+                    self.stats["confidence_delta_abs_sum"] += float(np.abs(confidences - primary_confidences).sum())
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+            logger.warning(f"Shadow scoring failed: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Agreement with the primary model, confidence drift and candidate latency percentiles"""
+        with self._lock:
+            stats = dict(self.stats)
+            latencies = np.array(self.latencies)
+            transitions = dict(self.transitions)
+            pending = self.pending
+        scored = stats["scored"] or 1
+        primary_confidence = stats.pop("primary_confidence_sum") / scored
+        candidate_confidence = stats.pop("candidate_confidence_sum") / scored
+        stats.update({
+            "enabled": True,
+            "candidate_model_type": type(self.model).__name__,
+            "candidate_version": self.version,
+            "sample_rate": self.sample_rate,
+            "pending": pending,
+            "agreement_rate": stats["agreements"] / stats["scored"] if stats["scored"] else None,
+            "primary_mean_confidence": primary_confidence,
+            "candidate_mean_confidence": candidate_confidence,
+            "mean_confidence_drift": candidate_confidence - primary_confidence,
+            "mean_abs_confidence_delta": stats.pop("confidence_delta_abs_sum") / scored,
+            "label_transitions": transitions,
+            "latency_ms": {
+                "count": int(latencies.size),
+                "mean": float(latencies.mean() * 1000) if latencies.size else None,
+                "p50": float(np.percentile(latencies, 50) * 1000) if latencies.size else None,
+                "p95": float(np.percentile(latencies, 95) * 1000) if latencies.size else None,
+                "p99": float(np.percentile(latencies, 99) * 1000) if latencies.size else None
+            }
+        })
+        return stats
+
+    def stop(self) -> None:
+        """Drop samples that have not started, let the running ones finish in the background"""
+        if self._executor is not None:
+            self._executor.shutdown(wait = False, cancel_futures = True)
+            self._executor = None
@@ -0,0 +1,140 @@
+import random
+import asyncio
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Set
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging import get_logger, setup_logging
+from app.services.cache_service import cache_service
+from app.services.write_behind import cache_writer
+from app.utils.minhash import MinHasher, LSHIndex
+
+setup_logging()
+logger = get_logger("similarity_cache")
+
+class SimilarityCache:
+    """Near-duplicate tier behind the exact cache
+
+    Inputs whose predictions were cached are indexed by the MinHash signature
+    of their cleaned text. An exact miss whose estimated Jaccard similarity
+    to an indexed input reaches the threshold is answered with that input's
+    cached prediction. The index holds at most `max_entries` keys, least
+    recently used first out, and lives in each worker process. Predictions
+    stay in Redis only, and entries whose key has expired are dropped when
+    found. A sample of the similar hits is scored by the model in the
+    background to measure how often the answer matches real inference.
+    """
+
+    # Cached keys tried per lookup, most similar first
+    MAX_CANDIDATES = 3
+
+    def __init__(self):
+        self.enabled = settings.similarity_cache_enabled
+        self.threshold = settings.similarity_cache_threshold
+        self.max_entries = settings.similarity_cache_max_entries
+        self.verify_rate = settings.similarity_cache_verify_rate
+        self.hasher = MinHasher(num_perm = settings.similarity_cache_num_perm, shingle_size = settings.similarity_cache_shingle_size)
+        self.index = LSHIndex(num_perm = settings.similarity_cache_num_perm, bands = settings.similarity_cache_bands)
+        self.entries: "OrderedDict[str, None]" = OrderedDict()
+        self.stats = {
+            "lookups": 0,
+            "similar_hits": 0,
+            "stale": 0,
+            "inserts": 0,
+            "evictions": 0,
+            "verified": 0,
+            "agreements": 0,
+            "similarity_sum": 0.0
+        }
+        # Bucket of similarity (0.05 wide) -> [verified, agreements]
+        self.agreement_by_similarity: Dict[str, List[int]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def signature(self, cleaned_text: str) -> np.ndarray:
+        return self.hasher.signature(cleaned_text)
+
+    def lookup(self, signature: np.ndarray, key_prefix: str) -> Optional[Dict[str, Any]]:
+        """Cached prediction of the most similar indexed input of the same model, None when there is none"""
+        self.stats["lookups"] += 1
+        candidates = [key for key in self.index.query(signature, self.threshold) if key.startswith(f"{key_prefix}:")]
+        candidates = candidates[:self.MAX_CANDIDATES]
+        # A raw read: the neighbour's access count and TTL must not grow from other inputs' traffic
+        for key, cached_result in zip(candidates, cache_service.get_many(candidates)):
+            if cached_result is None and settings.cache_write_behind_enabled:
+                cached_result = cache_writer.peek(key)
+            if cached_result is None:
+                self.stats["stale"] += 1
+                self.remove(key)
+                continue
+            similarity = MinHasher.similarity(signature, self.index.signatures[key])
+            self.entries.move_to_end(key)
+            self.stats["similar_hits"] += 1
+            self.stats["similarity_sum"] += similarity
+            cached_result["similar_to"] = key
+            cached_result["similarity"] = similarity
+            return cached_result
+        return None
+
+    def add(self, cache_key: str, signature: np.ndarray) -> None:
+        """Index an input whose prediction was just cached"""
+        if cache_key in self.entries:
+            self.entries.move_to_end(cache_key)
+            return
+        self.index.insert(cache_key, signature)
+        self.entries[cache_key] = None
+        self.stats["inserts"] += 1
+        while len(self.entries) > self.max_entries:
+            oldest, _ = self.entries.popitem(last = False)
+            self.index.remove(oldest)
+            self.stats["evictions"] += 1
+
+    def remove(self, cache_key: str) -> None:
+        self.entries.pop(cache_key, None)
+        self.index.remove(cache_key)
+
+    def verify(self, ml_model, text: str, cleaned_texts: List[str], served: Dict[str, Any]) -> None:
+        """Maybe score a similar hit with the model after the response, to compare the answers"""
+        if random.random() >= self.verify_rate:
+            return
+        task = asyncio.get_running_loop().create_task(self._verify(ml_model, text, cleaned_texts, served["prediction"], served["similarity"]))
+        # The loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _verify(self, ml_model, text: str, cleaned_texts: List[str], served_prediction: Any, similarity: float) -> None:
+        try:
+            result = await asyncio.to_thread(ml_model.predict, text, cleaned_texts)
+        except Exception as e:
+            logger.warning(f"Similarity cache verification failed: {str(e)}")
+            return
+        agrees = result["prediction"] == served_prediction
+        self.stats["verified"] += 1
+        self.stats["agreements"] += int(agrees)
+        bucket = f"{min(int(similarity * 20), 19) / 20:.2f}"
+        counts = self.agreement_by_similarity.setdefault(bucket, [0, 0])
+        counts[0] += 1
+        counts[1] += int(agrees)
+        if not agrees:
+            logger.info(f"Similar hit disagreed with the model at similarity {similarity:.2f}: {served_prediction} vs {result['prediction']}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        similarity_sum = stats.pop("similarity_sum")
+        stats.update({
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "similar_hit_rate": stats["similar_hits"] / stats["lookups"] if stats["lookups"] else None,
+            "mean_similarity": similarity_sum / stats["similar_hits"] if stats["similar_hits"] else None,
+            "agreement_rate": stats["agreements"] / stats["verified"] if stats["verified"] else None,
+            "agreement_by_similarity": {
+                bucket: {"verified": verified, "agreement_rate": agreements / verified}
+                for bucket, (verified, agreements) in sorted(self.agreement_by_similarity.items())
+            }
+        })
+        return stats
+
+similarity_cache = SimilarityCache()
@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import socket
+import asyncio
+from collections import Counter
+from typing import List, Dict, Any, Optional
+
+import redis
+
+from app.core.config import settings
+from app.core.logging import setup_logging, get_logger
+from app.services.prediction_service import prediction_service, PREDICTION_PREFIX
+
+# Setup logging
+setup_logging()
+logger = get_logger("warmup_service")
+
+class CacheWarmer:
+    """Pre-populates the prediction cache with the most frequent inputs
+
+    Only single-text inputs are warmed, list inputs are cached under a key for
+    the whole list and rarely repeat.
+    """
+
+    # Claimed by the one worker process that runs the startup warm-up
+    lock_key = "_warmup:leader"
+
+    def __init__(self):
+        self.prediction = prediction_service
+        self.cache = prediction_service.cache
+        self.ml_model = prediction_service.ml_model
+        self._task: Optional[asyncio.Task] = None
+        self.status: Dict[str, Any] = {"state": "idle"}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def top_inputs_from_file(self, path: str, top_n: int, field: str = "text") -> List[str]:
+        """Most frequent texts of a JSON lines traffic log, counted per cache key"""
+        counts: Counter = Counter()
+        representative: Dict[str, str] = {}
+        with open(path, "r", encoding = "utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                text = record.get(field) if isinstance(record, dict) else record
+                if not isinstance(text, str):
+                    continue
+
+                cache_key, _ = self.prediction.cache_key_for(text)
+                counts[cache_key] += 1
+                representative.setdefault(cache_key, text)
+
+        return [representative[key] for key, _ in counts.most_common(top_n)]
+
+    def top_inputs_from_keyspace(self, top_n: int, prefix: str = f"{PREDICTION_PREFIX}:m") -> List[str]:
+        """Inputs of the default model's cached predictions, of any model version, longest remaining TTL first
+
+        Useful after a model swap: the inputs cached for the previous version
+        are scored with the new one and stored under the new version's keys.
+        The old keys are not touched and expire with their TTL. Registered
+        models live under their own prefix and are not warmed.
+        """
+        keys = list(self.cache.scan_keys(prefix))
+        if not keys:
+            return []
+
+        ttls = self.cache.get_ttls(keys)
+        ranked = sorted(keys, key = ttls.get, reverse = True)[:top_n]
+
+        return [
+            cached["input_text"] for cached in self.cache.get_many(ranked)
+            if isinstance(cached, dict) and isinstance(cached.get("input_text"), str)
+        ]
+
+    def warm(self, texts: List[str], batch_size: Optional[int] = None, max_rate: Optional[float] = None) -> Dict[str, Any]:
+        """Batch-score texts and bulk-load the results, throttled to max_rate predictions per second"""
+        batch_size = batch_size or settings.cache_warmup_batch_size
+        # 0 disables the throttle
+        max_rate = settings.cache_warmup_max_rate if max_rate is None else max_rate
+        stored = 0
+        scored = 0
+        started = time.time()
+
+        for start in range(0, len(texts), batch_size):
+            batch_started = time.time()
+            batch = texts[start:start + batch_size]
+
+            keys, cleaned_texts = [], []
+            for text in batch:
+                cache_key, cleaned = self.prediction.cache_key_for(text)
+                keys.append(cache_key)
+                cleaned_texts.extend(cleaned or [])
+
+            results = self.ml_model.predict_batch(batch, cleaned_texts = cleaned_texts or None)
+            items = {
+                key: self.prediction.build_result(result, text, key)
+                for key, text, result in zip(keys, batch, results)
+            }
+            stored += self.cache.set_many(items)
+            scored += len(batch)
+            self.status.update({"scored": scored, "stored": stored})
+
+            # Throttle so the warm-up does not starve live traffic
+            min_duration = len(batch) / max_rate if max_rate > 0 else 0
+            elapsed = time.time() - batch_started
+            if elapsed < min_duration:
+                time.sleep(min_duration - elapsed)
+
+        duration = time.time() - started
+        logger.info(f"Cache warm-up scored {scored} inputs and stored {stored} in {duration:.2f}s")
+        return {"scored": scored, "stored": stored, "duration_seconds": duration}
+
+    def elect(self) -> bool:
+        """Claim the startup warm-up for this worker process, False when another one already has it
+
+        The claim is a Redis key that is not released, so workers started
+        later within `cache_warmup_lock_ttl` seconds skip the warm-up too.
+        """
+        node = self.cache.node_for(self.lock_key)
+        try:
+            owner = f"{socket.gethostname()}:{os.getpid()}"
+            return bool(node.client.set(self.lock_key, owner, nx = True, ex = settings.cache_warmup_lock_ttl))
+        except redis.RedisError as e:
+            logger.warning(f"Could not claim the cache warm-up, skipping it: {str(e)}")
+            return False
+
+    def run(self, source: Optional[str] = None, top_n: Optional[int] = None, elect: bool = False) -> Dict[str, Any]:
+        """Warm the cache from a traffic file, or from the keyspace when the source is "keyspace\"
+
+        With `elect` only the one worker process that claims the warm-up runs it.
+        """
+        source = source or settings.cache_warmup_source
+        top_n = top_n or settings.cache_warmup_top_n
+        if not source:
+            raise ValueError("No cache warm-up source configured")
+        if elect and not self.elect():
+            self.status = {"state": "skipped", "source": source, "reason": "warmed by another worker"}
+            logger.info("Cache warm-up is run by another worker, skipping it")
+            return self.status
+
+        self.status = {"state": "running", "source": source, "top_n": top_n, "started_at": time.time()}
+        try:
+            if source == "keyspace":
+                texts = self.top_inputs_from_keyspace(top_n)
+            else:
+                texts = self.top_inputs_from_file(source, top_n)
+            logger.info(f"Warming the cache with {len(texts)} inputs from {source}")
+
+            result = self.warm(texts)
+            self.status.update({"state": "finished", **result})
+        except Exception as e:
+            logger.error(f"Cache warm-up failed: {str(e)}")
+            self.status.update({"state": "failed", "error": str(e)})
+        return self.status
+
+    @staticmethod
+    def check_source(source: Optional[str]) -> None:
+        """Clients may only pick the keyspace or the configured traffic file, never another server path"""
+        if source in (None, "keyspace", settings.cache_warmup_source):
+            return
+        raise ValueError("Warm-up source must be \"keyspace\" or the configured traffic file")
+
+    def start(self, source: Optional[str] = None, top_n: Optional[int] = None, elect: bool = False) -> bool:
+        """Run the warm-up in a background thread, returns False if one is already running"""
+        self.check_source(source)
+        if self.running:
+            return False
+        self.status = {"state": "queued", "source": source or settings.cache_warmup_source}
+        self._task = asyncio.create_task(asyncio.to_thread(self.run, source, top_n, elect))
+        return True
+
+cache_warmer = CacheWarmer()
@@ -0,0 +1,151 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+from app.core.config import settings
+from app.core.logging import get_logger, setup_logging
+from app.services.cache_service import cache_service
+
+setup_logging()
+logger = get_logger("write_behind")
+
+class WriteBehindWriter:
+    """Stores fresh predictions in pipelined batches off the response path
+
+    Writes land in a bounded buffer keyed by cache key, so repeated writes of
+    a key before a flush collapse into the last one. A background thread
+    hands the buffer to `set_many` (one pipeline per node) whenever
+    `batch_size` writes are pending or `flush_interval` seconds after the
+    first one. When the buffer is full new keys are dropped, their prediction
+    is simply not cached. The thread is started on first use in every worker
+    process.
+    """
+
+    def __init__(self, cache, max_pending: int, batch_size: int, flush_interval: float):
+        self.cache = cache
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending: "OrderedDict[str, Any]" = OrderedDict()
+        # The batch being written, still visible to peek until Redis has it
+        self.in_flight: Dict[str, Any] = {}
+        self.stats = {
+            "enqueued": 0,
+            "coalesced": 0,
+            "dropped_full": 0,
+            "dropped_shutdown": 0,
+            "flushes": 0,
+            "stored": 0,
+            "failed": 0,
+            "max_pending_seen": 0,
+            "last_flush_ms": None
+        }
+        self._stopping = False
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def _ensure_started(self) -> None:
+        # Threads do not survive a fork, each worker process starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target = self._run, name = "cache-write-behind", daemon = True)
+            self._thread.start()
+
+    def enqueue(self, key: str, value: Any) -> bool:
+        """Buffer a write, False when it was dropped"""
+        self._ensure_started()
+        with self._cond:
+            if self._stopping:
+                self.stats["dropped_shutdown"] += 1
+                return False
+            if key in self.pending:
+                self.pending[key] = value
+                self.stats["coalesced"] += 1
+                return True
+            if len(self.pending) >= self.max_pending:
+                self.stats["dropped_full"] += 1
+                return False
+            self.pending[key] = value
+            self.stats["enqueued"] += 1
+            self.stats["max_pending_seen"] = max(self.stats["max_pending_seen"], len(self.pending))
+            if len(self.pending) == 1 or len(self.pending) >= self.batch_size:
+                self._cond.notify()
+            return True
+
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """A buffered value that is not in Redis yet, so reads see their own recent writes"""
+        with self._cond:
+            value = self.pending.get(key)
+            if value is None:
+                value = self.in_flight.get(key)
+        return dict(value) if value is not None else None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                # Sleep until there is something to write, then give the batch time to fill up
+                self._cond.wait_for(lambda: self.pending or self._stopping)
+                self._cond.wait_for(lambda: len(self.pending) >= self.batch_size or self._stopping, timeout = self.flush_interval)
+                if not self.pending and self._stopping:
+                    return
+                count = min(self.batch_size, len(self.pending))
+                batch = dict(self.pending.popitem(last = False) for _ in range(count))
+                self.in_flight = batch
+            self._flush(batch)
+
+    def _flush(self, batch: Dict[str, Any]) -> None:
+        start = time.perf_counter()
+        try:
+            stored = self.cache.set_many(batch)
+        except Exception as e:
+            logger.error(f"Write-behind flush failed: {str(e)}")
+            stored = 0
+        with self._cond:
+            self.in_flight = {}
+            self.stats["flushes"] += 1
+            self.stats["stored"] += stored
+            self.stats["failed"] += len(batch) - stored
+            self.stats["last_flush_ms"] = (time.perf_counter() - start) * 1000
+
+    def stop(self, flush: bool = True, timeout: float = 5.0) -> None:
+        """Flush (or drop) the buffered writes and stop the thread, waiting at most `timeout` seconds"""
+        with self._cond:
+            self._stopping = True
+            if not flush:
+                self.stats["dropped_shutdown"] += len(self.pending)
+                self.pending.clear()
+            remaining = len(self.pending)
+            self._cond.notify_all()
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Write-behind flush did not finish within {timeout}s, {len(self.pending)} writes lost")
+        elif remaining:
+            logger.info(f"Flushed {remaining} buffered cache writes on shutdown")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "enabled": settings.cache_write_behind_enabled,
+                "pending": len(self.pending),
+                "in_flight": len(self.in_flight),
+                "max_pending": self.max_pending,
+                "batch_size": self.batch_size,
+                "flush_interval": self.flush_interval,
+                **self.stats
+            }
+
+cache_writer = WriteBehindWriter(
+    cache = cache_service,
+    max_pending = settings.cache_write_behind_max_pending,
+    batch_size = settings.cache_write_behind_batch_size,
+    flush_interval = settings.cache_write_behind_flush_interval
+)
@@ -0,0 +1,119 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Callable, Tuple
+import msgpack
+from app.tools.bench_workers import random_review, wait_until_ready
+from app.core.logging import setup_logging, get_logger
+
+# Setup logging
+setup_logging()
+logger = get_logger("tools")
+
+def post(url: str, body: bytes, content_type: str) -> Tuple[float, bytes]:
+    request = urllib.request.Request(url, data = body, headers = {"Content-Type": content_type})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout = 60) as response:
+        content = response.read()
+    return time.perf_counter() - start, content
+
+def json_call(base_url: str, texts: List[str], use_cache: bool) -> Tuple[float, int, int]:
+    """One batch through POST /api/predict, decoded like a JSON client would"""
+    body = json.dumps({"text": texts}).encode("utf-8")
+    latency, content = post(f"{base_url}/api/predict?use_cache={str(use_cache).lower()}", body, "application/json")
+    json.loads(content)
+    return latency, len(body), len(content)
+
+def msgpack_call(base_url: str, texts: List[str], use_cache: bool) -> Tuple[float, int, int]:
+    """One batch through POST /api/predict/msgpack"""
+    body = msgpack.packb({"texts": texts})
+    latency, content = post(f"{base_url}/api/predict/msgpack?use_cache={str(use_cache).lower()}", body, "application/msgpack")
+    msgpack.unpackb(content)
+    return latency, len(body), len(content)
+
+def run_load(call: Callable, base_url: str, concurrency: int, seconds: float, batch_size: int, use_cache: bool) -> Dict[str, Any]:
+    """Closed-loop load: each client sends its next batch when the previous one returns"""
+    deadline = time.time() + seconds
+
+    def client(seed: int) -> List[Tuple[float, int, int]]:
+        rng = random.Random(seed)
+        calls = []
+        while time.time() < deadline:
+            calls.append(call(base_url, [random_review(rng) for _ in range(batch_size)], use_cache))
+        return calls
+
+    started = time.time()
+    with ThreadPoolExecutor(max_workers = concurrency) as pool:
+        calls = [c for result in pool.map(client, range(concurrency)) for c in result]
+    duration = time.time() - started
+
+    latencies = sorted(latency for latency, _, _ in calls)
+    return {
+        "requests": len(calls),
+        "throughput_rps": len(calls) / duration,
+        "texts_per_second": len(calls) * batch_size / duration,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+        "request_bytes": sum(sent for _, sent, _ in calls) / len(calls) if calls else 0.0,
+        "response_bytes": sum(received for _, _, received in calls) / len(calls) if calls else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description = "Compare the msgpack batch endpoint against the JSON /api/predict path at equal concurrency")
+    parser.add_argument("--base-url", default = None, help = "Benchmark a running server instead of starting one")
+    parser.add_argument("--workers", type = int, default = 1, help = "Workers of the server started for the benchmark")
+    parser.add_argument("--port", type = int, default = 8098)
+    parser.add_argument("--concurrency", type = int, default = 8)
+    parser.add_argument("--batch-size", type = int, default = 64)
+    parser.add_argument("--seconds", type = float, default = 20.0)
+    parser.add_argument("--use-cache", action = "store_true", help = "Let repeated batches hit the cache, isolating the protocol cost")
+    parser.add_argument("--output", default = None, help = "Optional path for a JSON report")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        base_url = f"http://127.0.0.1:{args.port}"
+        env = {**os.environ, "WORKERS": str(args.workers), "PORT": str(args.port), "HOST": "127.0.0.1"}
+        server = subprocess.Popen([sys.executable, "-m", "app.serve"], env = env, stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+
+    results = []
+    try:
+        wait_until_ready(base_url)
+        for name, call in [("json", json_call), ("msgpack", msgpack_call)]:
+            # Warm up before measuring
+            run_load(call, base_url, args.concurrency, 2.0, args.batch_size, args.use_cache)
+            result = {"protocol": name, **run_load(call, base_url, args.concurrency, args.seconds, args.batch_size, args.use_cache)}
+            results.append(result)
+            logger.info(f"{name}: {result['texts_per_second']:.1f} texts/s")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(f"{'protocol':>9} {'req/s':>8} {'texts/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'req KB':>8} {'resp KB':>8}")
+    for result in results:
+        print(
+            f"{result['protocol']:>9} {result['throughput_rps']:>8.1f} {result['texts_per_second']:>10.1f} "
+            f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+            f"{result['request_bytes'] / 1024:>8.1f} {result['response_bytes'] / 1024:>8.1f}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding = "utf-8") as f:
+            json.dump({
+                "concurrency": args.concurrency,
+                "batch_size": args.batch_size,
+                "use_cache": args.use_cache,
+                "results": results
+            }, f, indent = 2)
+        logger.info(f"Saved protocol benchmark report at {args.output}")
+
+if __name__ == "__main__":
+    main()
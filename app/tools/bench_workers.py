@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
+from app.core.runtime import effective_cpu_count
+from app.core.logging import setup_logging, get_logger
+
+# Setup logging
+setup_logging()
+logger = get_logger("tools")
+
+WORDS = (
+    "great product love it works perfectly terrible broke after a day awful quality "
+    "okay average nothing special fast shipping would buy again waste of money taste "
+    "delicious stale packaging damaged coffee strong smooth bitter price value"
+).split()
+
+def random_review(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 60)))
+
+def wait_until_ready(base_url: str, timeout: float = 120.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/api/health", timeout = 1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} did not become ready")
+
+def post_prediction(base_url: str, text: str) -> float:
+    request = urllib.request.Request(
+        f"{base_url}/api/predict?use_cache=false",
+        data = json.dumps({"text": text}).encode("utf-8"),
+        headers = {"Content-Type": "application/json"}
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout = 30) as response:
+        response.read()
+    return time.perf_counter() - start
+
+def run_load(base_url: str, concurrency: int, seconds: float) -> Dict[str, Any]:
+    """Closed-loop load: each client sends its next request when the previous one returns"""
+    deadline = time.time() + seconds
+
+    def client(seed: int) -> List[float]:
+        rng = random.Random(seed)
+        latencies = []
+        while time.time() < deadline:
+            latencies.append(post_prediction(base_url, random_review(rng)))
+        return latencies
+
+    started = time.time()
+    with ThreadPoolExecutor(max_workers = concurrency) as pool:
+        latencies = sorted(l for result in pool.map(client, range(concurrency)) for l in result)
+    duration = time.time() - started
+
+    return {
+        "requests": len(latencies),
+        "throughput_rps": len(latencies) / duration,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0
+    }
+
+def main():
+    cpus = effective_cpu_count()
+    parser = argparse.ArgumentParser(description = "Measure how prediction throughput scales with the pre-fork worker count")
+    parser.add_argument("--workers", default = None, help = "Comma separated worker counts, defaults to powers of two up to the CPU count")
+    parser.add_argument("--concurrency", type = int, default = 2 * cpus)
+    parser.add_argument("--seconds", type = float, default = 20.0)
+    parser.add_argument("--port", type = int, default = 8099)
+    parser.add_argument("--output", default = None, help = "Optional path for a JSON report")
+    args = parser.parse_args()
+
+    if args.workers:
+        worker_counts = [int(w) for w in args.workers.split(",")]
+    else:
+        worker_counts = sorted({min(2 ** i, cpus) for i in range(cpus.bit_length() + 1)})
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = []
+    for workers in worker_counts:
+        env = {**os.environ, "WORKERS": str(workers), "PORT": str(args.port), "HOST": "127.0.0.1"}
+        server = subprocess.Popen([sys.executable, "-m", "app.serve"], env = env, stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+        try:
+            wait_until_ready(base_url)
+            # Warm every worker before measuring
+            run_load(base_url, args.concurrency, 2.0)
+            result = {"workers": workers, **run_load(base_url, args.concurrency, args.seconds)}
+        finally:
+            server.terminate()
+            server.wait()
+
+        results.append(result)
+        logger.info(f"{workers} workers: {result['throughput_rps']:.1f} req/s")
+
+    baseline = results[0]["throughput_rps"] or 1.0
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for result in results:
+        print(
+            f"{result['workers']:>8} {result['throughput_rps']:>10.1f} {result['throughput_rps'] / baseline:>8.2f} "
+            f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding = "utf-8") as f:
+            json.dump({"cpus": cpus, "concurrency": args.concurrency, "results": results}, f, indent = 2)
+        logger.info(f"Saved worker scaling report at {args.output}")
+
+if __name__ == "__main__":
+    main()
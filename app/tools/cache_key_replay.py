@@ -0,0 +1,92 @@
+import json
+import time
+import argparse
+from collections import OrderedDict
+from typing import Iterator, List, Union, Callable, Dict, Any
+from app.core.logging import setup_logging, get_logger
+from app.utils.hash_utils import generate_cache_key, generate_normalized_cache_key
+from app.models.ml_models.src.features.preprocessing import clean_text, PREPROCESSING_VERSION
+
+# Setup logging
+setup_logging()
+logger = get_logger("tools")
+
+def iter_traffic(path: str, field: str = "text") -> Iterator[Union[str, List[str]]]:
+    """Yield request inputs from a JSON lines traffic file"""
+    with open(path, "r", encoding = "utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("Skipping malformed traffic line")
+                continue
+            value = record.get(field) if isinstance(record, dict) else record
+            if isinstance(value, (str, list)):
+                yield value
+
+def replay(inputs: List[Union[str, List[str]]], key_fn: Callable, capacity: int = 0) -> Dict[str, Any]:
+    """Replay inputs against an LRU cache keyed by key_fn (capacity 0 is unbounded)"""
+    cache: "OrderedDict[str, None]" = OrderedDict()
+    hits = 0
+    key_time = 0.0
+    for value in inputs:
+        start = time.perf_counter()
+        key = key_fn(value)
+        key_time += time.perf_counter() - start
+
+        if key in cache:
+            hits += 1
+            cache.move_to_end(key)
+            continue
+        cache[key] = None
+        if capacity and len(cache) > capacity:
+            cache.popitem(last = False)
+
+    total = len(inputs)
+    return {
+        "requests": total,
+        "hits": hits,
+        "hit_rate": hits / total if total else 0.0,
+        "unique_keys": len(cache),
+        "key_time_us_per_request": key_time / total * 1e6 if total else 0.0
+    }
+
+def normalized_key(value: Union[str, List[str]]) -> str:
+    texts = [value] if isinstance(value, str) else value
+    return generate_normalized_cache_key([clean_text(t) for t in texts], PREPROCESSING_VERSION)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Measure the cache hit rate gain of normalized cache keys on replayed traffic")
+    parser.add_argument("path", help = "JSON lines traffic file, one request per line")
+    parser.add_argument("--field", default = "text", help = "Field holding the request input")
+    parser.add_argument("--capacity", type = int, default = 0, help = "LRU capacity in keys, 0 for unbounded")
+    parser.add_argument("--output", default = None, help = "Optional path for a JSON report")
+    args = parser.parse_args()
+
+    inputs = list(iter_traffic(args.path, args.field))
+    logger.info(f"Replaying {len(inputs)} requests from {args.path}")
+
+    raw = replay(inputs, generate_cache_key, args.capacity)
+    normalized = replay(inputs, normalized_key, args.capacity)
+    report = {
+        "raw": raw,
+        "normalized": normalized,
+        "hit_rate_gain": normalized["hit_rate"] - raw["hit_rate"],
+        "preprocessing_version": PREPROCESSING_VERSION
+    }
+
+    print(f"Requests: {raw['requests']}")
+    print(f"Raw keys:        hit rate {raw['hit_rate']:.2%} ({raw['unique_keys']} unique keys)")
+    print(f"Normalized keys: hit rate {normalized['hit_rate']:.2%} ({normalized['unique_keys']} unique keys)")
+    print(f"Hit rate gain: {report['hit_rate_gain']:+.2%}")
+
+    if args.output:
+        with open(args.output, "w", encoding = "utf-8") as f:
+            json.dump(report, f, indent = 2)
+        logger.info(f"Saved replay report at {args.output}")
+
+if __name__ == "__main__":
+    main()
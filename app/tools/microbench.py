@@ -0,0 +1,289 @@
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import timeit
+import logging
+import argparse
+import platform
+import statistics
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Callable, Tuple
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+from app.tools.bench_workers import WORDS
+from app.tools.redis_outage_drill import start_redis
+from app.utils.hash_utils import generate_cache_key, generate_normalized_cache_key
+from app.core.logging import setup_logging, get_logger
+
+# Setup logging
+setup_logging()
+logger = get_logger("tools")
+
+BASELINE_DIR = Path("reports/benchmarks")
+BATCH_SIZES = (1, 32, 1024)
+
+# (name, function, operations per call)
+Benchmark = Tuple[str, Callable[[], Any], int]
+
+def short_review(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 15))).capitalize() + "!"
+
+def long_review(rng: random.Random) -> str:
+    """A few hundred words with the markup, digits and punctuation of real reviews"""
+    sentences = [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + rng.choice([".", "!", "?", " :)"])
+        for _ in range(rng.randint(20, 30))
+    ]
+    return " <br /><br />".join(f"{sentence} {rng.randint(1, 99)} oz" if i % 5 == 0 else sentence for i, sentence in enumerate(sentences))
+
+def make_corpus(rows: int, seed: int = 42) -> pd.DataFrame:
+    """Fixed synthetic Reviews.csv frame, the same for every run with the same seed"""
+    rng = random.Random(seed)
+    texts = [long_review(rng) if rng.random() < 0.2 else short_review(rng) for _ in range(rows)]
+    denominators = [rng.randint(0, 10) for _ in range(rows)]
+    return pd.DataFrame({
+        "HelpfulnessNumerator": [rng.randint(0, d) for d in denominators],
+        "HelpfulnessDenominator": denominators,
+        "Score": [rng.randint(1, 5) for _ in range(rows)],
+        "Summary": [short_review(rng) for _ in range(rows)],
+        "Text": texts
+    })
+
+def sample_result() -> Dict[str, Any]:
+    """A cached prediction shaped like the ones PredictionService stores"""
+    return {
+        "prediction": "Positive",
+        "raw_prediction": [2],
+        "model_info": {"model_type": "RandomForestClassifier", "model_name": "default", "model_version": "0a1b2c3d", "prediction_timestamp": "2025-01-01T00:00:00"},
+        "prediction_probabilities": [[0.08, 0.12, 0.8]],
+        "confidence": 0.8,
+        "from_cache": False,
+        "cache_key": "ml_pred:m0a1b2c3d:0123456789abcdef",
+        "input_text": "Great coffee, smooth and strong, would buy again",
+        "input_size": 48
+    }
+
+def text_benchmarks(rng: random.Random) -> List[Benchmark]:
+    from app.models.ml_models.src.features.preprocessing import clean_text, PREPROCESSING_VERSION
+
+    short, long = short_review(rng), long_review(rng)
+    batch = [short_review(rng) for _ in range(32)]
+    cleaned = [clean_text(text) for text in batch]
+    return [
+        ("clean_text/short", lambda: clean_text(short), 1),
+        ("clean_text/long", lambda: clean_text(long), 1),
+        ("generate_cache_key/text", lambda: generate_cache_key(short), 1),
+        ("generate_cache_key/batch32", lambda: generate_cache_key(batch), 1),
+        ("generate_normalized_cache_key/batch32", lambda: generate_normalized_cache_key(cleaned, PREPROCESSING_VERSION), 1)
+    ]
+
+def serialization_benchmarks() -> List[Benchmark]:
+    from app.services.cache_service import CacheService
+
+    value = sample_result()
+    serialized, _ = CacheService._serialize(value)
+    encoded = serialized.encode("utf-8")
+    return [
+        ("cache/serialize", lambda: CacheService._serialize(value), 1),
+        ("cache/deserialize", lambda: CacheService._deserialize(encoded), 1)
+    ]
+
+def cache_benchmarks(port: Optional[int] = None) -> List[Benchmark]:
+    """CacheService round trips against the local redis-server started for the run, or in-process fakeredis without one
+
+    The fakeredis timings are named apart, they only cover the client side
+    and are never compared with the ones of a real server.
+    """
+    from app.services.cache_service import CacheService
+
+    if port is None:
+        import fakeredis
+        server = fakeredis.FakeServer()
+        cache = CacheService(nodes = "fakeredis:0", client_factory = lambda host, port: fakeredis.FakeRedis(server = server))
+        group = "cache_fakeredis"
+    else:
+        cache = CacheService(nodes = f"localhost:{port}")
+        group = "cache"
+    value = sample_result()
+    keys = [f"ml_pred:bench:{i}" for i in range(32)]
+    cache.set_many({key: value for key in keys})
+    return [
+        (f"{group}/get_hit", lambda: cache.get(keys[0]), 1),
+        (f"{group}/get_miss", lambda: cache.get("ml_pred:bench:missing"), 1),
+        (f"{group}/set", lambda: cache.set("ml_pred:bench:set", value), 1),
+        (f"{group}/get_many32", lambda: cache.get_many(keys), 32)
+    ]
+
+def model_benchmarks(corpus: pd.DataFrame) -> List[Benchmark]:
+    import joblib
+    from app.models.ml_models.src.features.preprocessing import clean_text
+
+    with open(settings.model_path, "rb") as f:
+        model = joblib.load(f)
+    with open(settings.vectorizer_path, "rb") as f:
+        vectorizer = joblib.load(f)
+
+    cleaned = [clean_text(text) for text in corpus["Text"].head(max(BATCH_SIZES))]
+    benchmarks = []
+    for size in BATCH_SIZES:
+        texts = cleaned[:size]
+        features = vectorizer.transform(texts)
+        benchmarks += [
+            (f"vectorizer.transform/{size}", lambda texts = texts: vectorizer.transform(texts), size),
+            (f"model.predict/{size}", lambda features = features: model.predict(features), size),
+            (f"model.predict_proba/{size}", lambda features = features: model.predict_proba(features), size)
+        ]
+    return benchmarks
+
+def dataframe_benchmarks(corpus: pd.DataFrame) -> List[Benchmark]:
+    from app.models.ml_models.src.features.preprocessing import preprocess_dataframe
+
+    # The stage logs every call, which would end up in the measurement
+    get_logger("ml").setLevel(logging.WARNING)
+    return [(f"preprocess_dataframe/{len(corpus)}", lambda: preprocess_dataframe(corpus.copy()), len(corpus))]
+
+def measure(function: Callable[[], Any], ops: int, repeat: int, min_time: float) -> Dict[str, Any]:
+    """Per-operation time in microseconds over `repeat` rounds of at least `min_time` seconds each"""
+    timer = timeit.Timer(function)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.1))
+    rounds = [elapsed] + timer.repeat(repeat = repeat - 1, number = number)
+    per_op = sorted(seconds / number / ops * 1e6 for seconds in rounds)
+    return {
+        "median_us": statistics.median(per_op),
+        "min_us": per_op[0],
+        "max_us": per_op[-1],
+        "stdev_us": statistics.stdev(per_op) if len(per_op) > 1 else 0.0,
+        "ops_per_call": ops,
+        "calls_per_round": number,
+        "rounds": len(per_op)
+    }
+
+def metadata() -> Dict[str, Any]:
+    import sklearn
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "model_path": settings.model_path
+    }
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[Dict[str, Any]]:
+    """Median change of every benchmark against the baseline, slower than `threshold` counts as a regression"""
+    rows = []
+    for name in sorted(set(results) | set(baseline)):
+        current, previous = results.get(name), baseline.get(name)
+        if current is None or previous is None:
+            rows.append({
+                "name": name,
+                "status": "new" if previous is None else "missing",
+                "baseline_us": previous["median_us"] if previous else None,
+                "current_us": current["median_us"] if current else None,
+                "change": None
+            })
+            continue
+        change = current["median_us"] / previous["median_us"] - 1
+        status = "regression" if change > threshold else "improvement" if change < -threshold else "ok"
+        rows.append({"name": name, "status": status, "baseline_us": previous["median_us"], "current_us": current["median_us"], "change": change})
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description = "Microbenchmarks of the hot functions, saved as baselines and compared against them")
+    parser.add_argument("--filter", default = None, help = "Only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type = int, default = 5, help = "Measured rounds per benchmark")
+    parser.add_argument("--min-time", type = float, default = 0.2, help = "Minimum seconds per round")
+    parser.add_argument("--corpus-rows", type = int, default = 2000, help = "Rows of the synthetic corpus")
+    parser.add_argument("--seed", type = int, default = 42)
+    parser.add_argument("--redis-server", default = shutil.which("redis-server"), help = "redis-server binary for the cache benchmarks, fakeredis without it")
+    parser.add_argument("--redis-port", type = int, default = 6391)
+    parser.add_argument("--baseline-dir", default = str(BASELINE_DIR))
+    parser.add_argument("--save", default = None, metavar = "NAME", help = "Save the results as the baseline NAME")
+    parser.add_argument("--compare", default = None, metavar = "NAME", help = "Compare against the baseline NAME, exits with 1 on regressions")
+    parser.add_argument("--threshold", type = float, default = 0.1, help = "Relative median slowdown reported as a regression")
+    args = parser.parse_args()
+    # Progress bars of preprocess_dataframe, read by tqdm when it is first imported below
+    os.environ.setdefault("TQDM_DISABLE", "1")
+
+    baseline_dir = Path(args.baseline_dir)
+    baseline = None
+    if args.compare:
+        baseline_path = baseline_dir / f"{args.compare}.json"
+        if not baseline_path.exists():
+            raise SystemExit(f"Baseline {baseline_path} not found, create it with --save {args.compare}")
+        with open(baseline_path, "r", encoding = "utf-8") as f:
+            baseline = json.load(f)
+
+    rng = random.Random(args.seed)
+    corpus = make_corpus(args.corpus_rows, args.seed)
+    benchmarks = text_benchmarks(rng) + serialization_benchmarks()
+
+    redis_process = None
+    if args.redis_server:
+        redis_process = start_redis(args.redis_server, args.redis_port)
+        benchmarks += cache_benchmarks(args.redis_port)
+    else:
+        try:
+            benchmarks += cache_benchmarks()
+            logger.warning("redis-server binary not found, timing the cache round trips on fakeredis")
+        except ImportError:
+            logger.warning("Neither redis-server nor fakeredis found, skipping the cache round trip benchmarks")
+
+    if Path(settings.model_path).exists() and Path(settings.vectorizer_path).exists():
+        benchmarks += model_benchmarks(corpus)
+    else:
+        logger.warning(f"No trained model at {settings.model_path}, skipping the model benchmarks")
+    benchmarks += dataframe_benchmarks(corpus)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        for name, function, ops in benchmarks:
+            if args.filter and args.filter not in name:
+                continue
+            results[name] = measure(function, ops, args.repeat, args.min_time)
+            logger.info(f"{name}: {results[name]['median_us']:.2f} us/op")
+    finally:
+        if redis_process is not None:
+            redis_process.kill()
+
+    print(f"{'benchmark':<40} {'median us/op':>14} {'min us/op':>12} {'stdev':>8}")
+    for name, result in results.items():
+        print(f"{name:<40} {result['median_us']:>14.3f} {result['min_us']:>12.3f} {result['stdev_us']:>8.3f}")
+
+    if args.save:
+        baseline_dir.mkdir(parents = True, exist_ok = True)
+        save_path = baseline_dir / f"{args.save}.json"
+        with open(save_path, "w", encoding = "utf-8") as f:
+            json.dump({"metadata": metadata(), "settings": vars(args), "results": results}, f, indent = 2)
+        logger.info(f"Saved baseline {args.save} at {save_path}")
+
+    if baseline is not None:
+        # Benchmarks left out by --filter are not reported as missing
+        previous = {name: result for name, result in baseline["results"].items() if not args.filter or args.filter in name}
+        rows = compare(results, previous, args.threshold)
+        print(f"\nAgainst baseline {args.compare} ({baseline['metadata']['timestamp']}, threshold {args.threshold:.0%})")
+        print(f"{'benchmark':<40} {'baseline us':>12} {'current us':>12} {'change':>8}  status")
+        for row in rows:
+            change = f"{row['change']:+.1%}" if row["change"] is not None else "-"
+            baseline_us = f"{row['baseline_us']:.3f}" if row["baseline_us"] is not None else "-"
+            current_us = f"{row['current_us']:.3f}" if row["current_us"] is not None else "-"
+            print(f"{row['name']:<40} {baseline_us:>12} {current_us:>12} {change:>8}  {row['status']}")
+        regressions = [row["name"] for row in rows if row["status"] == "regression"]
+        if regressions:
+            logger.warning(f"{len(regressions)} benchmarks regressed beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import time
+import shutil
+import argparse
+import subprocess
+from typing import Dict, Any, List
+from app.core.config import settings
+from app.core.logging import setup_logging, get_logger
+
+# Setup logging
+setup_logging()
+logger = get_logger("tools")
+
+def start_redis(binary: str, port: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [binary, "--port", str(port), "--save", "", "--appendonly", "no"],
+        stdout = subprocess.DEVNULL,
+        stderr = subprocess.DEVNULL
+    )
+    time.sleep(0.5)
+    return process
+
+def run_phase(cache, name: str, seconds: float, interval: float) -> Dict[str, Any]:
+    """Hammer the cache with get/set pairs and record per-call latency"""
+    latencies: List[float] = []
+    hits = 0
+    deadline = time.time() + seconds
+    i = 0
+    while time.time() < deadline:
+        key = f"ml_pred:drill{i % 50}"
+        start = time.perf_counter()
+        if cache.get(key) is not None:
+            hits += 1
+        else:
+            cache.set(key, {"prediction": "Positive"})
+        latencies.append(time.perf_counter() - start)
+        i += 1
+        time.sleep(interval)
+
+    latencies.sort()
+    return {
+        "phase": name,
+        "calls": len(latencies),
+        "hits": hits,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+        "breaker": cache.nodes[0].breaker.get_stats()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description = "Kill and restart a local redis-server under load to exercise the cache circuit breaker")
+    parser.add_argument("--redis-server", default = shutil.which("redis-server"), help = "Path to the redis-server binary")
+    parser.add_argument("--port", type = int, default = 6390)
+    parser.add_argument("--phase-seconds", type = float, default = 10.0)
+    parser.add_argument("--interval", type = float, default = 0.01, help = "Pause between calls in seconds")
+    args = parser.parse_args()
+
+    if not args.redis_server:
+        raise SystemExit("redis-server binary not found, pass --redis-server")
+
+    settings.redis_host = "localhost"
+    settings.redis_port = args.port
+    settings.redis_nodes = None
+    process = start_redis(args.redis_server, args.port)
+
+    # Import after pointing the settings at the drill server
+    from app.services.cache_service import CacheService
+    cache = CacheService()
+
+    reports = []
+    try:
+        reports.append(run_phase(cache, "healthy", args.phase_seconds, args.interval))
+        process.kill()
+        process.wait()
+        logger.info("Killed redis-server")
+        reports.append(run_phase(cache, "outage", args.phase_seconds, args.interval))
+        process = start_redis(args.redis_server, args.port)
+        logger.info("Restarted redis-server")
+        reports.append(run_phase(cache, "recovery", args.phase_seconds + settings.redis_breaker_recovery_timeout, args.interval))
+    finally:
+        process.kill()
+
+    for report in reports:
+        breaker = report["breaker"]
+        print(
+            f"{report['phase']:>8}: {report['calls']} calls, {report['hits']} hits, "
+            f"p50 {report['p50_ms']:.2f} ms, p99 {report['p99_ms']:.2f} ms, max {report['max_ms']:.2f} ms, "
+            f"breaker {breaker['state']} (trips {breaker['trips']}, recoveries {breaker['recoveries']})"
+        )
+
+if __name__ == "__main__":
+    main()
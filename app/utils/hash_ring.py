@@ -0,0 +1,39 @@
+import bisect
+from typing import List, Dict, Iterable
+
+from app.utils.hash_utils import fast_hash
+
+class HashRing:
+    """Consistent hash ring with virtual nodes
+
+    Every node owns `replicas` points on a 64-bit ring and a key belongs to the
+    node of the first point after its hash, so adding or removing a node only
+    moves the keys of that node.
+    """
+
+    def __init__(self, nodes: List[str], replicas: int = 160):
+        if not nodes:
+            raise ValueError("A hash ring needs at least one node")
+        self.nodes = list(nodes)
+        self.replicas = replicas
+        points = sorted((self._hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas))
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int(fast_hash(value)[:16], 16)
+
+    def node_for(self, key: str) -> str:
+        """Node that owns the key"""
+        if len(self.nodes) == 1:
+            return self.nodes[0]
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[index]
+
+    def group(self, keys: Iterable[str]) -> Dict[str, List[str]]:
+        """Keys split by owning node, in their original order"""
+        groups: Dict[str, List[str]] = {}
+        for key in keys:
+            groups.setdefault(self.node_for(key), []).append(key)
+        return groups
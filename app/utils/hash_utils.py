@@ -1,6 +1,8 @@
 import hashlib
 import json 
-from typing import Any, Union, List, Dict
+from typing import Any, List
+
+import xxhash
 
 def generate_cache_key(data: Any, prefix: str ="ml_pred") -> str:
     """Generate a consistant cache key from input data"""
@@ -14,3 +16,30 @@ def generate_cache_key(data: Any, prefix: str ="ml_pred") -> str:
     hash_object = hashlib.sha256(normalized.encode()) 
     hash_hex = hash_object.hexdigest()[:16] 
     return f"{prefix}:{hash_hex}" 
+
+def fast_hash(data: str) -> str:
+    """128-bit non-cryptographic hash (xxh3)
+
+    Keys, ring placement and sketch indexes all derive from it, so every
+    replica must hash the same way: there is deliberately no fallback.
+    """
+    return xxhash.xxh3_128_hexdigest(data.encode())
+
+def file_version(*paths) -> str:
+    """Short version tag of file contents, equal on every replica and redeploy serving the same files"""
+    digest = xxhash.xxh3_64()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:8]
+
+def generate_normalized_cache_key(cleaned_texts: List[str], version: str, prefix: str = "ml_pred") -> str:
+    """Generate a cache key from the normalized model input
+
+    The key carries the preprocessing version so that keys produced by an
+    older `clean_text` never collide with the current one.
+    """
+    # "\x1f" is whitespace for str.split, so it never appears inside a cleaned text
+    normalized = f"{len(cleaned_texts)}\x1f" + "\x1f".join(cleaned_texts)
+    return f"{prefix}:n{version}:{fast_hash(normalized)}"
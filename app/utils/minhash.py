@@ -0,0 +1,122 @@
+import zlib
+from typing import List, Dict, Set, Hashable, Iterable
+
+import numpy as np
+
+SHINGLE_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+SHIFT = np.uint64(32)
+
+class MinHasher:
+    """MinHash signatures of word shingles
+
+    The share of equal signature slots between two texts estimates the
+    Jaccard similarity of their shingle sets. Words hash with crc32 and
+    shingles are combined and permuted with numpy (multiply-shift hashing),
+    so signatures are stable across processes and runs.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(0, 1 << 63, num_perm, dtype = np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.randint(0, 1 << 63, num_perm, dtype = np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        return self.signatures([text])[0]
+
+    def signatures(self, texts: Iterable[str], chunk_size: int = 1000) -> np.ndarray:
+        """Signatures of many texts, shape (texts, num_perm), computed chunk by chunk"""
+        texts = list(texts)
+        k = self.shingle_size
+        word_cache: Dict[str, int] = {}
+        result = np.empty((len(texts), self.num_perm), dtype = np.uint32)
+
+        for start in range(0, len(texts), chunk_size):
+            words, lengths = [], []
+            for text in texts[start:start + chunk_size]:
+                tokens = text.split()
+                # Short texts are padded so that they still form one shingle
+                tokens += [""] * (k - len(tokens))
+                words.extend(word_cache[t] if t in word_cache else word_cache.setdefault(t, zlib.crc32(t.encode())) for t in tokens)
+                lengths.append(len(tokens))
+
+            word_hashes = np.asarray(words, dtype = np.uint64)
+            lengths = np.asarray(lengths)
+            ends = np.cumsum(lengths)
+
+            # The shingle at position i combines words i..i+k-1, kept when they belong to one text
+            n = word_hashes.size - k + 1
+            shingles = word_hashes[:n].copy()
+            for j in range(1, k):
+                shingles = shingles * SHINGLE_MULTIPLIER + word_hashes[j:j + n]
+            owner = np.repeat(np.arange(lengths.size), lengths)[:n]
+            shingles = shingles[np.arange(n) + k <= ends[owner]]
+            starts = np.concatenate([[0], np.cumsum(lengths - k + 1)[:-1]])
+
+            permuted = (shingles[:, None] * self.a + self.b) >> SHIFT
+            result[start:start + lengths.size] = np.minimum.reduceat(permuted, starts, axis = 0)
+        return result
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        return float(np.mean(first == second))
+
+class LSHIndex:
+    """Banded locality sensitive hashing over MinHash signatures
+
+    Signatures are cut into `bands` bands and two keys become candidates when
+    any band matches exactly. Keys above a similarity of roughly
+    (1 / bands) ** (1 / rows_per_band) are likely to collide.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 8):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.buckets: List[Dict[bytes, Set[Hashable]]] = [{} for _ in range(bands)]
+        self.signatures: Dict[Hashable, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.signatures
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def insert(self, key: Hashable, signature: np.ndarray) -> None:
+        if key in self.signatures:
+            self.remove(key)
+        self.signatures[key] = signature
+        for buckets, band_key in zip(self.buckets, self._band_keys(signature)):
+            buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key: Hashable) -> None:
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for buckets, band_key in zip(self.buckets, self._band_keys(signature)):
+            members = buckets.get(band_key)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del buckets[band_key]
+
+    def candidates(self, signature: np.ndarray) -> Set[Hashable]:
+        """Keys sharing at least one band with the signature"""
+        found: Set[Hashable] = set()
+        for buckets, band_key in zip(self.buckets, self._band_keys(signature)):
+            found.update(buckets.get(band_key, ()))
+        return found
+
+    def query(self, signature: np.ndarray, threshold: float) -> List[Hashable]:
+        """Candidate keys whose estimated similarity reaches the threshold, most similar first"""
+        scored = [
+            (MinHasher.similarity(signature, self.signatures[key]), key)
+            for key in self.candidates(signature)
+        ]
+        return [key for score, key in sorted(scored, key = lambda item: -item[0]) if score >= threshold]
@@ -0,0 +1,23 @@
+import fakeredis
+import pytest
+
+from app.services.cache_service import CacheService
+
+class FakeRedisNodes:
+    """Client factory with one fakeredis server per host and port, in place of create_redis_client"""
+
+    def __init__(self):
+        self.servers = {}
+
+    def __call__(self, host: str, port: int, **kwargs) -> fakeredis.FakeRedis:
+        server = self.servers.setdefault(f"{host}:{port}", fakeredis.FakeServer())
+        return fakeredis.FakeRedis(server = server)
+
+@pytest.fixture
+def fake_nodes() -> FakeRedisNodes:
+    return FakeRedisNodes()
+
+@pytest.fixture
+def sharded_cache(fake_nodes) -> CacheService:
+    """Cache over three fakeredis nodes"""
+    return CacheService(nodes = "cache-a:6379,cache-b:6379,cache-c:6379", client_factory = fake_nodes)
@@ -0,0 +1,73 @@
+import redis
+
+from app.core.config import settings
+
+KEYS = [f"ml_pred:m1:{i}" for i in range(300)]
+
+def node_keys(cache) -> dict:
+    return {node.name: set(node.client.keys("ml_pred:*")) for node in cache.nodes}
+
+def test_set_stores_the_key_on_its_owner_only(sharded_cache):
+    for key in KEYS[:50]:
+        assert sharded_cache.set(key, {"prediction": key})
+    stored = node_keys(sharded_cache)
+    for key in KEYS[:50]:
+        owner = sharded_cache.node_for(key).name
+        assert {name for name, keys in stored.items() if key.encode() in keys} == {owner}
+        assert sharded_cache.get(key) == {"prediction": key}
+
+def test_set_many_splits_the_batch_by_node(sharded_cache):
+    assert sharded_cache.set_many({key: {"prediction": key} for key in KEYS}) == len(KEYS)
+    stored = node_keys(sharded_cache)
+    for name, keys in sharded_cache.ring.group(KEYS).items():
+        assert stored[name] == {key.encode() for key in keys}
+
+def test_get_many_reads_each_node_once_in_key_order(sharded_cache, monkeypatch):
+    sharded_cache.set_many({key: {"prediction": key} for key in KEYS[::2]})
+    calls = {}
+    for node in sharded_cache.nodes:
+        def mget(keys, node = node, mget = node.client.mget):
+            calls[node.name] = calls.get(node.name, 0) + 1
+            return mget(keys)
+        monkeypatch.setattr(node.client, "mget", mget)
+
+    values = sharded_cache.get_many(KEYS)
+    assert values == [{"prediction": key} if i % 2 == 0 else None for i, key in enumerate(KEYS)]
+    assert calls == {node.name: 1 for node in sharded_cache.nodes}
+
+def test_a_failing_node_only_skips_its_own_keys(sharded_cache, fake_nodes):
+    failing = sharded_cache.nodes[1]
+    groups = sharded_cache.ring.group(KEYS)
+    sharded_cache.set_many({key: {"prediction": key} for key in KEYS})
+    fake_nodes.servers[failing.name].connected = False
+
+    for key in groups[failing.name][:settings.redis_breaker_failure_threshold]:
+        assert sharded_cache.get(key) is None
+    assert not failing.breaker.allow_request()
+    for node in sharded_cache.nodes:
+        if node is not failing:
+            assert node.breaker.allow_request()
+
+    values = dict(zip(KEYS, sharded_cache.get_many(KEYS)))
+    for name, keys in groups.items():
+        expected = [None] * len(keys) if name == failing.name else [{"prediction": key} for key in keys]
+        assert [values[key] for key in keys] == expected
+    healthy_keys = [key for name, keys in groups.items() if name != failing.name for key in keys]
+    assert sharded_cache.set_many({key: {"prediction": 0} for key in KEYS}) == len(healthy_keys)
+    assert sharded_cache.set(healthy_keys[0], {"prediction": 1})
+    assert sharded_cache.get(healthy_keys[0]) == {"prediction": 1}
+
+def test_health_check_marks_a_node_failing_its_stats_degraded(sharded_cache, monkeypatch):
+    for node in sharded_cache.nodes:
+        # fakeredis has no INFO command
+        monkeypatch.setattr(node.client, "info", lambda: {"redis_version": "7.2.0", "connected_clients": 1})
+    failing = sharded_cache.nodes[2]
+    def pipeline(**kwargs):
+        raise redis.ConnectionError("Connection reset by peer")
+    monkeypatch.setattr(failing.client, "pipeline", pipeline)
+
+    health = sharded_cache.health_check()
+    assert health["status"] == "degraded"
+    assert health["nodes"][failing.name]["status"] == "degraded"
+    assert [node["status"] for name, node in health["nodes"].items() if name != failing.name] == ["healthy", "healthy"]
+    assert "policy" in health
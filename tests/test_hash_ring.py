@@ -0,0 +1,48 @@
+import pytest
+
+from app.utils.hash_ring import HashRing
+
+NODES = ["cache-a:6379", "cache-b:6379", "cache-c:6379"]
+KEYS = [f"ml_pred:m1:{i}" for i in range(5000)]
+
+def owners(ring: HashRing) -> dict:
+    return {key: ring.node_for(key) for key in KEYS}
+
+def test_placement_is_deterministic():
+    assert owners(HashRing(NODES)) == owners(HashRing(list(reversed(NODES))))
+
+def test_keys_spread_over_all_nodes():
+    counts = {node: 0 for node in NODES}
+    for node in owners(HashRing(NODES)).values():
+        counts[node] += 1
+    for count in counts.values():
+        assert 0.25 < count / len(KEYS) < 0.42
+
+def test_adding_a_node_only_moves_keys_to_it():
+    before = owners(HashRing(NODES))
+    after = owners(HashRing(NODES + ["cache-d:6379"]))
+    moved = [key for key in KEYS if before[key] != after[key]]
+    assert all(after[key] == "cache-d:6379" for key in moved)
+    assert 0.15 < len(moved) / len(KEYS) < 0.35
+
+def test_removing_a_node_only_moves_its_keys():
+    before = owners(HashRing(NODES))
+    after = owners(HashRing(NODES[:2]))
+    moved = [key for key in KEYS if before[key] != after[key]]
+    assert all(before[key] == "cache-c:6379" for key in moved)
+    assert len(moved) == sum(node == "cache-c:6379" for node in before.values())
+
+def test_group_keeps_the_key_order_per_node():
+    ring = HashRing(NODES)
+    groups = ring.group(KEYS)
+    assert sorted(key for keys in groups.values() for key in keys) == sorted(KEYS)
+    for node, keys in groups.items():
+        assert keys == [key for key in KEYS if ring.node_for(key) == node]
+
+def test_single_node_owns_everything():
+    ring = HashRing(NODES[:1])
+    assert set(owners(ring).values()) == {NODES[0]}
+
+def test_ring_needs_a_node():
+    with pytest.raises(ValueError):
+        HashRing([])